@@ -0,0 +1,237 @@
+"""A2A 多 Agent 服务端到端基准测试。
+
+启动 OpenAI 兼容的 LLM 替身服务（src/fake_llm_service.py，首 token 延迟与生成速率可配），
+通过 KIMI_API_URL 让所有 Agent 指向它，再用 AgentManager 拉起 Receptionist 与专家 Agent；
+对每条路由并发发起流式会话，统计 TTFT、token 间隔（ITL）、总耗时与吞吐，
+用于量化每一跳（Receptionist 路由、LLM 分类、专家 Agent）的开销。
+
+路由：
+    llm                          直连 LLM 替身（基线）
+    expert                       直连 TechExpert
+    receptionist-technical       Receptionist 本地分类 -> TechExpert
+    receptionist-sales           Receptionist 本地分类 -> SalesConsultant
+    receptionist-general         Receptionist 本地分类 -> 自身回答
+    receptionist-llm-classified  Receptionist 调用 LLM 分类 -> SalesConsultant
+
+用法（在项目根目录）：
+    python -m benchmarks.a2a_bench --sessions 8 --requests 5
+    python -m benchmarks.a2a_bench --ttft-ms 500 --tokens-per-s 30 --routes llm,expert,receptionist-technical
+    python -m benchmarks.a2a_bench --single-process --output bench_results/a2a_single.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import httpx
+
+from benchmarks.harness import percentile, summarize, write_results
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECEPTIONIST_URL = "http://127.0.0.1:8000"
+
+# 路由 -> (端点路径模板, 问题模板)；{llm} 为替身服务地址，{expert} 为 TechExpert 地址，{n} 保证每个问题不同
+ROUTES: dict[str, tuple[str, str]] = {
+    "llm": ("{llm}/chat/completions", "如何优化数据库索引？编号{n}"),
+    "expert": ("{expert}/v1/chat/completions", "如何优化数据库索引？编号{n}"),
+    "receptionist-technical": (RECEPTIONIST_URL + "/v1/chat/completions", "如何优化数据库索引？编号{n}"),
+    "receptionist-sales": (RECEPTIONIST_URL + "/v1/chat/completions", "你们的企业版授权多少钱一年？编号{n}"),
+    "receptionist-general": (RECEPTIONIST_URL + "/v1/chat/completions", "你好"),
+    # 本地分类无把握的问题，由 LLM 替身按 #sales 标记返回 SALES
+    "receptionist-llm-classified": (RECEPTIONIST_URL + "/v1/chat/completions", "麻烦帮我处理下这件事 #sales 编号{n}"),
+}
+
+# 逐跳开销：(名称, 路由, 基准路由)，按 TTFT p50 之差计算
+HOPS = [
+    ("expert agent", "expert", "llm"),
+    ("receptionist routing", "receptionist-technical", "expert"),
+    ("llm classification", "receptionist-llm-classified", "receptionist-sales"),
+]
+
+
+@dataclass
+class StreamSample:
+    ok: bool
+    ttft: float = 0.0
+    total: float = 0.0
+    tokens: int = 0
+    gaps: list[float] = field(default_factory=list)
+
+
+async def stream_once(client: httpx.AsyncClient, url: str, prompt: str, user: str) -> StreamSample:
+    """发送一次流式请求，记录首个内容增量时间、相邻内容增量的间隔与总耗时。"""
+    payload = {"model": "kimi-latest", "stream": True, "user": user, "messages": [{"role": "user", "content": prompt}]}
+    start = time.perf_counter()
+    sample = StreamSample(ok=False)
+    last = None
+    try:
+        async with client.stream("POST", url, json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return sample
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:].strip()
+                if data == "[DONE]":
+                    sample.ok = sample.tokens > 0
+                    break
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    return sample
+                if not any((c.get("delta") or {}).get("content") for c in chunk.get("choices") or []):
+                    continue
+                now = time.perf_counter()
+                if last is None:
+                    sample.ttft = now - start
+                else:
+                    sample.gaps.append(now - last)
+                last = now
+                sample.tokens += 1
+    except (httpx.HTTPError, json.JSONDecodeError):
+        return sample
+    sample.total = time.perf_counter() - start
+    return sample
+
+
+def route_stats(samples: list[StreamSample], wall: float) -> dict[str, Any]:
+    ok = [s for s in samples if s.ok]
+    stats = summarize([s.total for s in ok], wall, errors=len(samples) - len(ok))
+    ttfts = sorted(s.ttft for s in ok)
+    gaps = sorted(g for s in ok for g in s.gaps)
+    for q in (50, 95, 99):
+        stats[f"ttft_p{q}_ms"] = round(percentile(ttfts, q) * 1000, 4)
+        stats[f"itl_p{q}_ms"] = round(percentile(gaps, q) * 1000, 4)
+    tokens = sum(s.tokens for s in ok)
+    stats["tokens"] = tokens
+    stats["tokens_per_s"] = round(tokens / wall, 2) if wall > 0 else 0.0
+    return stats
+
+
+async def run_route(url: str, prompt: str, route: str, sessions: int, requests: int, warmup: int) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=sessions * 2, max_keepalive_connections=sessions * 2)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        for i in range(warmup):
+            await stream_once(client, url, prompt.format(n=f"w{i}"), user="bench-warmup")
+
+        async def session(index: int) -> list[StreamSample]:
+            return [
+                await stream_once(client, url, prompt.format(n=f"{route}-{index}-{i}"), user=f"bench-{index}")
+                for i in range(requests)
+            ]
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(session(i) for i in range(sessions)))
+        wall = time.perf_counter() - started
+    return route_stats([s for r in results for s in r], wall)
+
+
+def _wait_http(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout}s")
+
+
+@contextmanager
+def spawn_services(args: argparse.Namespace) -> Iterator[dict[str, str]]:
+    """拉起 LLM 替身与 A2A Agent（日志写入 logs/），返回各路由地址中的占位替换。"""
+    from src.a2a.manager import AgentManager
+
+    env = {
+        "FAKE_LLM_PORT": str(args.llm_port),
+        "FAKE_LLM_TTFT_MS": str(args.ttft_ms),
+        "FAKE_LLM_TOKENS_PER_S": str(args.tokens_per_s),
+        "FAKE_LLM_COMPLETION_TOKENS": str(args.completion_tokens),
+        "KIMI_API_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+        "KIMI_API_KEY": os.getenv("KIMI_API_KEY") or "bench",
+        # 关闭会让重复请求绕过 LLM 的回答缓存、分类缓存的语义层与客户端限速，使每次请求都完整经过被测链路
+        "A2A_RESPONSE_CACHE_SIZE": "0",
+        "A2A_INTENT_CACHE_SIMILARITY": "1.01",
+        "A2A_CLIENT_RATE": "0",
+    }
+    os.environ.update(env)
+    os.makedirs(os.path.join(PROJECT_ROOT, "logs"), exist_ok=True)
+    log_file = open(os.path.join(PROJECT_ROOT, "logs", "a2a_bench_llm.log"), "w")
+    llm = subprocess.Popen(
+        [sys.executable, "src/fake_llm_service.py"], cwd=PROJECT_ROOT, env=dict(os.environ), stdout=log_file, stderr=subprocess.STDOUT
+    )
+    manager = None
+    try:
+        _wait_http(f"http://127.0.0.1:{args.llm_port}/health", 30)
+        manager = AgentManager(single_process=args.single_process)
+        if not manager.start_all():
+            raise RuntimeError("A2A agents failed to start, see logs/")
+        expert = RECEPTIONIST_URL + "/agents/techexpert" if args.single_process else "http://127.0.0.1:8001"
+        yield {"llm": env["KIMI_API_URL"], "expert": expert}
+    finally:
+        if manager is not None:
+            manager.stop_all()
+        llm.terminate()
+        try:
+            llm.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            llm.kill()
+        log_file.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end streaming benchmark for the A2A agents")
+    parser.add_argument("--routes", default=",".join(ROUTES), help="逗号分隔的路由名")
+    parser.add_argument("--sessions", type=int, default=8, help="每条路由的并发流式会话数")
+    parser.add_argument("--requests", type=int, default=5, help="每个会话顺序发送的请求数")
+    parser.add_argument("--warmup", type=int, default=2, help="每条路由正式计时前的预热请求数")
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="LLM 替身的首 token 延迟（毫秒）")
+    parser.add_argument("--tokens-per-s", type=float, default=50.0, help="LLM 替身的生成速率（token/秒）")
+    parser.add_argument("--completion-tokens", type=int, default=64, help="LLM 替身每次回答的 token 数")
+    parser.add_argument("--llm-port", type=int, default=18010)
+    parser.add_argument("--single-process", action="store_true", help="以单进程托管模式启动 Agent")
+    parser.add_argument("--output", default="bench_results/a2a_bench.json", help="JSON 结果输出路径")
+    args = parser.parse_args()
+
+    routes = [r for r in args.routes.split(",") if r]
+    unknown = set(routes) - set(ROUTES)
+    if unknown:
+        parser.error(f"unknown routes: {', '.join(sorted(unknown))}")
+
+    report: dict[str, dict[str, Any]] = {}
+    with spawn_services(args) as hosts:
+        for route in routes:
+            template, prompt = ROUTES[route]
+            url = template.format(**hosts)
+            report[route] = asyncio.run(run_route(url, prompt, route, args.sessions, args.requests, args.warmup))
+            s = report[route]
+            print(
+                f"  {route:<28} n={s['count']:<4} err={s['errors']:<3} ttft p50={s['ttft_p50_ms']:8.2f}ms "
+                f"p95={s['ttft_p95_ms']:8.2f}ms  itl p50={s['itl_p50_ms']:6.2f}ms p95={s['itl_p95_ms']:6.2f}ms  "
+                f"total p50={s['p50_ms']:8.2f}ms  {s['ops_per_s']:6.2f} req/s {s['tokens_per_s']:8.2f} tok/s"
+            )
+
+    print("\nPer-hop overhead (TTFT p50):")
+    for name, route, base in HOPS:
+        if route in report and base in report:
+            delta = report[route]["ttft_p50_ms"] - report[base]["ttft_p50_ms"]
+            print(f"  {name:<22} {delta:+8.2f}ms  ({route} vs {base})")
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    results = [
+        {"name": f"route:{route}", "params": {"sessions": args.sessions, "single_process": args.single_process}, "stats": stats}
+        for route, stats in report.items()
+    ]
+    write_results(args.output, "a2a_bench", params, results)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
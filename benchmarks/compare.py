@@ -0,0 +1,65 @@
+"""对比两次基准测试的 JSON 结果，标出超过阈值的回退。
+
+用法：
+    python -m benchmarks.compare bench_results/base.json bench_results/head.json --threshold 0.1
+存在回退时以退出码 1 结束，便于在 CI 中使用。
+"""
+
+import argparse
+import json
+import sys
+from typing import Any
+
+
+def _key(result: dict[str, Any]) -> str:
+    return result["name"] + " " + json.dumps(result.get("params", {}), sort_keys=True, ensure_ascii=False)
+
+
+def load(path: str) -> dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(base: dict[str, Any], head: dict[str, Any], metric: str, threshold: float) -> tuple[list[str], int]:
+    base_by_key = {_key(r): r for r in base["results"]}
+    lines: list[str] = []
+    regressions = 0
+    for r in head["results"]:
+        key = _key(r)
+        old = base_by_key.get(key)
+        if old is None:
+            lines.append(f"  NEW   {key}: {metric}={r['stats'][metric]}")
+            continue
+        before = float(old["stats"][metric])
+        after = float(r["stats"][metric])
+        ratio = after / before if before > 0 else float("inf")
+        marker = "  "
+        if ratio > 1 + threshold:
+            marker = "!!"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            marker = "++"
+        lines.append(f"{marker} {ratio:5.2f}x {key}: {before} -> {after}")
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms", help="对比的统计项，如 p50_ms / p95_ms / mean_ms")
+    parser.add_argument("--threshold", type=float, default=0.1, help="判定回退的相对变化阈值")
+    args = parser.parse_args()
+
+    base = load(args.base)
+    head = load(args.head)
+    print(f"base: {base['env'].get('git')}  head: {head['env'].get('git')}  metric: {args.metric}")
+    lines, regressions = compare(base, head, args.metric, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{regressions} regression(s) above {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
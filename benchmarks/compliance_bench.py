@@ -0,0 +1,169 @@
+"""compliance_warning 流水线性能基准。
+
+在进程内启动确定性的 Embedding 替身服务（src/fake_embedding_service.py），
+按知识库规模与并发度测量 assess_compliance_context、topk_by_similarity、
+evaluate_rules、score_probability 的延迟与吞吐，并输出 JSON 结果供 compare.py 对比。
+
+用法（在项目根目录）：
+    python -m benchmarks.compliance_bench --output bench_results/compliance.json
+    python -m benchmarks.compliance_bench --sizes 10,1000,100000 --concurrency 1,8
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any
+
+from benchmarks.harness import run_benchmark, write_results
+from src.compliance_warning import kb, metrics, retrieval, service
+from src.compliance_warning.retrieval import build_query, topk_by_similarity
+from src.compliance_warning.rules import evaluate_rules
+from src.compliance_warning.scoring import score_probability
+from src.fake_embedding_service import BackgroundServer
+
+SOURCE_SYSTEMS = ("decision", "procurement", "analytics")
+
+_TOPICS = ["采购", "招标", "关联交易", "合同", "付款", "审计", "供应商", "预算", "回避", "公示"]
+_ACTIONS = ["未履行审批", "缺少唯一性依据", "金额超过阈值", "未披露关联关系", "缺少违约条款", "补齐材料后通过"]
+
+
+def synthetic_kb(size: int, seed: int = 42) -> None:
+    """生成 size 条制度与 size 条案例（确定性），替换当前知识库内容。"""
+    rng = random.Random(seed)
+    kb.clear()
+    for i in range(size):
+        topic = rng.choice(_TOPICS)
+        kb.ingest_policy(
+            doc_id=f"POL-{i:06d}",
+            title=f"{topic}管理办法第{i}号",
+            content=f"涉及{topic}的事项应{rng.choice(_ACTIONS)}时进行复核，相关材料应留痕可追溯。",
+            scope="集团",
+        )
+        kb.ingest_case(
+            case_id=f"CASE-{i:06d}",
+            summary=f"某项目{topic}{rng.choice(_ACTIONS)}。",
+            decision=rng.choice(["compliant", "non_compliant", "unknown"]),
+            reasons=f"{topic}程序要件{rng.choice(['不满足', '满足'])}，审计意见编号{i}。",
+            tags_json=json.dumps([topic]),
+        )
+
+
+def _stage_breakdown() -> dict[str, Any]:
+    return metrics.REGISTRY.snapshot().get("compliance_stage_seconds", {})
+
+
+def bench_pure(repeat: int, concurrency_levels: list[int]) -> list[dict[str, Any]]:
+    """不依赖知识库规模的纯计算部分：规则引擎与评分。"""
+    results: list[dict[str, Any]] = []
+    payloads = {s: service.demo_payload(s) for s in SOURCE_SYSTEMS}
+    signals = evaluate_rules("procurement", payloads["procurement"])
+    hits = [{"id": f"CASE-{i:06d}", "score": 0.9 - i * 0.1} for i in range(3)]
+
+    for concurrency in concurrency_levels:
+        for source_system, payload in payloads.items():
+            stats = run_benchmark(
+                lambda: evaluate_rules(source_system, payload),
+                repeat=repeat * 20,
+                concurrency=concurrency,
+            )
+            results.append(
+                {
+                    "name": "evaluate_rules",
+                    "params": {"source_system": source_system, "concurrency": concurrency},
+                    "stats": stats,
+                }
+            )
+        stats = run_benchmark(
+            lambda: score_probability(
+                signals=signals,
+                policy_hits=hits,
+                case_hits=hits,
+                case_decision_getter=lambda _: "non_compliant",
+            ),
+            repeat=repeat * 20,
+            concurrency=concurrency,
+        )
+        results.append(
+            {"name": "score_probability", "params": {"concurrency": concurrency}, "stats": stats}
+        )
+    return results
+
+
+def bench_kb(size: int, repeat: int, concurrency_levels: list[int]) -> list[dict[str, Any]]:
+    """依赖知识库规模的检索与端到端评估。"""
+    results: list[dict[str, Any]] = []
+    synthetic_kb(size)
+    payload = service.demo_payload("procurement")
+    query = build_query("procurement", payload)
+    case_docs = kb.iter_case_texts()
+
+    for concurrency in concurrency_levels:
+        params = {"kb_size": size, "concurrency": concurrency}
+        stats = run_benchmark(
+            lambda: topk_by_similarity(query, case_docs, k=3),
+            repeat=repeat,
+            concurrency=concurrency,
+        )
+        results.append({"name": "topk_by_similarity", "params": params, "stats": stats})
+
+        metrics.REGISTRY.reset()
+        stats = run_benchmark(
+            lambda: service.assess_compliance_context("procurement", payload),
+            repeat=repeat,
+            concurrency=concurrency,
+        )
+        results.append(
+            {
+                "name": "assess_compliance_context",
+                "params": params,
+                "stats": stats,
+                "stages": _stage_breakdown(),
+            }
+        )
+    return results
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="compliance_warning pipeline benchmarks")
+    parser.add_argument("--sizes", type=_int_list, default=[10, 100, 1000, 10000],
+                        help="知识库规模列表（制度与案例各 N 条），如 10,1000,100000")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 4],
+                        help="并发线程数列表，如 1,4,16")
+    parser.add_argument("--repeat", type=int, default=20, help="每项基准的最少执行次数")
+    parser.add_argument("--output", default="bench_results/compliance.json", help="JSON 结果输出路径")
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    with BackgroundServer() as embedding_server:
+        retrieval.EMBEDDING_SERVICE_URL = embedding_server.url
+        print(f"Fake embedding service: {embedding_server.url}")
+
+        results.extend(bench_pure(args.repeat, args.concurrency))
+        for size in args.sizes:
+            # 大规模知识库下每次检索都要传输全部文档向量，适当减少次数
+            repeat = max(3, args.repeat // max(1, size // 1000))
+            started = time.perf_counter()
+            results.extend(bench_kb(size, repeat, args.concurrency))
+            print(f"kb_size={size} done in {time.perf_counter() - started:.1f}s")
+
+    for r in results:
+        s = r["stats"]
+        print(f"{r['name']:<28} {json.dumps(r['params'], ensure_ascii=False):<48} "
+              f"p50={s['p50_ms']:.3f}ms p95={s['p95_ms']:.3f}ms ops/s={s['ops_per_s']}")
+
+    write_results(
+        args.output,
+        "compliance_warning",
+        {"sizes": args.sizes, "concurrency": args.concurrency, "repeat": args.repeat},
+        results,
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
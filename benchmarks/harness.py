@@ -0,0 +1,129 @@
+"""基准测试公共工具：计时循环、分位数统计与 JSON 结果文件。"""
+
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """对已排序的样本做线性插值分位数（q 取 0~100）。"""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * q / 100.0
+    lo = math.floor(rank)
+    hi = math.ceil(rank)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def summarize(latencies: list[float], wall_seconds: float, errors: int = 0) -> dict[str, Any]:
+    """把逐次耗时（秒）汇总为毫秒级统计与吞吐。"""
+    values = sorted(latencies)
+    n = len(values)
+    return {
+        "count": n,
+        "errors": errors,
+        "wall_s": round(wall_seconds, 4),
+        "ops_per_s": round(n / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+        "mean_ms": round(sum(values) / n * 1000, 4) if n else 0.0,
+        "min_ms": round(values[0] * 1000, 4) if n else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 4),
+        "p95_ms": round(percentile(values, 95) * 1000, 4),
+        "p99_ms": round(percentile(values, 99) * 1000, 4),
+        "max_ms": round(values[-1] * 1000, 4) if n else 0.0,
+    }
+
+
+def run_benchmark(
+    fn: Callable[[], Any],
+    *,
+    repeat: int,
+    concurrency: int = 1,
+    warmup: int = 1,
+    min_seconds: float = 0.0,
+) -> dict[str, Any]:
+    """执行 fn 至少 repeat 次（且总时长不少于 min_seconds），按并发度分摊到线程池。"""
+    for _ in range(warmup):
+        fn()
+
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one() -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    wall_start = time.perf_counter()
+    if concurrency <= 1:
+        done = 0
+        while done < repeat or time.perf_counter() - wall_start < min_seconds:
+            one()
+            done += 1
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            done = 0
+            while done < repeat or time.perf_counter() - wall_start < min_seconds:
+                batch = max(concurrency, repeat - done)
+                list(pool.map(lambda _: one(), range(batch)))
+                done += batch
+    wall = time.perf_counter() - wall_start
+    return summarize(latencies, wall, errors)
+
+
+def git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info() -> dict[str, Any]:
+    return {
+        "git": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def write_results(
+    path: str,
+    suite: str,
+    params: dict[str, Any],
+    results: list[dict[str, Any]],
+    extra: dict[str, Any] | None = None,
+) -> None:
+    """结果文件格式：{suite, env, params, results: [{name, params, stats, ...}]}，供 compare.py 对比。"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    doc = {"suite": suite, "env": environment_info(), "params": params, "results": results}
+    doc.update(extra or {})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, ensure_ascii=False, indent=2)
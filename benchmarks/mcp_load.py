@@ -0,0 +1,332 @@
+"""MCP streamable-http 服务压测工具。
+
+打开 N 个 MCP 客户端会话，按权重重放一组工具调用，周期性输出吞吐、
+p50/p95/p99 延迟与错误率，结束时写出 JSON 结果。
+
+用法（在项目根目录）：
+    # 一键本地压测：自动拉起 Embedding 替身服务与合规预警 MCP 服务
+    python -m benchmarks.mcp_load --spawn compliance --sessions 16 --duration 30
+
+    # 数据库 MCP 服务：SQLite 替身后端 + 10 万行合成 app_module
+    python -m benchmarks.mcp_load --spawn database --db-rows 100000 --sessions 16
+
+    # 压测已在运行的服务，自定义调用组合
+    python -m benchmarks.mcp_load --url http://127.0.0.1:8000/mcp --mix database --sessions 8
+    python -m benchmarks.mcp_load --url http://127.0.0.1:8001/mcp --mix my_mix.json
+
+调用组合文件格式：
+    [{"tool": "assess_compliance_risk", "weight": 3, "variants": [{...参数...}, ...]},
+     {"tool": "server_stats", "weight": 1}]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+import httpx
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from benchmarks.harness import summarize, write_results
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def compliance_mix() -> list[dict[str, Any]]:
+    """assess_compliance_risk 使用 demo_payload 的变体（金额、采购方式、附件等随机扰动）。"""
+    from src.compliance_warning.service import demo_payload
+
+    rng = random.Random(7)
+    variants: list[dict[str, Any]] = []
+    for source_system in ("decision", "procurement", "analytics"):
+        base = demo_payload(source_system)
+        for i in range(8):
+            payload = copy.deepcopy(base)
+            if source_system == "procurement":
+                payload["amount"] = rng.choice([50_000, 800_000, 2_200_000, 9_000_000])
+                payload["procurement_method"] = rng.choice(["single_source", "公开招标", "询价"])
+                payload["single_source_reason"] = rng.choice(["", "专利唯一"])
+            elif source_system == "decision":
+                payload["related_party"] = rng.random() < 0.5
+                payload["disclosure_provided"] = rng.random() < 0.5
+            else:
+                payload["payment_terms_days"] = rng.choice([30, 90, 240])
+                payload["has_penalty_clause"] = rng.random() < 0.5
+            payload["attachments"] = [] if i % 2 else ["采购申请.pdf"]
+            # 三分之二以对象、三分之一以 JSON 字符串传入，覆盖两种解析路径（与附件的 i % 2 错开，各种组合都会出现）
+            body: Any = payload if i % 3 else json.dumps(payload, ensure_ascii=False)
+            variants.append({"source_system": source_system, "payload": body})
+    return [
+        {"tool": "assess_compliance_risk", "weight": 8, "variants": variants},
+        {"tool": "assess_demo", "weight": 1, "variants": [{"source_system": "procurement"}]},
+        {"tool": "demo_payload", "weight": 1, "variants": [{"source_system": "analytics"}]},
+    ]
+
+
+def database_mix() -> list[dict[str, Any]]:
+    """database.py 的工具组合：全表读取（走结果缓存）、分页、流式导出与只读 SQL。"""
+    pages = [
+        {"limit": limit, "columns": ["module_code", "module_name", "status"], "filters": filters}
+        for limit in (20, 100)
+        for filters in (None, {"status": "enabled"}, {"app_id": [1, 2, 3]})
+    ]
+    sqls = [
+        {"sql": "SELECT status, COUNT(*) AS n FROM app_module WHERE app_id = %s GROUP BY status",
+         "params": [app_id]}
+        for app_id in (1, 5, 9)
+    ] + [
+        {"sql": "SELECT id, module_name FROM app_module WHERE parent_id = %s ORDER BY sort_order",
+         "params": [parent_id], "max_rows": 50}
+        for parent_id in (3, 30, 60)
+    ]
+    return [
+        {"tool": "get_app_modules", "weight": 1},
+        {"tool": "list_app_modules", "weight": 4, "variants": pages},
+        {"tool": "export_app_modules", "weight": 1, "variants": [{"limit": 2000, "columns": ["id", "module_code"]}]},
+        {"tool": "run_sql", "weight": 3, "variants": sqls},
+        {"tool": "db_pool_stats", "weight": 1},
+    ]
+
+
+PRESET_MIXES = {"compliance": compliance_mix, "database": database_mix}
+
+
+def load_mix(spec: str) -> list[dict[str, Any]]:
+    if spec in PRESET_MIXES:
+        return PRESET_MIXES[spec]()
+    with open(spec, encoding="utf-8") as f:
+        mix = json.load(f)
+    if not isinstance(mix, list) or not all("tool" in m for m in mix):
+        raise ValueError(f"Invalid mix file: {spec}")
+    return mix
+
+
+@dataclass
+class Sample:
+    end: float
+    tool: str
+    latency: float
+    ok: bool
+
+
+@dataclass
+class LoadState:
+    started: float
+    deadline: float
+    samples: list[Sample] = field(default_factory=list)
+    session_errors: list[str] = field(default_factory=list)
+
+
+def _pick(mix: list[dict[str, Any]], rng: random.Random) -> tuple[str, dict[str, Any]]:
+    entry = rng.choices(mix, weights=[m.get("weight", 1) for m in mix])[0]
+    variants = entry.get("variants") or [entry.get("arguments", {})]
+    return entry["tool"], rng.choice(variants)
+
+
+async def run_session(
+    index: int,
+    url: str,
+    mix: list[dict[str, Any]],
+    state: LoadState,
+    max_requests: int | None,
+    think_seconds: float,
+) -> None:
+    rng = random.Random(index)
+    try:
+        async with streamablehttp_client(url) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                sent = 0
+                while time.perf_counter() < state.deadline:
+                    if max_requests is not None and sent >= max_requests:
+                        break
+                    tool, arguments = _pick(mix, rng)
+                    start = time.perf_counter()
+                    try:
+                        result = await session.call_tool(tool, arguments)
+                        ok = not result.isError
+                    except Exception:
+                        ok = False
+                    end = time.perf_counter()
+                    state.samples.append(Sample(end - state.started, tool, end - start, ok))
+                    sent += 1
+                    if think_seconds:
+                        await asyncio.sleep(think_seconds)
+    except Exception as e:
+        state.session_errors.append(f"session {index}: {type(e).__name__}: {e}")
+
+
+def window_stats(samples: list[Sample], window_seconds: float) -> dict[str, Any]:
+    ok = [s.latency for s in samples if s.ok]
+    stats = summarize(ok, window_seconds, errors=len(samples) - len(ok))
+    stats["error_rate"] = round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0
+    return stats
+
+
+async def report_loop(state: LoadState, interval: float, timeline: list[dict[str, Any]]) -> None:
+    seen = 0
+    window_start = 0.0
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter() - state.started
+        window = state.samples[seen:]
+        seen += len(window)
+        stats = window_stats(window, now - window_start)
+        stats["t"] = round(now, 2)
+        timeline.append(stats)
+        print(
+            f"[{now:6.1f}s] rps={stats['ops_per_s']:8.2f} p50={stats['p50_ms']:8.2f}ms "
+            f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms err={stats['error_rate']:.2%}"
+        )
+        window_start = now
+
+
+async def run_load(args: argparse.Namespace, mix: list[dict[str, Any]]) -> dict[str, Any]:
+    started = time.perf_counter()
+    state = LoadState(started=started, deadline=started + args.duration)
+    timeline: list[dict[str, Any]] = []
+    reporter = asyncio.create_task(report_loop(state, args.interval, timeline))
+    await asyncio.gather(
+        *(
+            run_session(i, args.url, mix, state, args.requests, args.think_ms / 1000)
+            for i in range(args.sessions)
+        )
+    )
+    reporter.cancel()
+    wall = time.perf_counter() - started
+
+    per_tool: dict[str, Any] = {}
+    for tool in sorted({s.tool for s in state.samples}):
+        per_tool[tool] = window_stats([s for s in state.samples if s.tool == tool], wall)
+    return {
+        "overall": window_stats(state.samples, wall),
+        "per_tool": per_tool,
+        "timeline": timeline,
+        "session_errors": state.session_errors,
+    }
+
+
+def _wait_http(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout}s")
+
+
+def _start(name: str, script: str, env: dict[str, str]) -> subprocess.Popen:
+    log_dir = os.path.join(PROJECT_ROOT, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = open(os.path.join(log_dir, f"mcp_load_{name}.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, script],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=log_file,
+        stderr=subprocess.STDOUT,
+    )
+
+
+@contextmanager
+def spawn_services(target: str, embedding_port: int, db_rows: int = 10_000) -> Iterator[str]:
+    """拉起本地演示服务（子进程，日志写入 logs/mcp_load_*.log），返回 MCP 端点 URL。"""
+    processes: list[subprocess.Popen] = []
+    env = dict(os.environ)
+    try:
+        if target == "compliance":
+            env["FAKE_EMBEDDING_PORT"] = str(embedding_port)
+            env["EMBEDDING_SERVICE_URL"] = f"http://127.0.0.1:{embedding_port}/embed"
+            processes.append(_start("embedding", "src/fake_embedding_service.py", env))
+            _wait_http(f"http://127.0.0.1:{embedding_port}/health", 30)
+            processes.append(_start("compliance", "src/compliance_warning_demo.py", env))
+            mcp_url = "http://127.0.0.1:8001/mcp"
+        elif target == "database":
+            # 使用 SQLite 替身后端，自动建表并生成 db_rows 行合成数据
+            env["DB_BACKEND"] = "sqlite"
+            env["DB_SQLITE_PATH"] = os.path.join(PROJECT_ROOT, "data", f"bench_app_module_{db_rows}.sqlite3")
+            env["DB_SQLITE_SEED_ROWS"] = str(db_rows)
+            processes.append(_start("database", "database.py", env))
+            mcp_url = "http://127.0.0.1:8000/mcp"
+        else:
+            raise ValueError(f"Unknown spawn target: {target}")
+        _wait_http(mcp_url, 120)
+        yield mcp_url
+    finally:
+        for p in reversed(processes):
+            p.terminate()
+            try:
+                p.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load generator for MCP streamable-http servers")
+    parser.add_argument("--url", default="http://127.0.0.1:8001/mcp", help="MCP 端点 URL")
+    parser.add_argument("--mix", default=None,
+                        help="调用组合：预置 compliance / database，或 JSON 文件路径")
+    parser.add_argument("--sessions", type=int, default=8, help="并发 MCP 会话数")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测时长（秒）")
+    parser.add_argument("--requests", type=int, default=None, help="每个会话的最大调用次数")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="每次调用后的等待时间（毫秒）")
+    parser.add_argument("--interval", type=float, default=5.0, help="实时统计输出间隔（秒）")
+    parser.add_argument("--spawn", choices=["compliance", "database"], default=None,
+                        help="自动拉起本地演示服务（compliance 使用 Embedding 替身，database 使用 SQLite 替身后端）")
+    parser.add_argument("--embedding-port", type=int, default=18003)
+    parser.add_argument("--db-rows", type=int, default=10_000, help="--spawn database 时生成的 app_module 行数")
+    parser.add_argument("--output", default="bench_results/mcp_load.json", help="JSON 结果输出路径")
+    args = parser.parse_args()
+
+    mix = load_mix(args.mix or args.spawn or "compliance")
+
+    async def go() -> dict[str, Any]:
+        return await run_load(args, mix)
+
+    if args.spawn:
+        with spawn_services(args.spawn, args.embedding_port, args.db_rows) as url:
+            args.url = url
+            report = asyncio.run(go())
+    else:
+        report = asyncio.run(go())
+
+    overall = report["overall"]
+    print(
+        f"\nTotal: {overall['count']} ok, {overall['errors']} errors, "
+        f"{overall['ops_per_s']} req/s, p50={overall['p50_ms']}ms "
+        f"p95={overall['p95_ms']}ms p99={overall['p99_ms']}ms"
+    )
+    for tool, stats in report["per_tool"].items():
+        print(f"  {tool:<28} n={stats['count']:<6} p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms err={stats['error_rate']:.2%}")
+    for err in report["session_errors"]:
+        print(f"  ! {err}")
+
+    params = {k: v for k, v in vars(args).items() if k != "output"}
+    results = [{"name": "overall", "params": {"sessions": args.sessions}, "stats": overall}]
+    results += [
+        {"name": f"tool:{tool}", "params": {"sessions": args.sessions}, "stats": stats}
+        for tool, stats in report["per_tool"].items()
+    ]
+    write_results(
+        args.output,
+        "mcp_load",
+        params,
+        results,
+        extra={"timeline": report["timeline"], "session_errors": report["session_errors"]},
+    )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,902 @@
 """Example showing lifespan support for startup/shutdown with strong typing."""
 
+import asyncio
+import base64
+import functools
+import inspect
+import json
+import os
+import random
+import re
+import time
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 import aiomysql
+import aiosqlite
+import pymysql
 
 from mcp.server.fastmcp import Context, FastMCP
 from mcp.server.session import ServerSession
 
+from src.compliance_warning import tracing
+
+# MySQL client errors that mean the socket is gone and the query can be retried on a fresh connection
+_CONNECTION_LOST_CODES = {2003, 2006, 2013}
+
+APP_MODULE_TABLE = "app_module"
+APP_MODULE_KEY = "id"  # unique, indexed column used for keyset pagination
+MAX_PAGE_SIZE = 1000
+MAX_STREAM_ROWS = 100_000
+MAX_EXPORT_ROWS = 10_000  # rows per export_app_modules response; larger exports page with next_cursor
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def quote_identifier(name: str) -> str:
+    """Backtick-quote a column/table name, rejecting anything that is not a plain identifier."""
+    if not _IDENTIFIER.match(name):
+        raise ValueError(f"Invalid identifier: {name!r}")
+    return f"`{name}`"
+
+
+def encode_cursor(last_key) -> str:
+    """Opaque pagination cursor: the key of the last row already returned."""
+    return base64.urlsafe_b64encode(json.dumps({"after": last_key}).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def build_keyset_query(
+    table: str,
+    key: str,
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+    after=None,
+    limit: int | None = None,
+) -> tuple[str, list]:
+    """SELECT <columns> FROM <table> WHERE <filters> AND key > after ORDER BY key LIMIT n.
+
+    Filters are ANDed equality tests; a list value becomes IN (...), None becomes IS NULL.
+    The key column is always selected so the caller can build the next cursor.
+    """
+    if columns:
+        projection = [quote_identifier(c) for c in dict.fromkeys([key, *columns])]
+    else:
+        projection = ["*"]
+    clauses: list[str] = []
+    args: list = []
+    for column, value in (filters or {}).items():
+        col = quote_identifier(column)
+        if value is None:
+            clauses.append(f"{col} IS NULL")
+        elif isinstance(value, list):
+            if not value:
+                clauses.append("FALSE")
+                continue
+            clauses.append(f"{col} IN ({', '.join(['%s'] * len(value))})")
+            args.extend(value)
+        else:
+            clauses.append(f"{col} = %s")
+            args.append(value)
+    if after is not None:
+        clauses.append(f"{quote_identifier(key)} > %s")
+        args.append(after)
+    sql = f"SELECT {', '.join(projection)} FROM {quote_identifier(table)}"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += f" ORDER BY {quote_identifier(key)}"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    return sql, args
+
+
+@dataclass
+class DatabaseConfig:
+    """Connection and pool settings; every field can be overridden from the environment."""
+
+    backend: str = "mysql"  # "mysql" or "sqlite" (local stand-in with synthetic data)
+    host: str = "localhost"
+    port: int = 3306
+    database: str = "app_platform"
+    user: str = "root"
+    password: str = "123456"
+    pool_min_size: int = 1
+    pool_max_size: int = 10
+    pool_recycle: int = 3600  # close connections idle for longer than this (seconds)
+    ping_after: float = 30.0  # ping connections idle for longer than this before handing them out
+    acquire_timeout: float = 5.0
+    connect_timeout: int = 10
+    reconnect_interval: float = 5.0  # minimum delay between attempts to (re)create the pool
+    query_max_rows: int = 1000  # hard caps for run_sql; callers may only lower them
+    query_max_bytes: int = 1_000_000
+    query_timeout: float = 10.0
+    cache_ttl: float = 60.0  # default result-cache TTL (seconds); 0 disables caching
+    cache_max_entries: int = 256
+    sqlite_path: str = "data/app_platform.sqlite3"
+    sqlite_seed_rows: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "DatabaseConfig":
+        """Read DB_* environment variables, falling back to the defaults above."""
+        defaults = cls()
+        env = os.environ.get
+        return cls(
+            backend=env("DB_BACKEND", defaults.backend),
+            host=env("DB_HOST", defaults.host),
+            port=int(env("DB_PORT", defaults.port)),
+            database=env("DB_NAME", defaults.database),
+            user=env("DB_USER", defaults.user),
+            password=env("DB_PASSWORD", defaults.password),
+            pool_min_size=int(env("DB_POOL_MIN_SIZE", defaults.pool_min_size)),
+            pool_max_size=int(env("DB_POOL_MAX_SIZE", defaults.pool_max_size)),
+            pool_recycle=int(env("DB_POOL_RECYCLE", defaults.pool_recycle)),
+            ping_after=float(env("DB_PING_AFTER", defaults.ping_after)),
+            acquire_timeout=float(env("DB_ACQUIRE_TIMEOUT", defaults.acquire_timeout)),
+            connect_timeout=int(env("DB_CONNECT_TIMEOUT", defaults.connect_timeout)),
+            reconnect_interval=float(env("DB_RECONNECT_INTERVAL", defaults.reconnect_interval)),
+            query_max_rows=int(env("DB_QUERY_MAX_ROWS", defaults.query_max_rows)),
+            query_max_bytes=int(env("DB_QUERY_MAX_BYTES", defaults.query_max_bytes)),
+            query_timeout=float(env("DB_QUERY_TIMEOUT", defaults.query_timeout)),
+            cache_ttl=float(env("DB_CACHE_TTL", defaults.cache_ttl)),
+            cache_max_entries=int(env("DB_CACHE_MAX_ENTRIES", defaults.cache_max_entries)),
+            sqlite_path=env("DB_SQLITE_PATH", defaults.sqlite_path),
+            sqlite_seed_rows=int(env("DB_SQLITE_SEED_ROWS", defaults.sqlite_seed_rows)),
+        )
+
+
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+`?([A-Za-z_][A-Za-z0-9_]*)`?", re.IGNORECASE)
+
+
+class QueryCache:
+    """Read-through cache of query results keyed by normalized SQL + parameters.
+
+    Entries expire after their TTL and the least recently used entry is evicted
+    once `max_entries` is reached. Concurrent misses for the same key share one
+    database round trip (single-flight); if the caller running that round trip
+    is cancelled, the others retry instead of failing with it. A load that
+    overlaps an invalidation is returned to its callers but not stored, so
+    invalidation is never undone by an in-flight query.
+    """
+
+    def __init__(self, max_entries: int = 256, default_ttl: float = 60.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._clock = clock
+        # key -> (expires_at, tables, rows); insertion order doubles as LRU order
+        self._entries: dict[str, tuple[float, frozenset[str], list]] = {}
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(sql: str, args=None) -> str:
+        normalized = " ".join(sql.split()).rstrip(";")
+        return f"{normalized}|{json.dumps(args, default=str, sort_keys=True)}"
+
+    async def get_or_load(self, sql: str, args, loader, ttl: float | None = None) -> list:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0 or self.max_entries <= 0:
+            return await loader()
+        key = self.key(sql, args)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > self._clock():
+                self._entries[key] = self._entries.pop(key)  # mark as most recently used
+                self.hits += 1
+                return entry[2]
+            del self._entries[key]
+
+        while (inflight := self._inflight.get(key)) is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only the leader was cancelled: its entry is gone, so retry and possibly lead the load
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            rows = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited is not logged as unhandled
+            future.exception()
+            raise
+        else:
+            future.set_result(rows)
+            if generation == self._generation:
+                tables = frozenset(t.lower() for t in _TABLE_REFERENCE.findall(sql))
+                self._entries[key] = (self._clock() + ttl, tables, rows)
+                while len(self._entries) > self.max_entries:
+                    del self._entries[next(iter(self._entries))]
+                    self.evictions += 1
+            return rows
+        finally:
+            del self._inflight[key]
+
+    def invalidate(self, table: str | None = None) -> int:
+        """Drop every entry, or only entries whose SQL reads `table`. Returns the number removed."""
+        self._generation += 1
+        if table is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        table = table.lower()
+        stale = [k for k, (_, tables, _) in self._entries.items() if table in tables]
+        for k in stale:
+            del self._entries[k]
+        return len(stale)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "default_ttl": self.default_ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "inflight": len(self._inflight),
+        }
+
+
+_SQL_LITERALS = re.compile(
+    r"'(?:[^'\\]|\\.|'')*'"  # single-quoted strings
+    r'|"(?:[^"\\]|\\.|"")*"'  # double-quoted strings
+    r"|`(?:[^`]|``)*`"  # quoted identifiers
+    r"|/\*.*?\*/"  # block comments
+    r"|(?:--\s|#)[^\n]*",  # line comments
+    re.DOTALL,
+)
+_READ_ONLY_STATEMENTS = ("SELECT", "WITH", "SHOW", "DESCRIBE", "DESC", "EXPLAIN")
+_FORBIDDEN_SQL = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|REPLACE|DROP|ALTER|CREATE|TRUNCATE|RENAME|GRANT|REVOKE|CALL|DO|"
+    r"HANDLER|LOAD|SET|LOCK|UNLOCK|OUTFILE|DUMPFILE|SHARE|SLEEP|BENCHMARK|GET_LOCK|LOAD_FILE)\b",
+    re.IGNORECASE,
+)
+
+
+class UnsafeQuery(ValueError):
+    """Raised for SQL that run_sql refuses to execute."""
+
+
+@functools.lru_cache(maxsize=512)
+def prepare_read_only(sql: str) -> tuple[str, str]:
+    """Validate a read-only statement once per distinct SQL text; returns (statement kind, SQL).
+
+    Accepts a single SELECT / WITH / SHOW / DESCRIBE / EXPLAIN statement. Literals and
+    comments are blanked before keyword checks so values cannot smuggle statements,
+    and executable /*! ... */ comments are rejected. Values must be passed as %s or
+    %(name)s parameters.
+    """
+    if "/*!" in sql or "/*+" in sql:
+        raise UnsafeQuery("executable comments and optimizer hints are not allowed")
+    sql = sql.strip().rstrip(";").strip()
+    skeleton = _SQL_LITERALS.sub(" ", sql)
+    if ";" in skeleton:
+        raise UnsafeQuery("only a single statement is allowed")
+    words = skeleton.split()
+    kind = words[0].upper() if words else ""
+    if kind not in _READ_ONLY_STATEMENTS:
+        raise UnsafeQuery(f"only {', '.join(_READ_ONLY_STATEMENTS)} statements are allowed")
+    match = _FORBIDDEN_SQL.search(skeleton)
+    if match:
+        raise UnsafeQuery(f"keyword not allowed in read-only queries: {match.group(0).upper()}")
+    return kind, sql
+
+
+_LEADING_COMMENTS = re.compile(r"(?:\s+|/\*.*?\*/|(?:--\s|#)[^\n]*)*", re.DOTALL)
+
+
+def add_execution_time_hint(sql: str, timeout_ms: int) -> str:
+    """Insert a MAX_EXECUTION_TIME optimizer hint right after the leading SELECT keyword.
+
+    Comments and whitespace before the keyword are kept as they are; SQL that does not
+    start with SELECT is returned unchanged.
+    """
+    start = _LEADING_COMMENTS.match(sql).end()
+    if sql[start : start + 6].upper() != "SELECT":
+        return sql
+    end = start + 6
+    return f"{sql[:end]} /*+ MAX_EXECUTION_TIME({int(timeout_ms)}) */{sql[end:]}"
+
+
+class DatabaseUnavailable(RuntimeError):
+    """Raised when no connection can be obtained from the pool."""
+
+
+@dataclass
+class PoolStats:
+    """Counters describing pool utilization since startup."""
+
+    acquires: int = 0
+    acquire_timeouts: int = 0
+    acquire_wait_total: float = 0.0
+    acquire_wait_max: float = 0.0
+    pings: int = 0
+    retries: int = 0
+    errors: int = 0
+    in_use_max: int = 0
+
+    def record_acquire(self, waited: float, in_use: int) -> None:
+        self.acquires += 1
+        self.acquire_wait_total += waited
+        self.acquire_wait_max = max(self.acquire_wait_max, waited)
+        self.in_use_max = max(self.in_use_max, in_use)
+
+    def as_dict(self, config: "DatabaseConfig", connected: bool, size: int, free: int) -> dict:
+        return {
+            "backend": config.backend,
+            "connected": connected,
+            "min_size": config.pool_min_size,
+            "max_size": config.pool_max_size,
+            "size": size,
+            "free": free,
+            "in_use": size - free,
+            "in_use_max": self.in_use_max,
+            "acquires": self.acquires,
+            "acquire_timeouts": self.acquire_timeouts,
+            "acquire_wait_avg_ms": round(self.acquire_wait_total / self.acquires * 1000, 3)
+            if self.acquires
+            else 0.0,
+            "acquire_wait_max_ms": round(self.acquire_wait_max * 1000, 3),
+            "pings": self.pings,
+            "retries": self.retries,
+            "errors": self.errors,
+        }
+
+
+async def _read_limited(fetchone, max_rows: int, max_bytes: int) -> tuple[list[dict], str | None]:
+    """Read rows one by one until the result ends or a row/byte limit is hit; returns (rows, reason)."""
+    rows: list[dict] = []
+    size = 0
+    while True:
+        row = await fetchone()
+        if row is None:
+            return rows, None
+        if len(rows) >= max_rows:
+            return rows, "max_rows"
+        row = dict(row)
+        size += len(json.dumps(row, default=str, ensure_ascii=False))
+        if size > max_bytes:
+            return rows, "max_bytes"
+        rows.append(row)
+
+
+class MySQLBackend:
+    """aiomysql connection pool with health checks, acquire timeouts and reconnects."""
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self.pool: aiomysql.Pool | None = None
+        self.stats = PoolStats()
+        self._pool_lock = asyncio.Lock()
+        self._last_connect_attempt = 0.0
+
+    async def start(self) -> None:
+        await self._ensure_pool()
+
+    async def _ensure_pool(self) -> aiomysql.Pool:
+        if self.pool is not None:
+            return self.pool
+        async with self._pool_lock:
+            if self.pool is not None:
+                return self.pool
+            now = time.monotonic()
+            if now - self._last_connect_attempt < self.config.reconnect_interval:
+                raise DatabaseUnavailable("database unavailable, waiting before reconnecting")
+            self._last_connect_attempt = now
+            cfg = self.config
+            try:
+                self.pool = await aiomysql.create_pool(
+                    host=cfg.host,
+                    port=cfg.port,
+                    db=cfg.database,
+                    user=cfg.user,
+                    password=cfg.password,
+                    minsize=cfg.pool_min_size,
+                    maxsize=cfg.pool_max_size,
+                    pool_recycle=cfg.pool_recycle,
+                    connect_timeout=cfg.connect_timeout,
+                    autocommit=True,
+                )
+            except (pymysql.err.MySQLError, OSError) as e:
+                self.stats.errors += 1
+                raise DatabaseUnavailable(f"{type(e).__name__}: {e}") from e
+            print(
+                f"Connected to {cfg.user}@{cfg.host}:{cfg.port}/{cfg.database} "
+                f"(pool {cfg.pool_min_size}-{cfg.pool_max_size})"
+            )
+            return self.pool
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiomysql.Connection]:
+        """Borrow a healthy connection from the pool, waiting at most `acquire_timeout` seconds."""
+        pool = await self._ensure_pool()
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(pool.acquire(), self.config.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.acquire_timeouts += 1
+            raise DatabaseUnavailable(
+                f"timed out after {self.config.acquire_timeout}s waiting for a pooled connection"
+            ) from None
+        except (pymysql.err.MySQLError, OSError) as e:
+            self.stats.errors += 1
+            raise DatabaseUnavailable(f"{type(e).__name__}: {e}") from e
+        self.stats.record_acquire(time.perf_counter() - start, pool.size - pool.freesize)
+        try:
+            # The pool already drops connections that hit EOF or exceeded pool_recycle;
+            # ping long-idle ones too so a silently dropped socket is replaced before use.
+            if conn.loop.time() - conn.last_usage > self.config.ping_after:
+                self.stats.pings += 1
+                await conn.ping(reconnect=True)
+            yield conn
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            # Do not return a broken connection to the pool
+            conn.close()
+            raise
+        finally:
+            pool.release(conn)
+
+    async def fetchall(self, sql: str, args=None) -> list[dict]:
+        """Run a statement and fetch all rows, retrying once if the connection was lost."""
+        for attempt in range(2):
+            try:
+                async with self.acquire() as conn:
+                    async with conn.cursor(aiomysql.DictCursor) as cursor:
+                        await cursor.execute(sql, args)
+                        return await cursor.fetchall()
+            except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+                lost = isinstance(e, pymysql.err.InterfaceError) or (e.args and e.args[0] in _CONNECTION_LOST_CODES)
+                if attempt or not lost:
+                    self.stats.errors += 1
+                    raise
+                self.stats.retries += 1
+        return []
+
+    async def stream(self, sql: str, args=None, batch_size: int = 500) -> AsyncIterator[list[dict]]:
+        """Yield rows in batches from a server-side (unbuffered) cursor.
+
+        Only one batch is held in memory at a time. The connection is busy until
+        the generator finishes, so bound the statement with LIMIT: closing an
+        unbuffered cursor early still drains the remaining result rows.
+        """
+        async with self.acquire() as conn:
+            async with conn.cursor(aiomysql.SSDictCursor) as cursor:
+                await cursor.execute(sql, args)
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
+
+    async def run_read_only(
+        self, kind: str, sql: str, params, max_rows: int, max_bytes: int, timeout: float
+    ) -> dict:
+        """The statement runs inside START TRANSACTION READ ONLY. A SELECT also gets a
+        server-side MAX_EXECUTION_TIME hint; every statement is bounded client-side,
+        and on timeout the query is killed on the server. Rows are read from an
+        unbuffered cursor, and reading stops at the first limit hit. The connection
+        is then discarded rather than drained.
+        """
+        if kind == "SELECT":
+            sql = add_execution_time_hint(sql, int(timeout * 1000))
+        async with self.acquire() as conn:
+            thread_id = conn.thread_id()
+            try:
+                result = await asyncio.wait_for(
+                    self._run_read_only(conn, sql, params, max_rows, max_bytes), timeout
+                )
+            except asyncio.TimeoutError:
+                conn.close()
+                await self._kill_query(thread_id)
+                raise TimeoutError(f"query exceeded {timeout}s") from None
+            except Exception:
+                conn.close()
+                raise
+            if result["truncated"]:
+                # Unread rows are still on the wire; dropping the connection is cheaper than draining them
+                conn.close()
+        return result
+
+    @staticmethod
+    async def _run_read_only(conn, sql, params, max_rows: int, max_bytes: int) -> dict:
+        # Not "async with": closing an unbuffered cursor would drain the unread rows,
+        # while a truncated read is abandoned together with its connection instead
+        cursor = await conn.cursor(aiomysql.SSDictCursor)
+        await cursor.execute("START TRANSACTION READ ONLY")
+        await cursor.execute(sql, params)
+        columns = [d[0] for d in cursor.description or ()]
+        rows, truncated = await _read_limited(cursor.fetchone, max_rows, max_bytes)
+        if truncated is None:
+            await cursor.close()
+            await conn.rollback()
+        return {"columns": columns, "rows": rows, "truncated_reason": truncated}
+
+    async def _kill_query(self, thread_id: int) -> None:
+        try:
+            async with self.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(f"KILL QUERY {int(thread_id)}")
+        except (pymysql.err.MySQLError, DatabaseUnavailable, OSError):
+            pass
+
+    async def introspect(self) -> dict:
+        columns = await self.fetchall(
+            "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_KEY "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() "
+            "ORDER BY TABLE_NAME, ORDINAL_POSITION"
+        )
+        indexes = await self.fetchall(
+            "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, COLUMN_NAME "
+            "FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() "
+            "ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX"
+        )
+        tables: dict[str, dict] = {}
+        for c in columns:
+            table = tables.setdefault(c["TABLE_NAME"], {"columns": [], "indexes": {}})
+            table["columns"].append(
+                {
+                    "name": c["COLUMN_NAME"],
+                    "type": c["COLUMN_TYPE"],
+                    "nullable": c["IS_NULLABLE"] == "YES",
+                    "key": c["COLUMN_KEY"] or None,
+                }
+            )
+        for i in indexes:
+            table = tables.setdefault(i["TABLE_NAME"], {"columns": [], "indexes": {}})
+            index = table["indexes"].setdefault(
+                i["INDEX_NAME"], {"unique": not i["NON_UNIQUE"], "columns": []}
+            )
+            index["columns"].append(i["COLUMN_NAME"])
+        return tables
+
+    def pool_stats(self) -> dict:
+        pool = self.pool
+        return self.stats.as_dict(
+            self.config, pool is not None, pool.size if pool else 0, pool.freesize if pool else 0
+        )
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+
+_PYFORMAT = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+@functools.lru_cache(maxsize=512)
+def to_qmark(sql: str) -> str:
+    """Translate pyformat placeholders (%s, %(name)s) to SQLite's ? and :name, leaving literals alone."""
+
+    def translate(chunk: str) -> str:
+        return _PYFORMAT.sub(
+            lambda m: f":{m.group(1)}" if m.group(1) else ("?" if m.group(0) == "%s" else "%"), chunk
+        )
+
+    out: list[str] = []
+    pos = 0
+    for m in _SQL_LITERALS.finditer(sql):
+        out.append(translate(sql[pos : m.start()]))
+        out.append(m.group(0))
+        pos = m.end()
+    out.append(translate(sql[pos:]))
+    return "".join(out)
+
+
+APP_MODULE_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS app_module (
+    id INTEGER PRIMARY KEY,
+    app_id INTEGER NOT NULL,
+    parent_id INTEGER,
+    module_code TEXT NOT NULL UNIQUE,
+    module_name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sort_order INTEGER NOT NULL,
+    description TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_app_module_app_status ON app_module (app_id, status);
+CREATE INDEX IF NOT EXISTS idx_app_module_parent ON app_module (parent_id);
+"""
+
+
+def synthetic_app_modules(start: int, stop: int):
+    """Deterministic fake app_module rows with ids in [start, stop)."""
+    statuses = ("enabled", "enabled", "enabled", "disabled", "draft")
+    words = ("用户", "订单", "报表", "审批", "采购", "合同", "权限", "消息", "日志", "配置")
+    for i in range(start, stop):
+        rng = random.Random(i)
+        name = f"{rng.choice(words)}{rng.choice(words)}模块"
+        stamp = f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} {rng.randint(0, 23):02d}:00:00"
+        yield (
+            i,
+            rng.randint(1, 20),
+            None if i <= 100 or rng.random() < 0.2 else rng.randint(1, 100),
+            f"MOD-{i:07d}",
+            name,
+            rng.choice(statuses),
+            rng.randint(0, 999),
+            f"{name}，负责{rng.choice(words)}相关功能。" * rng.randint(1, 4),
+            stamp,
+            stamp,
+        )
+
+
+class SQLiteBackend:
+    """aiosqlite stand-in for tests and benchmarks.
+
+    On startup it creates the app_module schema and tops it up to
+    `sqlite_seed_rows` synthetic rows. Pooled connections are opened with
+    PRAGMA query_only, so the MCP tools cannot write.
+    """
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self.stats = PoolStats()
+        self._connections: list[aiosqlite.Connection] = []
+        self._free: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+    async def start(self) -> None:
+        if self._connections:
+            return
+        cfg = self.config
+        directory = os.path.dirname(cfg.sqlite_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        async with aiosqlite.connect(cfg.sqlite_path) as conn:
+            await conn.execute("PRAGMA journal_mode = WAL")
+            await conn.executescript(APP_MODULE_SQLITE_SCHEMA)
+            async with conn.execute("SELECT COALESCE(MAX(id), 0) FROM app_module") as cursor:
+                (existing,) = await cursor.fetchone()
+            batch = 10_000
+            for start in range(existing + 1, cfg.sqlite_seed_rows + 1, batch):
+                stop = min(start + batch, cfg.sqlite_seed_rows + 1)
+                await conn.executemany(
+                    "INSERT INTO app_module VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    synthetic_app_modules(start, stop),
+                )
+            await conn.commit()
+        for _ in range(cfg.pool_max_size):
+            conn = await aiosqlite.connect(cfg.sqlite_path)
+            conn.row_factory = aiosqlite.Row
+            await conn.execute("PRAGMA query_only = ON")
+            self._connections.append(conn)
+            self._free.put_nowait(conn)
+        print(f"Opened SQLite {cfg.sqlite_path} ({max(existing, cfg.sqlite_seed_rows)} app_module rows)")
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aiosqlite.Connection]:
+        if not self._connections:
+            await self.start()
+        start = time.perf_counter()
+        try:
+            conn = await asyncio.wait_for(self._free.get(), self.config.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.stats.acquire_timeouts += 1
+            raise DatabaseUnavailable(
+                f"timed out after {self.config.acquire_timeout}s waiting for a pooled connection"
+            ) from None
+        self.stats.record_acquire(
+            time.perf_counter() - start, len(self._connections) - self._free.qsize()
+        )
+        try:
+            yield conn
+        finally:
+            self._free.put_nowait(conn)
+
+    async def fetchall(self, sql: str, args=None) -> list[dict]:
+        async with self.acquire() as conn:
+            async with conn.execute(to_qmark(sql), args or ()) as cursor:
+                return [dict(row) for row in await cursor.fetchall()]
+
+    async def stream(self, sql: str, args=None, batch_size: int = 500) -> AsyncIterator[list[dict]]:
+        async with self.acquire() as conn:
+            async with conn.execute(to_qmark(sql), args or ()) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
+
+    async def run_read_only(
+        self, kind: str, sql: str, params, max_rows: int, max_bytes: int, timeout: float
+    ) -> dict:
+        if kind in ("SHOW", "DESCRIBE", "DESC"):
+            raise UnsafeQuery(f"{kind} is not supported by the sqlite backend; read schema://database instead")
+        async with self.acquire() as conn:
+            async with conn.execute(to_qmark(sql), params or ()) as cursor:
+                columns = [d[0] for d in cursor.description or ()]
+                try:
+                    rows, truncated = await asyncio.wait_for(
+                        _read_limited(cursor.fetchone, max_rows, max_bytes), timeout
+                    )
+                except asyncio.TimeoutError:
+                    await conn.interrupt()
+                    raise TimeoutError(f"query exceeded {timeout}s") from None
+        return {"columns": columns, "rows": rows, "truncated_reason": truncated}
+
+    async def introspect(self) -> dict:
+        tables: dict[str, dict] = {}
+        names = await self.fetchall(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%%' ORDER BY name"
+        )
+        for (name,) in ((r["name"],) for r in names):
+            quoted = quote_identifier(name)
+            info = await self.fetchall(f"PRAGMA table_info({quoted})")
+            table = tables.setdefault(name, {"columns": [], "indexes": {}})
+            for c in info:
+                table["columns"].append(
+                    {
+                        "name": c["name"],
+                        "type": c["type"],
+                        "nullable": not c["notnull"] and not c["pk"],
+                        "key": "PRI" if c["pk"] else None,
+                    }
+                )
+            for idx in await self.fetchall(f"PRAGMA index_list({quoted})"):
+                cols = await self.fetchall(f"PRAGMA index_info({quote_identifier(idx['name'])})")
+                table["indexes"][idx["name"]] = {
+                    "unique": bool(idx["unique"]),
+                    "columns": [c["name"] for c in cols],
+                }
+        return tables
+
+    def pool_stats(self) -> dict:
+        return self.stats.as_dict(
+            self.config, bool(self._connections), len(self._connections), self._free.qsize()
+        )
+
+    async def close(self) -> None:
+        connections, self._connections = self._connections, []
+        self._free = asyncio.Queue()
+        await asyncio.gather(*(conn.close() for conn in connections), return_exceptions=True)
+
+
+BACKENDS = {"mysql": MySQLBackend, "sqlite": SQLiteBackend}
+
 
-# Mock database class for example
 class Database:
-    """Mock database class for example."""
+    """Database access layer: result cache and app_module queries on top of a pooled backend."""
 
-    def __init__(self, host: str = "localhost", port: int = 3306, 
-                 database: str = "mydb", user: str = "root", password: str = ""):
+    def __init__(self, config: DatabaseConfig | None = None):
         """Initialize database connection parameters."""
-        self.host = host
-        self.port = port
-        self.database = database
-        self.user = user
-        self.password = password
-        self.connection = None
+        self.config = config or DatabaseConfig()
+        self.host = self.config.host
+        self.port = self.config.port
+        self.database = self.config.database
+        self.user = self.config.user
+        if self.config.backend not in BACKENDS:
+            raise ValueError(f"Unknown DB_BACKEND {self.config.backend!r}, expected one of {sorted(BACKENDS)}")
+        self.backend = BACKENDS[self.config.backend](self.config)
+        self.cache = QueryCache(self.config.cache_max_entries, self.config.cache_ttl)
+        self.schema: dict | None = None
 
     @classmethod
-    async def connect(cls, host: str = "localhost", port: int = 3306,
-                     database: str = "app_platform", user: str = "root", password: str = "") -> "Database":
-        """Connect to database with connection info."""
-        db = cls(host=host, port=port, database=database, user=user, password=password)
-        # 使用 aiomysql 连接 MySQL 数据库
+    async def connect(cls, config: DatabaseConfig | None = None) -> "Database":
+        """Create the connection pool. A failure is logged, not raised: the pool is retried on demand."""
+        db = cls(config)
         try:
-            db.connection = await aiomysql.connect(
-                host=host, port=port, db=database, user=user, password=password
-            )
-            print(f"Connected to {user}@{host}:{port}/{database}")
-        except Exception as e:
+            await db.backend.start()
+        except DatabaseUnavailable as e:
             print(f"Connection failed: {e}")
         return db
 
+    async def execute(self, sql: str, args=None) -> list:
+        """Run a statement and fetch all rows as dicts."""
+        return await self.backend.fetchall(sql, args)
+
+    def stream(self, sql: str, args=None, batch_size: int = 500) -> AsyncIterator[list[dict]]:
+        """Yield result rows in batches without materializing the whole result."""
+        return self.backend.stream(sql, args, batch_size)
+
+    async def run_sql(
+        self,
+        sql: str,
+        params: list | dict | None = None,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        timeout: float | None = None,
+    ) -> dict:
+        """Run a validated read-only statement under row, byte and time limits."""
+        cfg = self.config
+        max_rows = min(max_rows or cfg.query_max_rows, cfg.query_max_rows)
+        max_bytes = min(max_bytes or cfg.query_max_bytes, cfg.query_max_bytes)
+        timeout = min(timeout or cfg.query_timeout, cfg.query_timeout)
+        kind, sql = prepare_read_only(sql)
+
+        start = time.perf_counter()
+        result = await self.backend.run_read_only(kind, sql, params, max_rows, max_bytes, timeout)
+        truncated = result.pop("truncated_reason")
+        result.update(
+            row_count=len(result["rows"]),
+            truncated=truncated is not None,
+            truncated_reason=truncated,
+            elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+        )
+        return result
+
+    async def load_schema(self) -> dict:
+        """Introspect tables, columns and indexes of the current database and cache the result."""
+        tables = await self.backend.introspect()
+        self.schema = {"database": self.database, "backend": self.config.backend, "tables": tables}
+        return self.schema
+
+    async def cached(self, sql: str, args=None, ttl: float | None = None) -> list:
+        """execute() through the result cache; `ttl` overrides the configured default."""
+        return await self.cache.get_or_load(sql, args, lambda: self.execute(sql, args), ttl)
+
+    def pool_stats(self) -> dict:
+        """Current pool utilization plus cumulative counters."""
+        return self.backend.pool_stats()
+
     async def disconnect(self) -> None:
         """Disconnect from database."""
-        if self.connection:
-            self.connection.close()
-            await self.connection.wait_closed()
+        await self.backend.close()
         print("Disconnected from database")
 
     async def query_app_module(self) -> list:
         """Query app_module table."""
-        print("Querying app_module table...", self.connection)
-        if not self.connection:
-            return []
-        
-        print("Executing query...")
-        
-        async with self.connection.cursor(aiomysql.DictCursor) as cursor:
-            await cursor.execute("SELECT * FROM app_module")
-            result = await cursor.fetchall()
-            print("Query executed successfully.", result)
-            return result
+        result = await self.cached(f"SELECT * FROM {APP_MODULE_TABLE}")
+        print(f"Fetched {len(result)} rows from {APP_MODULE_TABLE}")
+        return result
+
+    async def page_app_module(
+        self,
+        limit: int = 100,
+        cursor: str | None = None,
+        columns: list[str] | None = None,
+        filters: dict | None = None,
+    ) -> dict:
+        """One keyset page of app_module ordered by key; pass `next_cursor` back to continue."""
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether another page exists
+        sql, args = build_keyset_query(
+            APP_MODULE_TABLE, APP_MODULE_KEY, columns, filters, after, limit + 1
+        )
+        rows = await self.cached(sql, args)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][APP_MODULE_KEY]) if has_more else None
+        return {"rows": rows, "next_cursor": next_cursor}
+
+    async def stream_app_module(
+        self,
+        limit: int = 10_000,
+        cursor: str | None = None,
+        columns: list[str] | None = None,
+        filters: dict | None = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[list[dict]]:
+        """Stream up to `limit` app_module rows in key order through a server-side cursor."""
+        limit = max(1, min(limit, MAX_STREAM_ROWS))
+        after = decode_cursor(cursor) if cursor else None
+        sql, args = build_keyset_query(
+            APP_MODULE_TABLE, APP_MODULE_KEY, columns, filters, after, limit
+        )
+        async for rows in self.stream(sql, args, batch_size=batch_size):
+            yield rows
 
     def query(self) -> str:
         """Execute a query."""
@@ -75,13 +914,11 @@ class AppContext:
 async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
     """Manage application lifecycle with type-safe context."""
     # Initialize on startup with database connection info
-    db = await Database.connect(
-        host="localhost",
-        port=3306,
-        database="app_platform",
-        user="root",
-        password="123456"
-    )
+    db = await Database.connect(DatabaseConfig.from_env())
+    try:
+        await db.load_schema()
+    except (DatabaseUnavailable, pymysql.err.MySQLError) as e:
+        print(f"Schema introspection deferred: {e}")
     try:
         yield AppContext(db=db)
     finally:
@@ -91,21 +928,164 @@ async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
 
 # Pass lifespan to server
 mcp = FastMCP("My App", lifespan=app_lifespan, port=8000)
+tracing.set_service_name(mcp.name)
+
+
+def _trace_parent() -> tracing.SpanContext | None:
+    """Caller's span: `_meta.traceparent` of the MCP request, else the HTTP traceparent header."""
+    try:
+        request_context = mcp.get_context().request_context
+    except (LookupError, ValueError):
+        return None
+    if request_context is None:
+        return None
+    meta = request_context.meta.model_dump() if request_context.meta is not None else {}
+    parent = tracing.parse_traceparent(meta.get("traceparent"))
+    request = request_context.request
+    if parent is None and request is not None:
+        parent = tracing.extract(request.headers)
+    return parent
+
+
+def traced(fn):
+    """Record a server span around each call of an MCP tool, sync or async."""
+    tool = fn.__name__
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with tracing.span(f"tool {tool}", parent=_trace_parent(), kind="server", tool=tool):
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with tracing.span(f"tool {tool}", parent=_trace_parent(), kind="server", tool=tool):
+            return fn(*args, **kwargs)
+    return wrapper
 
 
 # Access type-safe lifespan context in tools
 @mcp.tool()
+@traced
 def query_db(ctx: Context[ServerSession, AppContext]) -> str:
     """Tool that uses initialized resources."""
     db = ctx.request_context.lifespan_context.db
     return db.query()
 
 @mcp.tool()
+@traced
 async def get_app_modules(ctx: Context[ServerSession, AppContext]) -> list:
     """Get all modules from app_module table."""
     db = ctx.request_context.lifespan_context.db
     modules = await db.query_app_module()
     return modules
 
+
+@mcp.tool()
+@traced
+async def list_app_modules(
+    ctx: Context[ServerSession, AppContext],
+    limit: int = 100,
+    cursor: str | None = None,
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+) -> dict:
+    """Page through app_module in primary-key order.
+
+    Args:
+        limit: rows per page (max 1000).
+        cursor: `next_cursor` from the previous page; omit for the first page.
+        columns: columns to return (default: all).
+        filters: column -> value equality filters; a list means IN, null means IS NULL.
+    """
+    db = ctx.request_context.lifespan_context.db
+    return await db.page_app_module(limit=limit, cursor=cursor, columns=columns, filters=filters)
+
+
+@mcp.tool()
+@traced
+async def export_app_modules(
+    ctx: Context[ServerSession, AppContext],
+    limit: int = MAX_EXPORT_ROWS,
+    cursor: str | None = None,
+    columns: list[str] | None = None,
+    filters: dict | None = None,
+) -> dict:
+    """Read up to `limit` app_module rows (max 10000) via a server-side cursor, reporting progress per batch.
+
+    The whole page is returned in one response, so larger exports are paged: pass `next_cursor`
+    back to continue where this page stopped; it is null once the last row has been read.
+    """
+    db = ctx.request_context.lifespan_context.db
+    limit = max(1, min(limit, MAX_EXPORT_ROWS))
+    rows: list[dict] = []
+    # Read one extra row to know whether another page exists
+    async for batch in db.stream_app_module(limit=limit + 1, cursor=cursor, columns=columns, filters=filters):
+        rows.extend(batch)
+        await ctx.report_progress(min(len(rows), limit), total=limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][APP_MODULE_KEY]) if has_more else None
+    return {"rows": rows, "count": len(rows), "next_cursor": next_cursor}
+
+
+@mcp.tool()
+@traced
+async def run_sql(
+    ctx: Context[ServerSession, AppContext],
+    sql: str,
+    params: list | dict | None = None,
+    max_rows: int | None = None,
+) -> dict:
+    """Run one read-only SQL statement (SELECT/WITH/SHOW/DESCRIBE/EXPLAIN) with bound parameters.
+
+    Put values in `params` using %s placeholders (list) or %(name)s placeholders (dict);
+    never inline them into `sql`. Results are capped by row count, response size and
+    execution time; `truncated` tells whether rows were cut off. See the
+    schema://database resource for available tables, columns and indexes.
+    """
+    db = ctx.request_context.lifespan_context.db
+    try:
+        return await db.run_sql(sql, params, max_rows=max_rows)
+    except UnsafeQuery as e:
+        raise ValueError(f"Rejected query: {e}") from e
+
+
+@mcp.resource("schema://database")
+async def database_schema() -> str:
+    """Tables, columns and indexes of the application database (introspected at startup)."""
+    db = mcp.get_context().request_context.lifespan_context.db
+    schema = db.schema if db.schema is not None else await db.load_schema()
+    return json.dumps(schema, ensure_ascii=False, indent=2)
+
+
+@mcp.tool()
+@traced
+async def refresh_schema(ctx: Context[ServerSession, AppContext]) -> dict:
+    """Re-read the database schema after DDL changes; returns the table names."""
+    db = ctx.request_context.lifespan_context.db
+    schema = await db.load_schema()
+    return {"tables": sorted(schema["tables"])}
+
+
+@mcp.tool()
+@traced
+def db_pool_stats(ctx: Context[ServerSession, AppContext]) -> dict:
+    """Connection pool utilization: size, in-use/free connections, acquire waits and errors."""
+    db = ctx.request_context.lifespan_context.db
+    return {
+        **db.pool_stats(),
+        "cache": db.cache.stats(),
+        "prepared_statements": prepare_read_only.cache_info()._asdict(),
+    }
+
+
+@mcp.tool()
+@traced
+def invalidate_query_cache(ctx: Context[ServerSession, AppContext], table: str | None = None) -> dict:
+    """Drop cached query results, for every table or only for `table` (e.g. after it was updated)."""
+    db = ctx.request_context.lifespan_context.db
+    return {"removed": db.cache.invalidate(table), "cache": db.cache.stats()}
+
 if __name__ == "__main__":
     mcp.run(transport="streamable-http")
\ No newline at end of file
@@ -0,0 +1,196 @@
+import asyncio
+import hmac
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from src.a2a import metrics
+
+# 请求准入控制：每个 Agent 一个并发上限（信号量）+ 有界等待队列（带超时），每个客户端一个令牌桶（默认关闭）。
+# 饱和时立即返回 429 与 Retry-After，而不是把突发流量全部转发给 Kimi API 触发上游限流、让所有用户一起出错。
+# 并发准入由 handle_chat_completion（按 Agent）与 handle_proxy_request（按目标副本）共用；客户端限速只在入口（Receptionist）检查。
+# 参数按 Agent 读取环境变量 A2A_MAX_CONCURRENCY_<AGENT>，未设置时回退到 A2A_MAX_CONCURRENCY 等全局值；
+# Receptionist 侧按副本地址各建一个准入（与副本自身的上限一致），多副本时总容量随健康副本数增长。
+
+
+def _agent_env(name: str, agent: str, default: float) -> float:
+    return float(os.getenv(f"{name}_{agent.upper()}", os.getenv(name, default)))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def response(self) -> JSONResponse:
+        return JSONResponse(
+            {"error": {"message": f"server busy: {self.reason}", "type": "rate_limit_exceeded", "code": self.reason}},
+            status_code=429,
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+        )
+
+
+class AdmissionController:
+    """单个 Agent（或其某个副本）的并发准入：最多 max_concurrent 个请求同时执行，最多 max_queue 个按 FIFO 排队，
+    排队超过 queue_timeout 秒放弃。"""
+
+    def __init__(self, agent: str, max_concurrent: int, max_queue: int, queue_timeout: float, url: Optional[str] = None):
+        self.agent = agent
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # 请求占用时长的指数滑动平均，用于估算 Retry-After
+        self._avg_hold = 1.0
+        self._labels = {"agent": agent, "url": url} if url else {"agent": agent}
+        metrics.ADMISSION_ACTIVE.set_function(lambda: self.active, **self._labels)
+        metrics.ADMISSION_QUEUED.set_function(lambda: len(self._waiters), **self._labels)
+
+    @classmethod
+    def from_env(cls, agent: str, url: Optional[str] = None) -> "AdmissionController":
+        return cls(
+            agent,
+            max_concurrent=int(_agent_env("A2A_MAX_CONCURRENCY", agent, 16)),
+            max_queue=int(_agent_env("A2A_MAX_QUEUE", agent, 64)),
+            queue_timeout=_agent_env("A2A_QUEUE_TIMEOUT", agent, 10.0),
+            url=url,
+        )
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _has_free_slot(self) -> bool:
+        # 有人排队时新请求不插队
+        return self.active < self.max_concurrent and not self._waiters
+
+    @property
+    def saturated(self) -> bool:
+        return not self._has_free_slot()
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        metrics.ADMISSION_REJECTED.inc(reason=reason, **self._labels)
+        backlog = (len(self._waiters) + 1) / self.max_concurrent
+        return AdmissionRejected(reason, min(60.0, self._avg_hold * backlog))
+
+    def try_acquire(self) -> Optional[Callable[[], None]]:
+        """不排队的准入（用于推测执行等可选负载）；没有空闲名额时返回 None。"""
+        if not self._has_free_slot():
+            return None
+        self.active += 1
+        return self._release_fn(time.monotonic())
+
+    async def acquire(self) -> Callable[[], None]:
+        """取得一个执行名额，返回对应的释放函数（重复调用只生效一次）；饱和时抛出 AdmissionRejected。"""
+        start = time.monotonic()
+        if self._has_free_slot():
+            self.active += 1
+            return self._release_fn(start)
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # shield：超时或取消时 waiter 不被取消，便于判断名额是否已经交接过来
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                raise self._reject("queue_timeout") from None
+        except BaseException:
+            if waiter.done():
+                self._hand_over()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return self._release_fn(start)
+
+    def _hand_over(self) -> None:
+        """释放一个名额：有排队者时直接交接给队首（active 不变），否则归还。"""
+        if self._waiters:
+            self._waiters.popleft().set_result(None)
+        else:
+            self.active -= 1
+
+    def _release_fn(self, requested: float) -> Callable[[], None]:
+        admitted = time.monotonic()
+        metrics.ADMISSION_WAIT.observe(admitted - requested, **self._labels)
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if released:
+                return
+            released = True
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * (time.monotonic() - admitted)
+            self._hand_over()
+
+        return release
+
+
+class ClientRateLimiter:
+    """按客户端的令牌桶：每秒补充 rate 个令牌，最多累积 burst 个；客户端数量按 LRU 限长。"""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()  # client -> (tokens, updated_at)
+
+    def check(self, client: str) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            metrics.ADMISSION_REJECTED.inc(agent="client", reason="rate_limited")
+            raise AdmissionRejected("rate_limited", (1 - tokens) / self.rate)
+        self._buckets[client] = (tokens - 1, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+
+# 客户端限速默认关闭（A2A_CLIENT_RATE=0）：经共享的 UI 后端接入时所有用户来自同一 IP，开启前需确认客户端标识可区分终端用户
+CLIENT_LIMITER = ClientRateLimiter(
+    rate=float(os.getenv("A2A_CLIENT_RATE", 0)),
+    burst=float(os.getenv("A2A_CLIENT_BURST", 10)),
+)
+# 可信调用方（如代终端用户转发请求的 UI 后端）携带的令牌（请求头 X-A2A-Client-Token）；只有它们的 user 字段会被采信
+TRUSTED_CLIENT_TOKEN_ENV = "A2A_TRUSTED_CLIENT_TOKEN"
+_CONTROLLERS: Dict[Tuple[str, Optional[str]], AdmissionController] = {}
+
+
+def controller(agent: str, url: Optional[str] = None) -> AdmissionController:
+    """Agent 的并发准入；指定 url 时为该副本单独的准入，同一 Agent 的各副本互不占用名额。"""
+    key = (agent, url)
+    if key not in _CONTROLLERS:
+        _CONTROLLERS[key] = AdmissionController.from_env(agent, url)
+    return _CONTROLLERS[key]
+
+
+def client_key(user: Optional[str], http_request: Optional[Request] = None) -> str:
+    """限速所用的客户端标识：默认取对端 IP；请求体的 user 字段可由客户端任意填写，
+    只有携带有效 A2A_TRUSTED_CLIENT_TOKEN 的调用方才按 user 区分。"""
+    token = os.getenv(TRUSTED_CLIENT_TOKEN_ENV)
+    presented = http_request.headers.get("X-A2A-Client-Token") if http_request is not None else None
+    if user and token and presented and hmac.compare_digest(presented, token):
+        return f"user:{user}"
+    client = http_request.client if http_request is not None else None
+    return f"ip:{client.host}" if client else "anonymous"
+
+
+def mount_admission(app: FastAPI) -> None:
+    """把 AdmissionRejected 统一转换为 429 + Retry-After 响应。"""
+
+    @app.exception_handler(AdmissionRejected)
+    async def admission_rejected(request: Request, exc: AdmissionRejected) -> JSONResponse:
+        return exc.response()
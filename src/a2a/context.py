@@ -0,0 +1,81 @@
+import math
+import os
+from typing import List, Sequence, Tuple
+
+from src.a2a.protocol import AgentMessage
+
+# 对话上下文组装：固定的系统提示词前缀 + 早前对话摘要 + 最近若干轮原文，总量受 token 预算约束。
+# 系统提示词不再拼接用户问题，使每轮请求的前缀字节一致，上游服务的 prompt cache 可以命中；
+# 超出预算时按 TRIM_STEP 条消息为粒度整块丢弃最早的消息，使截断点在连续多轮中保持不变，缓存前缀也随之稳定。
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("A2A_CONTEXT_TOKENS", 6000))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("A2A_SUMMARY_TOKENS", 400))
+TRIM_STEP = 8
+# 摘要中每条早前消息保留的字符数
+SUMMARY_SNIPPET_CHARS = 60
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：非 ASCII 字符（中文等）按 1 个计，ASCII 按 4 个字符 1 个计；不依赖具体模型的分词器。"""
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + math.ceil((len(text) - non_ascii) / 4) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize(messages: Sequence[AgentMessage], budget: int = SUMMARY_TOKEN_BUDGET) -> str:
+    """被截断的早前对话的抽取式摘要（每条消息取开头片段），不额外调用 LLM；超出预算时保留较新的部分。"""
+    lines: List[str] = []
+    used = estimate_tokens("早前对话摘要：")
+    for message in reversed(messages):
+        snippet = " ".join(message.content.split())
+        if len(snippet) > SUMMARY_SNIPPET_CHARS:
+            snippet = snippet[:SUMMARY_SNIPPET_CHARS] + "…"
+        line = f"- {'用户' if message.role == 'user' else '助手'}：{snippet}"
+        cost = estimate_tokens(line)
+        if used + cost > budget:
+            break
+        lines.append(line)
+        used += cost
+    return "早前对话摘要：\n" + "\n".join(reversed(lines)) if lines else ""
+
+
+def trim_history(
+    messages: Sequence[AgentMessage], budget: int = CONTEXT_TOKEN_BUDGET, step: int = TRIM_STEP
+) -> Tuple[List[AgentMessage], List[AgentMessage]]:
+    """返回 (被截断的早前消息, 保留的最近消息)。
+
+    丢弃条数向上取整到 step 的倍数；最后一条消息（当前问题）始终保留。
+    """
+    messages = list(messages)
+    costs = [estimate_tokens(m.content) for m in messages]
+    total = sum(costs)
+    drop = 0
+    while total > budget and drop < len(messages) - 1:
+        total -= costs[drop]
+        drop += 1
+    if drop:
+        drop = min(math.ceil(drop / step) * step, len(messages) - 1)
+    return messages[:drop], messages[drop:]
+
+
+def build_chat_messages(
+    system_prompt: str, messages: Sequence[AgentMessage], budget: int = CONTEXT_TOKEN_BUDGET
+) -> list:
+    """按预算组装发给 LLM 的消息列表：[系统提示词, (早前对话摘要), 最近消息...]。"""
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+    # 客户端传入的 system 消息放在固定前缀之后，不改变前缀本身
+    extra_system = [m.content for m in messages if m.role == "system"]
+    dialog = [m for m in messages if m.role != "system"]
+    budget -= estimate_tokens(system_prompt) + sum(estimate_tokens(s) for s in extra_system)
+    older, recent = trim_history(dialog, budget=max(budget - SUMMARY_TOKEN_BUDGET, 0))
+
+    result = [SystemMessage(content=system_prompt)]
+    result += [SystemMessage(content=s) for s in extra_system]
+    summary = summarize(older)
+    if summary:
+        result.append(SystemMessage(content=summary))
+    for message in recent:
+        cls = AIMessage if message.role == "assistant" else HumanMessage
+        result.append(cls(content=message.content))
+    return result
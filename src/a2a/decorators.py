@@ -0,0 +1,69 @@
+# python_a2a 的 @agent/@skill 的轻量等价实现：记录相同的元数据（func._skill_info、cls.name/description/version），
+# 但不在导入时加载 python_a2a（其包初始化耗时数秒），仅在访问 agent_card 或调用 run() 时才按需导入。
+
+
+def skill(name, description=None, tags=None, examples=None):
+    """将方法登记为 A2A skill，元数据格式与 python_a2a.skill 一致。"""
+
+    def decorator(func):
+        func_doc = func.__doc__ or ""
+        parsed_examples = []
+        if examples is None and "Examples:" in func_doc:
+            parsed_examples = [
+                line.strip().strip('"`\'')
+                for line in func_doc.split("Examples:", 1)[1].split("\n")
+                if line.strip()
+            ]
+        func._skill_info = {
+            "id": func.__name__,
+            "name": name or func.__name__.replace("_", " ").title(),
+            "description": description or func_doc.split("\n\n")[0].strip(),
+            "tags": tags or [],
+            "examples": examples or parsed_examples,
+        }
+        return func
+
+    return decorator
+
+
+def agent(name, description=None, version=None, **kwargs):
+    """声明 A2A Agent 类；agent_card 与 run() 首次使用时才导入 python_a2a。"""
+
+    def decorator(cls):
+        cls.name = name or cls.__name__
+        cls.description = description or cls.__doc__ or ""
+        cls.version = version or "1.0.0"
+        for key, value in kwargs.items():
+            setattr(cls, key, value)
+
+        def agent_card(self):
+            from python_a2a.models.agent import AgentCard, AgentSkill
+
+            # 在类上查找 skill：对实例 getattr 会再次触发 agent_card 等 property
+            owner = type(self)
+            skills = [
+                AgentSkill(**getattr(owner, attr)._skill_info)
+                for attr in dir(owner)
+                if not attr.startswith("__") and hasattr(getattr(owner, attr), "_skill_info")
+            ]
+            return AgentCard(
+                name=cls.name,
+                description=cls.description,
+                url=getattr(self, "url", None),
+                version=cls.version,
+                skills=skills,
+            )
+
+        def run(self, host="0.0.0.0", port=None):
+            from python_a2a.server import run_server
+
+            if port is not None:
+                run_server(self, host=host, port=port)
+            else:
+                run_server(self, host=host)
+
+        cls.agent_card = property(agent_card)
+        cls.run = run
+        return cls
+
+    return decorator
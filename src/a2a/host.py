@@ -0,0 +1,38 @@
+import os
+import sys
+# Add project root to sys.path to allow running as script
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import uvicorn
+from fastapi import FastAPI
+from src.a2a import receptionist, sales_consultant, tech_expert
+from src.a2a.registry import agent_capabilities, parse_agent_args
+
+# 单进程托管模式：Receptionist 与各专家 Agent 运行在同一个进程与事件循环中。
+# Receptionist 到专家的调用直接 await 专家的路由函数，流式响应在进程内逐块传递，不经 localhost HTTP 与 JSON 重序列化；
+# 专家应用仍挂载在 /agents/<name> 下，便于单独调试。分布式部署继续使用各自独立的 HTTP 服务。
+
+LOCAL_AGENTS = [
+    (tech_expert.TechExpertAgent, tech_expert.chat_completions, tech_expert.app),
+    (sales_consultant.SalesConsultantAgent, sales_consultant.chat_completions, sales_consultant.app),
+]
+
+
+def create_host_app() -> FastAPI:
+    registry = receptionist.agent_registry
+    # 去掉默认的 HTTP 静态实例，专家请求全部在进程内处理；外部副本仍可通过 /registry/register 加入
+    for instance in [i for i in registry.instances.values() if i.static and i.handler is None]:
+        registry.deregister(instance.url, force=True)
+    for agent_cls, handler, agent_app in LOCAL_AGENTS:
+        registry.register_local(agent_cls.name, agent_capabilities(agent_cls), handler)
+        # 挂载的子应用不执行其 lifespan，因此不会再向注册中心发送心跳
+        receptionist.app.mount(f"/agents/{agent_cls.name.lower()}", agent_app)
+    print(f"[startup] 单进程托管模式，进程内 Agent: {', '.join(cls.name for cls, _, _ in LOCAL_AGENTS)}", flush=True)
+    return receptionist.app
+
+
+app = create_host_app()
+
+if __name__ == "__main__":
+    args = parse_agent_args(default_port=8000)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.a2a import metrics
+
+# Receptionist 的本地意图分类：先走关键词规则，再走最近质心模型，置信度不足时才回退到 LLM。
+# 质心向量由各专家 Agent 的 @skill examples 构建；文本向量采用字符 n-gram 哈希，无需外部 Embedding 服务，单次分类为毫秒级。
+# LLM 兜底的分类结果写入 ClassificationCache，相同或相近的问题再次出现时不再调用 LLM。
+
+CATEGORIES = ("TECHNICAL", "SALES", "GENERAL")
+
+# 明确的关键词规则：只命中一个类别时直接采用，同时命中多个类别交给质心模型判断
+KEYWORD_RULES: Dict[str, List[str]] = {
+    "TECHNICAL": [
+        r"报错|异常|bug|debug|排查|部署|架构|数据库|索引|接口|api|sdk|代码|编程|性能优化|并发|缓存|微服务|kubernetes|k8s|docker",
+    ],
+    "SALES": [
+        r"价格|报价|定价|多少钱|费用|收费|折扣|优惠|购买|采购|试用|合同|发票|商务合作|代理商|套餐",
+    ],
+    "GENERAL": [
+        r"^\s*(你好|您好|嗨|hi|hello|在吗|谢谢|感谢|再见|早上好|晚上好)[\s!！。.~？?]*$",
+    ],
+}
+
+# 接待员自身处理的通用问题示例（专家 Agent 的示例来自其 @skill）
+GENERAL_EXAMPLES = [
+    "你好",
+    "在吗？",
+    "你是谁？",
+    "谢谢你的帮助",
+    "你们公司在哪里？",
+    "你能做些什么？",
+]
+
+EMBED_DIM = 2048
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[^\sa-z0-9]")
+
+
+def embed_text(text: str, dim: int = EMBED_DIM) -> np.ndarray:
+    """字符 unigram + bigram（英文按单词）哈希到定长向量并做 L2 归一化。"""
+    tokens = [t for t in _TOKEN_RE.findall(text.lower()) if t.isalnum()]
+    grams = tokens + [a + b for a, b in zip(tokens, tokens[1:])]
+    vec = np.zeros(dim, dtype=np.float32)
+    for g in grams:
+        vec[zlib.crc32(g.encode("utf-8")) % dim] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def skill_examples(agents: Dict[str, type]) -> Dict[str, List[str]]:
+    """收集各 Agent 类上 @skill 方法声明的 examples，按路由类别分组。"""
+    examples: Dict[str, List[str]] = {}
+    for category, agent_cls in agents.items():
+        for attr in vars(agent_cls).values():
+            info = getattr(attr, "_skill_info", None)
+            if info:
+                examples.setdefault(category, []).extend(info.get("examples") or [])
+    return examples
+
+
+class IntentClassifier:
+    """规则 + 最近质心分类器；置信度为最相似与次相似质心的余弦相似度之差。"""
+
+    def __init__(self, examples: Dict[str, List[str]], threshold: Optional[float] = None, rules=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("A2A_INTENT_THRESHOLD", 0.1))
+        self.labels = [c for c in CATEGORIES if examples.get(c)]
+        centroids = [np.mean([embed_text(e) for e in examples[c]], axis=0) for c in self.labels]
+        self.centroids = np.stack(centroids)
+        self.centroids /= np.linalg.norm(self.centroids, axis=1, keepdims=True)
+        self.rules = {
+            c: re.compile("|".join(patterns), re.IGNORECASE)
+            for c, patterns in (rules if rules is not None else KEYWORD_RULES).items()
+        }
+        metrics.INTENT_THRESHOLD.set(self.threshold)
+
+    def predict(self, text: str) -> Tuple[Optional[str], float, str]:
+        """返回 (类别, 置信度, 来源)；置信度低于阈值时类别为 None，应回退到 LLM。"""
+        hits = [c for c, pattern in self.rules.items() if pattern.search(text)]
+        if len(hits) == 1:
+            return hits[0], 1.0, "rule"
+        sims = self.centroids @ embed_text(text)
+        order = np.argsort(sims)[::-1]
+        margin = float(sims[order[0]] - sims[order[1]]) if len(order) > 1 else float(sims[order[0]])
+        if margin >= self.threshold:
+            return self.labels[order[0]], margin, "centroid"
+        return None, margin, "centroid"
+
+    def guess(self, text: str) -> str:
+        """不考虑阈值的最近质心类别，用于推测路由。"""
+        return self.labels[int(np.argmax(self.centroids @ embed_text(text)))]
+
+    def classify(self, text: str) -> Optional[str]:
+        """本地分类并记录指标；返回 None 表示需要 LLM 兜底。"""
+        start = time.perf_counter()
+        category, confidence, source = self.predict(text)
+        metrics.INTENT_SECONDS.observe(time.perf_counter() - start)
+        if source == "centroid":
+            metrics.INTENT_CONFIDENCE.observe(confidence)
+        metrics.INTENT_DECISIONS.inc(source=source if category else "llm")
+        return category
+
+
+_NORMALIZE_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """缓存键：NFKC 归一化、转小写并去掉空白与标点。"""
+    return _NORMALIZE_RE.sub("", unicodedata.normalize("NFKC", text).lower())
+
+
+class ClassificationCache:
+    """LLM 分类结果缓存：精确层按归一化文本命中，语义层复用向量相似度超过阈值的已缓存问题的类别。
+
+    向量保存在预分配矩阵中，语义查找为一次矩阵乘；容量满时按 LRU 淘汰并复用其槽位。
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, similarity: Optional[float] = None):
+        self.max_entries = max_entries or int(os.getenv("A2A_INTENT_CACHE_SIZE", 1024))
+        self.similarity = similarity if similarity is not None else float(os.getenv("A2A_INTENT_CACHE_SIMILARITY", 0.85))
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # key -> (label, slot)
+        self._vectors = np.zeros((self.max_entries, EMBED_DIM), dtype=np.float32)
+        self._slot_keys: List[Optional[str]] = [None] * self.max_entries
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        metrics.INTENT_CACHE_SIZE.set_function(lambda: len(self._entries))
+
+    def get(self, text: str) -> Optional[str]:
+        key = normalize_text(text)
+        hit = self._entries.get(key)
+        if hit is not None:
+            self._entries.move_to_end(key)
+            metrics.INTENT_CACHE_LOOKUPS.inc(tier="exact")
+            return hit[0]
+        if self._entries:
+            sims = self._vectors @ embed_text(key)
+            slot = int(np.argmax(sims))
+            cached_key = self._slot_keys[slot]
+            if cached_key is not None and sims[slot] >= self.similarity:
+                self._entries.move_to_end(cached_key)
+                metrics.INTENT_CACHE_LOOKUPS.inc(tier="semantic")
+                return self._entries[cached_key][0]
+        metrics.INTENT_CACHE_LOOKUPS.inc(tier="miss")
+        return None
+
+    def put(self, text: str, label: str) -> None:
+        key = normalize_text(text)
+        if not key:
+            return
+        if key in self._entries:
+            self._entries[key] = (label, self._entries[key][1])
+            self._entries.move_to_end(key)
+            return
+        if not self._free:
+            _, (_, slot) = self._entries.popitem(last=False)
+            self._vectors[slot] = 0.0
+            self._slot_keys[slot] = None
+            self._free.append(slot)
+        slot = self._free.pop()
+        self._vectors[slot] = embed_text(key)
+        self._slot_keys[slot] = key
+        self._entries[key] = (label, slot)
+
+    def __len__(self) -> int:
+        return len(self._entries)
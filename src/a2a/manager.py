@@ -1,92 +1,258 @@
+import argparse
+import os
+import signal
 import subprocess
 import sys
 import time
-import signal
-import os
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import httpx
+
+# 健康检查就绪等待、重启退避与日志轮转参数
+READY_TIMEOUT = float(os.getenv("A2A_READY_TIMEOUT", 60.0))
+RESTART_BACKOFF_INITIAL = 1.0
+RESTART_BACKOFF_MAX = 30.0
+# 子进程连续运行超过该时长视为稳定，重启退避复位
+STABLE_AFTER = 60.0
+LOG_BACKUPS = int(os.getenv("A2A_LOG_BACKUPS", 5))
+# 额外副本的端口从该值起依次分配，跳过各 Agent 的基础端口与同机其它服务占用的端口（嵌入服务 8003、LLM 替身 8010）
+REPLICA_PORT_BASE = int(os.getenv("A2A_REPLICA_PORT_BASE", 8100))
+RESERVED_PORTS = {int(p) for p in os.getenv("A2A_RESERVED_PORTS", "8003,8010").split(",") if p.strip()}
+
+AGENTS = [
+    {
+        "name": "TechExpert",
+        "module": "src.a2a.tech_expert",
+        "port": 8001
+    },
+    {
+        "name": "SalesConsultant",
+        "module": "src.a2a.sales_consultant",
+        "port": 8005
+    },
+    {
+        "name": "Receptionist",
+        "module": "src.a2a.receptionist",
+        "port": 8000
+    }
+]
+# Receptionist 作为入口只运行一个
+REPLICABLE_AGENTS = [agent["name"] for agent in AGENTS if agent["name"] != "Receptionist"]
+
+
+@dataclass
+class ChildProcess:
+    name: str
+    module: str
+    port: int
+    process: Optional[subprocess.Popen] = None
+    log_file: Optional[object] = None
+    started_at: float = 0.0
+    restarts: int = 0
+    backoff: float = RESTART_BACKOFF_INITIAL
+    restart_at: Optional[float] = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.port}"
+
+    @property
+    def health_url(self) -> str:
+        return f"http://localhost:{self.port}/health"
+
+
+def rotate_log(path: str, backups: int = LOG_BACKUPS) -> None:
+    """name.log -> name.log.1 -> ... -> name.log.N，超出的最旧日志被删除。"""
+    if not os.path.exists(path):
+        return
+    for i in range(backups - 1, 0, -1):
+        src = f"{path}.{i}"
+        if os.path.exists(src):
+            os.replace(src, f"{path}.{i + 1}")
+    os.replace(path, f"{path}.1")
+
+
+def venv_python() -> str:
+    """快速启动路径：直接使用项目虚拟环境（.venv）的解释器，不存在时使用当前解释器。"""
+    bin_dir = "Scripts" if os.name == "nt" else "bin"
+    candidate = os.path.join(os.getcwd(), ".venv", bin_dir, "python.exe" if os.name == "nt" else "python")
+    return candidate if os.path.exists(candidate) else sys.executable
+
 
 class AgentManager:
-    def __init__(self):
-        self.processes: List[subprocess.Popen] = []
-        self.agents = [
-            {
-                "name": "TechExpert",
-                "module": "src.a2a.tech_expert",
-                "port": 8001
-            },
-            {
-                "name": "SalesConsultant",
-                "module": "src.a2a.sales_consultant",
-                "port": 8002
-            },
-            {
-                "name": "Receptionist",
-                "module": "src.a2a.receptionist",
-                "port": 8000
-            }
-        ]
+    def __init__(self, replicas: Optional[Dict[str, int]] = None, launcher: str = "direct", single_process: bool = False):
+        self.agents = [dict(agent) for agent in AGENTS]
+        if single_process:
+            # 单进程托管模式：所有 Agent 在同一进程内，入口端口与 Receptionist 相同
+            self.agents = [{"name": "Receptionist", "module": "src.a2a.host", "port": 8000}]
         self.log_dir = "logs"
         os.makedirs(self.log_dir, exist_ok=True)
+        self.children = self._plan_children(replicas or {})
+        self._stopping = False
+        self.launcher = launcher
+        self.python = venv_python()
 
-    def start_all(self):
-        """启动所有 Agent 服务"""
-        print("🚀 正在启动 A2A Agent 系统...")
-        
+    def _plan_children(self, replicas: Dict[str, int]) -> List[ChildProcess]:
+        """每个 Agent 的首个副本使用其基础端口，额外副本从 REPLICA_PORT_BASE 起分配未被占用的端口。"""
+        taken = RESERVED_PORTS | {agent["port"] for agent in self.agents}
+        conflicts = sorted(agent["port"] for agent in self.agents if agent["port"] in RESERVED_PORTS)
+        if conflicts:
+            raise ValueError(f"Agent 端口与保留端口冲突: {conflicts}")
+        children: List[ChildProcess] = []
+        port = REPLICA_PORT_BASE
         for agent in self.agents:
-            log_file = open(os.path.join(self.log_dir, f"{agent['name'].lower()}.log"), "w")
-            
-            # 使用 uv run python -m 方式启动，确保路径正确
-            cmd = ["uv", "run", "python", "-m", agent["module"]]
-            
-            try:
-                process = subprocess.Popen(
-                    cmd,
-                    stdout=log_file,
-                    stderr=subprocess.STDOUT,
-                    cwd=os.getcwd()
-                )
-                self.processes.append({
-                    "process": process,
-                    "name": agent["name"],
-                    "log_file": log_file
-                })
-                print(f"✅ {agent['name']} 已启动 (PID: {process.pid}, Port: {agent['port']})")
-            except Exception as e:
-                print(f"❌ {agent['name']} 启动失败: {e}")
+            children.append(ChildProcess(agent["name"], agent["module"], agent["port"]))
+            for _ in range(replicas.get(agent["name"], 1) - 1):
+                while port in taken:
+                    port += 1
+                taken.add(port)
+                children.append(ChildProcess(agent["name"], agent["module"], port))
+        return children
+
+    def _spawn(self, child: ChildProcess) -> None:
+        log_path = os.path.join(self.log_dir, f"{child.name.lower()}-{child.port}.log")
+        rotate_log(log_path)
+        child.log_file = open(log_path, "w")
+        if self.launcher == "uv":
+            # uv run 每次启动都会重新解析环境，较慢，但可在未创建虚拟环境时使用
+            cmd = ["uv", "run", "python", "-m", child.module]
+        else:
+            cmd = [self.python, "-m", child.module]
+        child.process = subprocess.Popen(
+            cmd + ["--port", str(child.port)],
+            stdout=child.log_file,
+            stderr=subprocess.STDOUT,
+            cwd=os.getcwd(),
+            env={**os.environ, "A2A_SPAWN_TIME": str(time.time())},
+        )
+        child.started_at = time.monotonic()
+        child.restart_at = None
+
+    def _wait_ready(self, children: List[ChildProcess], timeout: float = READY_TIMEOUT) -> bool:
+        """轮询各子进程的 /health 直到全部返回 200；子进程提前退出或超时返回 False。"""
+        pending = list(children)
+        deadline = time.monotonic() + timeout
+        with httpx.Client(timeout=1.0) as client:
+            while pending:
+                for child in list(pending):
+                    if child.process.poll() is not None:
+                        print(f"❌ {child.label} 启动过程中退出 (code {child.process.returncode})")
+                        return False
+                    try:
+                        if client.get(child.health_url).status_code == 200:
+                            print(f"✅ {child.label} 已就绪 ({time.monotonic() - child.started_at:.1f}s, PID: {child.process.pid})")
+                            pending.remove(child)
+                    except httpx.HTTPError:
+                        pass
+                if pending and time.monotonic() > deadline:
+                    print(f"❌ 等待就绪超时: {', '.join(c.label for c in pending)}")
+                    return False
+                if pending:
+                    time.sleep(0.2)
+        return True
+
+    def start_all(self) -> bool:
+        """启动所有 Agent 服务：专家 Agent 全部就绪后再启动 Receptionist。"""
+        print("🚀 正在启动 A2A Agent 系统...")
+        start = time.monotonic()
+        experts = [c for c in self.children if c.name != "Receptionist"]
+        entry = [c for c in self.children if c.name == "Receptionist"]
+        for group in (experts, entry):
+            for child in group:
+                try:
+                    self._spawn(child)
+                except Exception as e:
+                    print(f"❌ {child.label} 启动失败: {e}")
+                    self.stop_all()
+                    return False
+            if not self._wait_ready(group):
                 self.stop_all()
-                return
+                return False
 
-        print("\n✨ 所有服务已启动运行！日志保存在 logs/ 目录下。")
+        print(f"\n✨ 所有服务已就绪（{time.monotonic() - start:.1f}s）！日志保存在 {self.log_dir}/ 目录下。")
         print("按 Ctrl+C 停止所有服务...")
+        return True
+
+    def supervise_once(self) -> None:
+        """检查子进程：意外退出的按指数退避重启，稳定运行后退避复位。"""
+        now = time.monotonic()
+        for child in self.children:
+            if child.restart_at is not None:
+                if now >= child.restart_at and not self._stopping:
+                    child.restarts += 1
+                    print(f"🔄 重启 {child.label}（第 {child.restarts} 次）")
+                    self._spawn(child)
+                continue
+            code = child.process.poll()
+            if code is None:
+                if now - child.started_at > STABLE_AFTER:
+                    child.backoff = RESTART_BACKOFF_INITIAL
+                continue
+            child.log_file.close()
+            child.restart_at = now + child.backoff
+            print(f"⚠️ 警告: {child.label} 意外退出 (code {code})，{child.backoff:.0f}s 后重启")
+            child.backoff = min(child.backoff * 2, RESTART_BACKOFF_MAX)
 
     def stop_all(self):
         """停止所有 Agent 服务"""
+        self._stopping = True
         print("\n🛑 正在停止服务...")
-        for p_info in reversed(self.processes):
-            process = p_info["process"]
-            name = p_info["name"]
-            log_file = p_info["log_file"]
-            
-            if process.poll() is None:
-                print(f"正在关闭 {name} (PID: {process.pid})...")
+        for child in reversed(self.children):
+            process = child.process
+            if process is not None and process.poll() is None:
+                print(f"正在关闭 {child.label} (PID: {process.pid})...")
                 # 发送 SIGTERM
                 process.terminate()
                 try:
                     process.wait(timeout=5)
                 except subprocess.TimeoutExpired:
                     # 如果超时，发送 SIGKILL
-                    print(f"强制终止 {name}...")
+                    print(f"强制终止 {child.label}...")
                     process.kill()
-            
-            if not log_file.closed:
-                log_file.close()
 
-        self.processes = []
+            if child.log_file is not None and not child.log_file.closed:
+                child.log_file.close()
+            child.process = None
         print("✅ 所有服务已停止。")
 
+
+def parse_replicas(values: List[str]) -> Dict[str, int]:
+    """解析 --replicas TechExpert=3 形式的参数；格式错误、未知 Agent 或副本数小于 1 时抛出 ValueError。"""
+    replicas = {}
+    for value in values:
+        name, sep, count = value.partition("=")
+        if not sep or not count.strip().isdigit():
+            raise ValueError(f"无效的副本参数 {value!r}，应为 NAME=N，如 TechExpert=3")
+        if name not in REPLICABLE_AGENTS:
+            raise ValueError(f"未知或不可多副本运行的 Agent {name!r}，可选: {', '.join(REPLICABLE_AGENTS)}")
+        if int(count) < 1:
+            raise ValueError(f"{name} 的副本数至少为 1")
+        replicas[name] = int(count)
+    return replicas
+
+
 def main():
-    manager = AgentManager()
-    
+    parser = argparse.ArgumentParser(description="A2A Agent 进程管理器")
+    parser.add_argument(
+        "--replicas", nargs="*", default=[], metavar="NAME=N",
+        help="各 Agent 的副本数，如 TechExpert=3（额外副本的端口从 A2A_REPLICA_PORT_BASE 起分配）",
+    )
+    parser.add_argument(
+        "--launcher", choices=["direct", "uv"], default="direct",
+        help="direct：直接执行虚拟环境解释器（默认，启动快）；uv：通过 uv run 启动",
+    )
+    parser.add_argument(
+        "--single-process", action="store_true",
+        help="单进程托管模式：所有 Agent 运行在一个进程内，专家调用不经 HTTP（忽略 --replicas）",
+    )
+    args = parser.parse_args()
+    try:
+        replicas = parse_replicas(args.replicas)
+    except ValueError as e:
+        parser.error(str(e))
+    manager = AgentManager(replicas, launcher=args.launcher, single_process=args.single_process)
+
     # 注册信号处理，确保被杀掉时也能清理子进程
     def signal_handler(sig, frame):
         manager.stop_all()
@@ -96,16 +262,12 @@ def main():
     signal.signal(signal.SIGTERM, signal_handler)
 
     try:
-        manager.start_all()
-        # 保持主进程运行
+        if not manager.start_all():
+            sys.exit(1)
+        # 保持主进程运行，监控并重启意外退出的子进程
         while True:
             time.sleep(1)
-            # 检查子进程是否还活着
-            for p_info in manager.processes:
-                if p_info["process"].poll() is not None:
-                    print(f"⚠️ 警告: {p_info['name']} 意外退出！")
-                    manager.stop_all()
-                    sys.exit(1)
+            manager.supervise_once()
     except KeyboardInterrupt:
         # 已经在 signal_handler 中处理，这里只需捕获避免报错
         pass
@@ -0,0 +1,98 @@
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+
+from src.compliance_warning.metrics import Registry
+
+# A2A 服务的进程内指标，复用合规预警服务的 Registry 实现（Prometheus 文本格式 + JSON 快照）
+REGISTRY = Registry()
+
+PROXY_REQUESTS = REGISTRY.counter("a2a_proxy_requests_total", "代理转发请求数，按 target、status 区分")
+PROXY_ERRORS = REGISTRY.counter("a2a_proxy_errors_total", "代理转发失败次数（上游不可达或中途断开）")
+PROXY_DISCONNECTS = REGISTRY.counter("a2a_proxy_client_disconnects_total", "客户端提前断开、已取消上游请求的次数")
+PROXY_TTFB = REGISTRY.histogram("a2a_proxy_ttfb_seconds", "代理转发首字节时间（秒），从发起上游请求到收到首个响应块")
+PROXY_SECONDS = REGISTRY.histogram("a2a_proxy_seconds", "代理转发总耗时（秒）")
+
+
+def mount_metrics(app: FastAPI) -> None:
+    """为 Agent 服务挂载 /metrics（Prometheus 文本）与 /metrics.json（快照）。"""
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_text() -> PlainTextResponse:
+        return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/metrics.json", include_in_schema=False)
+    async def metrics_json() -> dict:
+        return REGISTRY.snapshot()
+
+INTENT_DECISIONS = REGISTRY.counter("a2a_intent_decisions_total", "意图分类决策数，按 source（rule/centroid/llm）区分")
+INTENT_CONFIDENCE = REGISTRY.histogram(
+    "a2a_intent_confidence", "质心模型的置信度（最相似与次相似质心的相似度差）",
+    buckets=(0.02, 0.05, 0.1, 0.15, 0.2, 0.3, 0.5, 1.0),
+)
+INTENT_SECONDS = REGISTRY.histogram("a2a_intent_local_seconds", "本地意图分类耗时（秒）")
+INTENT_THRESHOLD = REGISTRY.gauge("a2a_intent_threshold", "本地分类的置信度阈值，低于该值回退到 LLM")
+
+
+def _intent_local_ratio() -> float:
+    local = INTENT_DECISIONS.value(source="rule") + INTENT_DECISIONS.value(source="centroid")
+    total = local + INTENT_DECISIONS.value(source="llm")
+    return local / total if total else 0.0
+
+
+INTENT_LOCAL_RATIO = REGISTRY.gauge("a2a_intent_local_hit_ratio", "无需调用 LLM 即完成分类的请求占比")
+INTENT_LOCAL_RATIO.set_function(_intent_local_ratio)
+
+INTENT_CACHE_LOOKUPS = REGISTRY.counter("a2a_intent_cache_lookups_total", "分类缓存查找次数，按 tier（exact/semantic/miss）区分")
+INTENT_CACHE_SIZE = REGISTRY.gauge("a2a_intent_cache_entries", "分类缓存当前条目数")
+
+
+def _intent_cache_hit_ratio() -> float:
+    hits = INTENT_CACHE_LOOKUPS.value(tier="exact") + INTENT_CACHE_LOOKUPS.value(tier="semantic")
+    total = hits + INTENT_CACHE_LOOKUPS.value(tier="miss")
+    return hits / total if total else 0.0
+
+
+INTENT_CACHE_HIT_RATIO = REGISTRY.gauge("a2a_intent_cache_hit_ratio", "分类缓存命中率（精确层 + 语义层）")
+INTENT_CACHE_HIT_RATIO.set_function(_intent_cache_hit_ratio)
+
+SPECULATIONS = REGISTRY.counter("a2a_speculations_total", "推测路由次数，按 outcome（hit/miss/skipped）与 basis（history/centroid）区分")
+SPECULATION_WASTED_BYTES = REGISTRY.counter("a2a_speculation_wasted_bytes_total", "推测失败时丢弃的上游响应字节数")
+SPECULATION_WASTED_DELTAS = REGISTRY.counter(
+    "a2a_speculation_wasted_deltas_total", "推测失败时丢弃的内容增量数（流式 token 片段，近似浪费的 token 数）"
+)
+
+
+def _speculation_accuracy() -> float:
+    hits = sum(SPECULATIONS.value(outcome="hit", basis=b) for b in ("history", "centroid"))
+    total = hits + sum(SPECULATIONS.value(outcome="miss", basis=b) for b in ("history", "centroid"))
+    return hits / total if total else 0.0
+
+
+SPECULATION_ACCURACY = REGISTRY.gauge("a2a_speculation_accuracy", "推测路由命中率")
+SPECULATION_ACCURACY.set_function(_speculation_accuracy)
+
+REGISTRY_PICKS = REGISTRY.counter("a2a_registry_picks_total", "负载均衡选中实例次数，按 agent、url 区分")
+REGISTRY_NO_INSTANCE = REGISTRY.counter("a2a_registry_no_instance_total", "某能力没有健康实例可用的次数")
+
+LLM_REQUESTS = REGISTRY.counter("a2a_llm_requests_total", "Agent 发起的 LLM 生成请求数，按 agent、stream 区分")
+LLM_ERRORS = REGISTRY.counter("a2a_llm_errors_total", "LLM 生成失败次数，按 agent 区分")
+LLM_TOKENS = REGISTRY.counter("a2a_llm_tokens_total", "LLM token 用量，按 agent、kind（prompt/completion）区分")
+LLM_TTFT = REGISTRY.histogram("a2a_llm_ttft_seconds", "流式生成的首 token 时间（秒），按 agent 区分")
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "a2a_llm_tokens_per_second", "流式生成速度（completion tokens / 首 token 之后的生成耗时），按 agent 区分",
+    buckets=(1, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500),
+)
+LLM_SECONDS = REGISTRY.histogram("a2a_llm_seconds", "LLM 生成总耗时（秒），按 agent 区分")
+
+ADMISSION_ACTIVE = REGISTRY.gauge("a2a_admission_active", "正在执行的请求数，按 agent（Receptionist 侧另按副本 url）区分")
+ADMISSION_QUEUED = REGISTRY.gauge("a2a_admission_queued", "等待执行名额的请求数，按 agent（Receptionist 侧另按副本 url）区分")
+ADMISSION_WAIT = REGISTRY.histogram("a2a_admission_wait_seconds", "请求取得执行名额前的排队耗时（秒），按 agent 区分")
+ADMISSION_REJECTED = REGISTRY.counter(
+    "a2a_admission_rejected_total", "准入拒绝（429）次数，按 agent 与 reason（queue_full/queue_timeout/rate_limited）区分"
+)
+
+RESPONSE_CACHE_LOOKUPS = REGISTRY.counter(
+    "a2a_response_cache_lookups_total", "专家回答缓存查询次数，按 agent 与 tier（exact/semantic/miss）区分"
+)
+RESPONSE_CACHE_SIZE = REGISTRY.gauge("a2a_response_cache_entries", "回答缓存当前条目数")
+RESPONSE_CACHE_EMBED_ERRORS = REGISTRY.counter("a2a_response_cache_embed_errors_total", "语义层请求 embedding 服务失败次数")
@@ -22,3 +22,5 @@ class ChatCompletionRequest(BaseModel):
     model: str
     messages: List[AgentMessage]
     stream: bool = False
+    # 终端用户标识（同 OpenAI 协议的 user 字段），接待员据此记住用户上一次的问题类别
+    user: Optional[str] = None
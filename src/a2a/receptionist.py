@@ -1,25 +1,61 @@
+import time
+_MODULE_STARTED = time.perf_counter()
+
+import asyncio
 import os
 import sys
 # Add project root to sys.path to allow running as script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from fastapi import FastAPI
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
-from python_a2a import agent, skill
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 import uvicorn
 from dotenv import load_dotenv
+from src.a2a.intent import GENERAL_EXAMPLES, ClassificationCache, IntentClassifier, skill_examples
+from src.a2a import admission, metrics
+from src.a2a.admission import CLIENT_LIMITER, client_key, mount_admission
+from src.a2a.metrics import mount_metrics
+from src.a2a.decorators import agent, skill
 from src.a2a.protocol import ChatCompletionRequest
-from src.a2a.utils import handle_proxy_request, handle_chat_completion
+from src.a2a.registry import (
+    AgentInstance,
+    AgentRegistry,
+    agent_capabilities,
+    mount_health,
+    mount_registry,
+    parse_agent_args,
+)
+from src.a2a.sales_consultant import SalesConsultantAgent
+from src.a2a.tech_expert import TechExpertAgent
+from src.compliance_warning import tracing
+from src.a2a.utils import (
+    LocalPrefetch,
+    ProxyPrefetch,
+    aget_llm,
+    get_proxy_client,
+    handle_chat_completion,
+    handle_local_request,
+    handle_proxy_request,
+    proxy_client_lifespan,
+    report_startup,
+    system_messages,
+    warm_up_llm,
+)
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model_name="kimi-latest",
-    openai_api_key=os.getenv("KIMI_API_KEY"),
-    openai_api_base=os.getenv("KIMI_API_URL"),
-    temperature=0
-)
+
+# 本地快速分类：质心由各专家 Agent 的 @skill examples 构建，阈值见 A2A_INTENT_THRESHOLD
+intent_classifier = IntentClassifier({
+    **skill_examples({"TECHNICAL": TechExpertAgent, "SALES": SalesConsultantAgent}),
+    "GENERAL": GENERAL_EXAMPLES,
+})
+# LLM 分类结果缓存，容量与语义相似度阈值见 A2A_INTENT_CACHE_SIZE / A2A_INTENT_CACHE_SIMILARITY
+classification_cache = ClassificationCache()
 
 @agent(name="Receptionist", description="分析客户问题类型并路由到合适的专家")
 class ReceptionistAgent:
@@ -30,8 +66,31 @@ class ReceptionistAgent:
         examples=["你们的报价是多少？", "如何优化数据库索引？"]
     )
     async def classify(self, question: str) -> str:
+        return self.classify_local(question) or await self.classify_remote(question)
+
+    def classify_local(self, question: str) -> Optional[str]:
+        """本地规则/质心分类与结果缓存；无把握时返回 None。"""
+        with tracing.span("classify.local") as span:
+            category = intent_classifier.classify(question) or classification_cache.get(question)
+            span.set(category=category or "")
+        return category
+
+    async def classify_remote(self, question: str) -> str:
+        # LLM 分类与通用问答共用 Receptionist 的并发名额
+        with tracing.span("classify.llm") as span:
+            release = await admission.controller(self.name).acquire()
+            try:
+                category = await self.classify_with_llm(question)
+            finally:
+                release()
+            span.set(category=category)
+        classification_cache.put(question, category)
+        return category
+
+    async def classify_with_llm(self, question: str) -> str:
         classify_prompt = f"分析用户输入并返回分类（TECHNICAL/SALES/GENERAL）。仅返回单词本身，不要包含标点符号。\n用户输入: {question}"
-        response = await llm.ainvoke([SystemMessage(content=classify_prompt)])
+        llm = await aget_llm()
+        response = await llm.ainvoke(system_messages(classify_prompt))
         result = response.content.strip().upper()
         # 提取第一个匹配的关键词，防止模型输出多余解释
         for key in ["TECHNICAL", "SALES", "GENERAL"]:
@@ -41,25 +100,152 @@ class ReceptionistAgent:
 
 receptionist_agent = ReceptionistAgent()
 
-app = FastAPI(title="Receptionist Orchestrator Service")
-
-AGENT_ENDPOINTS = {
-    "TECHNICAL": "http://localhost:8001/v1/chat/completions",
-    "SALES": "http://localhost:8005/v1/chat/completions"
+# 路由类别 -> 专家能力（对应专家 @skill 的 tags），具体实例由注册表按负载选择
+CATEGORY_CAPABILITIES = {
+    "TECHNICAL": "technical",
+    "SALES": "sales",
 }
+# 默认单副本地址作为静态实例，专家尚未注册时也可路由；多副本由各实例启动后自行注册
+STATIC_AGENTS = [
+    (TechExpertAgent, "http://localhost:8001"),
+    (SalesConsultantAgent, "http://localhost:8005"),
+]
+
+agent_registry = AgentRegistry()
+for agent_cls, url in STATIC_AGENTS:
+    agent_registry.register(agent_cls.name, url, agent_capabilities(agent_cls), static=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    report_startup("Receptionist", _MODULE_STARTED)
+    warmup = warm_up_llm()  # noqa: F841  持有引用，避免后台任务被回收
+    async with proxy_client_lifespan(app):
+        health_checks = asyncio.create_task(agent_registry.run_health_checks(get_proxy_client()))
+        try:
+            yield
+        finally:
+            health_checks.cancel()
+
+
+app = FastAPI(title="Receptionist Orchestrator Service", lifespan=lifespan)
+mount_metrics(app)
+mount_health(app)
+mount_admission(app)
+tracing.mount_tracing(app, ReceptionistAgent.name)
+mount_registry(app, agent_registry)
+
+
+def _release(instance: AgentInstance):
+    return lambda reachable: agent_registry.release(instance, reachable)
+
+
+def _no_instance(category: str) -> JSONResponse:
+    return JSONResponse({"error": f"no healthy agent available for {category}"}, status_code=503)
+
+
+GENERAL_SYSTEM_PROMPT = "你是一个亲切的接待员。请礼貌地回应用户的日常问候或通用问题，并告知他们你可以提供技术咨询（路由给技术专家）或产品销售咨询（路由给销售顾问）。"
+
+# 推测路由：本地分类无把握时，在 LLM 分类的同时向最可能的专家发起流式请求，缩短首 token 时间
+SPECULATIVE_ROUTING = os.getenv("A2A_SPECULATIVE_ROUTING", "0").lower() in ("1", "true", "yes")
+# 用户上一次的问题类别（按 request.user 记录，LRU 限长），作为推测依据
+_last_category: "OrderedDict[str, str]" = OrderedDict()
+_LAST_CATEGORY_MAX = 10000
+
+
+def remember_category(user: Optional[str], category: str) -> None:
+    if not user:
+        return
+    _last_category[user] = category
+    _last_category.move_to_end(user)
+    if len(_last_category) > _LAST_CATEGORY_MAX:
+        _last_category.popitem(last=False)
+
+
+async def speculative_classify(request: ChatCompletionRequest, user_msg: str):
+    """返回 (类别, 已预取的响应)。
+
+    优先依据用户上一次的类别，否则取最近质心作为推测；推测命中则直接采用预取流，
+    未命中则取消预取请求并记录被浪费的输出。目标 Agent 没有空闲并发名额时不推测（推测是可选负载，过载时最先放弃）。
+    """
+    basis, guess = "history", _last_category.get(request.user or "")
+    if guess is None:
+        basis, guess = "centroid", intent_classifier.guess(user_msg)
+    instance = agent_registry.acquire(CATEGORY_CAPABILITIES[guess]) if guess in CATEGORY_CAPABILITIES else None
+    if instance is None:
+        return await receptionist_agent.classify_remote(user_msg), None
+
+    if instance.handler is not None:
+        gate = admission.controller(instance.name)
+        # 进程内专家由其 handle_chat_completion 自行取得名额，此处只检查是否饱和
+        slot = None if gate.saturated else (lambda: None)
+    else:
+        # 与 handle_proxy_request 相同，按副本计数
+        slot = admission.controller(instance.name, instance.url).try_acquire()
+    if slot is None:
+        agent_registry.release(instance, True)
+        metrics.SPECULATIONS.inc(outcome="skipped", basis=basis)
+        return await receptionist_agent.classify_remote(user_msg), None
+
+    def on_complete(reachable: bool) -> None:
+        slot()
+        agent_registry.release(instance, reachable)
+
+    if instance.handler is not None:
+        prefetch = LocalPrefetch(instance.url, instance.handler, request, on_complete=on_complete)
+    else:
+        prefetch = ProxyPrefetch(instance.chat_url, request.model_dump(), on_complete=on_complete)
+    try:
+        category = await receptionist_agent.classify_remote(user_msg)
+    except BaseException:
+        await prefetch.abort()
+        raise
+    if category == guess:
+        metrics.SPECULATIONS.inc(outcome="hit", basis=basis)
+        return category, await prefetch.commit()
+
+    metrics.SPECULATIONS.inc(outcome="miss", basis=basis)
+    wasted_bytes, wasted_deltas = await prefetch.abort()
+    metrics.SPECULATION_WASTED_BYTES.inc(wasted_bytes)
+    metrics.SPECULATION_WASTED_DELTAS.inc(wasted_deltas)
+    return category, None
+
 
 @app.post("/v1/chat/completions")
-async def orchestrate(request: ChatCompletionRequest):
+async def orchestrate(request: ChatCompletionRequest, http_request: Request):
+    # 入口按客户端限速，超出时抛出 AdmissionRejected（429），不再消耗分类与生成资源
+    CLIENT_LIMITER.check(client_key(request.user, http_request))
     user_msg = request.messages[-1].content
-    
-    category = await receptionist_agent.classify(user_msg)
-    target_url = AGENT_ENDPOINTS.get(category)
-    
-    if not target_url:
-        system_prompt = "你是一个亲切的接待员。请礼貌地回应用户的日常问候或通用问题，并告知他们你可以提供技术咨询（路由给技术专家）或产品销售咨询（路由给销售顾问）。"
-        return await handle_chat_completion(request, llm, system_prompt)
 
-    return await handle_proxy_request(target_url, request.model_dump(), request.stream)
+    response = None
+    category = receptionist_agent.classify_local(user_msg)
+    if category is None and SPECULATIVE_ROUTING and request.stream:
+        with tracing.span("speculate"):
+            category, response = await speculative_classify(request, user_msg)
+    elif category is None:
+        category = await receptionist_agent.classify_remote(user_msg)
+    remember_category(request.user, category)
+    if response is not None:
+        return response
+    capability = CATEGORY_CAPABILITIES.get(category)
+
+    if not capability:
+        return await handle_chat_completion(request, await aget_llm(), GENERAL_SYSTEM_PROMPT, agent=ReceptionistAgent.name)
+
+    instance = agent_registry.acquire(capability)
+    if instance is None:
+        return _no_instance(category)
+    if instance.handler is not None:
+        return await handle_local_request(instance.handler, request, on_complete=_release(instance))
+    return await handle_proxy_request(
+        instance.chat_url,
+        request.model_dump(),
+        request.stream,
+        on_complete=_release(instance),
+        agent=instance.name,
+        agent_url=instance.url,
+    )
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    args = parse_agent_args(default_port=8000)
+    uvicorn.run(app, host=args.host, port=args.port)
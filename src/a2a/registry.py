@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import hmac
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+import httpx
+from fastapi import Depends, FastAPI, Header, HTTPException, Request
+from pydantic import BaseModel
+
+from src.a2a import metrics
+from src.a2a.utils import report_startup, warm_up_llm
+
+# Agent 服务注册表：专家 Agent 启动后按心跳向 Receptionist 注册自身地址与能力（来自 @agent/@skill 元数据），
+# Receptionist 定期探测各实例 /health，并在同一能力的健康副本间按进行中请求数最少（least-outstanding）选择转发目标。
+
+REGISTRY_URL_ENV = "A2A_REGISTRY_URL"
+HEARTBEAT_INTERVAL = float(os.getenv("A2A_HEARTBEAT_INTERVAL", 5.0))
+HEALTH_CHECK_INTERVAL = float(os.getenv("A2A_HEALTH_CHECK_INTERVAL", 5.0))
+# 超过该时长未收到心跳的动态注册实例被移除
+INSTANCE_TTL = float(os.getenv("A2A_INSTANCE_TTL", 3 * HEARTBEAT_INTERVAL))
+# 注册/注销接口的共享令牌（请求头 X-Registry-Token）；未设置时只接受本机回环地址发来的注册
+REGISTRY_TOKEN_ENV = "A2A_REGISTRY_TOKEN"
+_LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+
+class AgentRegistration(BaseModel):
+    name: str
+    url: str
+    capabilities: List[str] = []
+
+
+@dataclass
+class AgentInstance:
+    name: str
+    url: str
+    capabilities: Set[str]
+    static: bool = False
+    healthy: bool = True
+    outstanding: int = 0
+    last_seen: float = field(default_factory=time.monotonic)
+    # 单进程托管模式下的进程内处理函数（专家的 chat_completions 路由函数），为 None 表示经 HTTP 转发
+    handler: Optional[Callable] = None
+
+    @property
+    def chat_url(self) -> str:
+        return self.url.rstrip("/") + "/v1/chat/completions"
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "url": self.url,
+            "capabilities": sorted(self.capabilities),
+            "static": self.static,
+            "local": self.handler is not None,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "last_seen_ago": round(time.monotonic() - self.last_seen, 1),
+        }
+
+
+def agent_capabilities(agent_cls: type) -> List[str]:
+    """Agent 的能力集合：其 @skill 的 id 与 tags。"""
+    capabilities: Set[str] = set()
+    for attr in vars(agent_cls).values():
+        info = getattr(attr, "_skill_info", None)
+        if info:
+            capabilities.add(info["id"])
+            capabilities.update(info.get("tags") or [])
+    return sorted(capabilities)
+
+
+class AgentRegistry:
+    def __init__(self):
+        self.instances: Dict[str, AgentInstance] = {}  # url -> 实例
+
+    def register(self, name: str, url: str, capabilities, static: bool = False) -> AgentInstance:
+        url = url.rstrip("/")
+        instance = self.instances.get(url)
+        if instance is None or instance.name != name:
+            # 静态配置的地址不会因动态注册变成可被注销、可过期的实例
+            static = static or (instance is not None and instance.static)
+            instance = self.instances[url] = AgentInstance(name, url, set(capabilities), static=static)
+        else:
+            instance.capabilities = set(capabilities)
+            instance.last_seen = time.monotonic()
+            instance.healthy = True  # 心跳即存活证明，无需等待下一轮健康检查
+        return instance
+
+    def register_local(self, name: str, capabilities, handler: Callable) -> AgentInstance:
+        """登记同进程内的 Agent：请求直接调用其处理函数，不经网络与 JSON 重序列化。"""
+        url = f"local://{name}"
+        instance = self.instances[url] = AgentInstance(name, url, set(capabilities), static=True, handler=handler)
+        return instance
+
+    def deregister(self, url: str, force: bool = False) -> bool:
+        """注销动态注册的实例；静态配置与进程内实例只能由本进程以 force=True 移除（注销接口不可移除）。"""
+        url = url.rstrip("/")
+        instance = self.instances.get(url)
+        if instance is None or (instance.static and not force):
+            return False
+        del self.instances[url]
+        return True
+
+    def candidates(self, capability: str) -> List[AgentInstance]:
+        return [i for i in self.instances.values() if i.healthy and capability in i.capabilities]
+
+    def acquire(self, capability: str) -> Optional[AgentInstance]:
+        """选出进行中请求数最少的健康副本（并列时随机）并计入一次进行中请求；无可用实例返回 None。"""
+        candidates = self.candidates(capability)
+        if not candidates:
+            metrics.REGISTRY_NO_INSTANCE.inc(capability=capability)
+            return None
+        least = min(i.outstanding for i in candidates)
+        instance = random.choice([i for i in candidates if i.outstanding == least])
+        instance.outstanding += 1
+        metrics.REGISTRY_PICKS.inc(agent=instance.name, url=instance.url)
+        return instance
+
+    @staticmethod
+    def release(instance: AgentInstance, reachable: bool = True) -> None:
+        """请求结束时调用；上游不可达时立即摘除该实例，等待健康检查恢复。"""
+        instance.outstanding = max(0, instance.outstanding - 1)
+        if not reachable:
+            instance.healthy = False
+
+    async def check_health(self, client: httpx.AsyncClient) -> None:
+        now = time.monotonic()
+        for url, instance in list(self.instances.items()):
+            if not instance.static and now - instance.last_seen > INSTANCE_TTL:
+                del self.instances[url]
+                continue
+
+        async def probe(instance: AgentInstance) -> None:
+            try:
+                resp = await client.get(instance.url + "/health", timeout=2.0)
+                healthy = resp.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if healthy != instance.healthy:
+                print(f"{'✅' if healthy else '⚠️'} {instance.name} {instance.url} {'恢复健康' if healthy else '健康检查失败'}")
+            instance.healthy = healthy
+
+        await asyncio.gather(*(probe(i) for i in list(self.instances.values()) if i.handler is None))
+
+    async def run_health_checks(self, client: httpx.AsyncClient, interval: float = HEALTH_CHECK_INTERVAL) -> None:
+        while True:
+            await self.check_health(client)
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> List[dict]:
+        return [i.as_dict() for i in self.instances.values()]
+
+
+def registry_headers() -> Dict[str, str]:
+    """专家 Agent 调用注册/注销接口时携带的请求头。"""
+    token = os.getenv(REGISTRY_TOKEN_ENV)
+    return {"X-Registry-Token": token} if token else {}
+
+
+def authorize_registration(request: Request, x_registry_token: Optional[str] = Header(None)) -> None:
+    """配置了 A2A_REGISTRY_TOKEN 时校验请求头中的令牌，否则只允许本机回环地址注册/注销。"""
+    token = os.getenv(REGISTRY_TOKEN_ENV)
+    if token:
+        if not x_registry_token or not hmac.compare_digest(x_registry_token, token):
+            raise HTTPException(status_code=403, detail="invalid registry token")
+        return
+    client = request.client.host if request.client else None
+    if client not in _LOOPBACK_HOSTS:
+        raise HTTPException(status_code=403, detail=f"set {REGISTRY_TOKEN_ENV} to accept registrations from other hosts")
+
+
+def mount_registry(app: FastAPI, registry: AgentRegistry) -> None:
+    """挂载注册表接口：POST /registry/register（注册/心跳）、POST /registry/deregister、GET /registry。"""
+
+    @app.post("/registry/register", include_in_schema=False, dependencies=[Depends(authorize_registration)])
+    async def register(reg: AgentRegistration) -> dict:
+        registry.register(reg.name, reg.url, reg.capabilities)
+        return {"ok": True, "heartbeat_interval": HEARTBEAT_INTERVAL}
+
+    @app.post("/registry/deregister", include_in_schema=False, dependencies=[Depends(authorize_registration)])
+    async def deregister(reg: AgentRegistration) -> dict:
+        return {"ok": registry.deregister(reg.url)}
+
+    @app.get("/registry", include_in_schema=False)
+    async def list_instances() -> List[dict]:
+        return registry.snapshot()
+
+
+def mount_health(app: FastAPI) -> None:
+    @app.get("/health", include_in_schema=False)
+    async def health() -> dict:
+        return {"status": "ok"}
+
+
+def agent_lifespan(agent_cls: type, module_started: Optional[float] = None):
+    """专家 Agent 的 lifespan：报告启动耗时并后台预热 LLM 客户端，按心跳向注册中心注册，关闭时注销。
+
+    对外地址取 app.state.advertise_url（由 __main__ 按 --host/--port 设置）或 A2A_ADVERTISE_URL；
+    注册中心地址为 A2A_REGISTRY_URL（默认本机 Receptionist），设为空字符串则不注册；
+    跨主机注册时两端需配置相同的 A2A_REGISTRY_TOKEN。
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if module_started is not None:
+            report_startup(agent_cls.name, module_started)
+        warmup = warm_up_llm()  # noqa: F841  持有引用，避免后台任务被回收
+        registry_url = os.getenv(REGISTRY_URL_ENV, "http://localhost:8000")
+        url = getattr(app.state, "advertise_url", None) or os.getenv("A2A_ADVERTISE_URL")
+        if not registry_url or not url:
+            yield
+            return
+        registration = {"name": agent_cls.name, "url": url, "capabilities": agent_capabilities(agent_cls)}
+        async with httpx.AsyncClient(timeout=2.0, headers=registry_headers()) as client:
+
+            async def heartbeat() -> None:
+                while True:
+                    try:
+                        await client.post(f"{registry_url}/registry/register", json=registration)
+                    except httpx.HTTPError:
+                        pass  # 注册中心尚未启动或暂不可达，下个周期重试
+                    await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+            task = asyncio.create_task(heartbeat())
+            try:
+                yield
+            finally:
+                task.cancel()
+                try:
+                    await client.post(f"{registry_url}/registry/deregister", json=registration)
+                except httpx.HTTPError:
+                    pass
+
+    return lifespan
+
+
+def parse_agent_args(default_port: int) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="A2A agent service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=default_port)
+    return parser.parse_args()
+
+
+def advertise_url(port: int) -> str:
+    """注册到注册中心的对外地址；跨主机部署时通过 A2A_ADVERTISE_HOST 指定本机可达地址。"""
+    return f"http://{os.getenv('A2A_ADVERTISE_HOST', 'localhost')}:{port}"
@@ -1,25 +1,27 @@
+import time
+_MODULE_STARTED = time.perf_counter()
+
 import os
 import sys
 # Add project root to sys.path to allow running as script
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from fastapi import FastAPI
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
-from python_a2a import agent, skill
 import uvicorn
 from dotenv import load_dotenv
+from src.a2a.admission import mount_admission
+from src.a2a.decorators import agent, skill
+from src.a2a.metrics import mount_metrics
 from src.a2a.protocol import ChatCompletionRequest
-from src.a2a.utils import handle_chat_completion
+from src.a2a.registry import advertise_url, agent_lifespan, mount_health, parse_agent_args
+from src.compliance_warning import tracing
+from src.a2a.utils import aget_llm, handle_chat_completion, system_messages
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model_name="kimi-latest",
-    openai_api_key=os.getenv("KIMI_API_KEY"),
-    openai_api_base=os.getenv("KIMI_API_URL"),
-    temperature=0
-)
+# 固定的系统提示词（不拼接用户输入），保证每轮请求的前缀一致以命中上游 prompt cache
+SYSTEM_PROMPT = "你是一个资深的销售顾问。请热情、专业地回答用户的销售相关问题。"
+
 
 @agent(name="SalesConsultant", description="处理价格咨询、商务合作和产品价值传递")
 class SalesConsultantAgent:
@@ -27,22 +29,33 @@ class SalesConsultantAgent:
         name="销售咨询",
         description="解答报价、合作与产品价值问题",
         tags=["sales", "pricing", "partnership"],
-        examples=["你们的产品如何定价？是否支持企业合作？"]
+        examples=[
+            "你们的产品如何定价？是否支持企业合作？",
+            "你们的报价是多少？",
+            "企业版一年的费用是多少，有折扣吗？",
+            "想采购 50 个账号，可以申请试用吗？",
+            "购买后怎么开发票、签合同？",
+            "你们和竞品相比有什么优势，值不值得买？",
+        ]
     )
     async def answer(self, question: str) -> str:
-        system_prompt = f"你是一个资深的销售顾问。请热情、专业地回答用户的销售相关问题。\n用户问题: \"{question}\""
-        response = await llm.ainvoke([SystemMessage(content=system_prompt)])
+        llm = await aget_llm()
+        response = await llm.ainvoke(system_messages(SYSTEM_PROMPT, question))
         return response.content
 
 sales_agent = SalesConsultantAgent()
 
-app = FastAPI(title="Sales Consultant Agent Service")
+app = FastAPI(title="Sales Consultant Agent Service", lifespan=agent_lifespan(SalesConsultantAgent, _MODULE_STARTED))
+mount_health(app)
+mount_metrics(app)
+mount_admission(app)
+tracing.mount_tracing(app, SalesConsultantAgent.name)
 
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatCompletionRequest):
-    user_msg = request.messages[-1].content
-    system_prompt = f"你是一个资深的销售顾问。请热情、专业地回答用户的销售相关问题。\n用户问题: \"{user_msg}\""
-    return await handle_chat_completion(request, llm, system_prompt)
+    return await handle_chat_completion(request, await aget_llm(), SYSTEM_PROMPT, agent=SalesConsultantAgent.name)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8005)
+    args = parse_agent_args(default_port=8005)
+    app.state.advertise_url = advertise_url(args.port)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -1,23 +1,25 @@
+import time
+_MODULE_STARTED = time.perf_counter()
+
 import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 from fastapi import FastAPI
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import SystemMessage
-from python_a2a import agent, skill
 import uvicorn
 from dotenv import load_dotenv
+from src.a2a.admission import mount_admission
+from src.a2a.decorators import agent, skill
+from src.a2a.metrics import mount_metrics
 from src.a2a.protocol import ChatCompletionRequest
-from src.a2a.utils import handle_chat_completion
+from src.a2a.registry import advertise_url, agent_lifespan, mount_health, parse_agent_args
+from src.compliance_warning import tracing
+from src.a2a.utils import aget_llm, handle_chat_completion, system_messages
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model_name="kimi-latest",
-    openai_api_key=os.getenv("KIMI_API_KEY"),
-    openai_api_base=os.getenv("KIMI_API_URL"),
-    temperature=0
-)
+# 固定的系统提示词（不拼接用户输入），保证每轮请求的前缀一致以命中上游 prompt cache
+SYSTEM_PROMPT = "你是一个资深的架构师和技术专家。请专业地回答用户的技术问题。"
+
 
 @agent(name="TechExpert", description="回答深度的技术问题、架构建议和 API 使用")
 class TechExpertAgent:
@@ -25,22 +27,33 @@ class TechExpertAgent:
         name="技术解答",
         description="回答技术问题与架构咨询",
         tags=["technical", "architecture"],
-        examples=["如何设计高可用的微服务架构？"]
+        examples=[
+            "如何设计高可用的微服务架构？",
+            "如何优化数据库索引？",
+            "接口调用返回 500 错误怎么排查？",
+            "服务部署到 Kubernetes 后性能下降怎么办？",
+            "API 的鉴权和限流应该怎么实现？",
+            "系统报错日志里出现超时异常，如何定位？",
+        ]
     )
     async def answer(self, question: str) -> str:
-        system_prompt = f"你是一个资深的架构师和技术专家。请专业地回答用户的技术问题。\n用户问题: \"{question}\""
-        response = await llm.ainvoke([SystemMessage(content=system_prompt)])
+        llm = await aget_llm()
+        response = await llm.ainvoke(system_messages(SYSTEM_PROMPT, question))
         return response.content
 
 tech_agent = TechExpertAgent()
 
-app = FastAPI(title="Tech Expert Agent Service")
+app = FastAPI(title="Tech Expert Agent Service", lifespan=agent_lifespan(TechExpertAgent, _MODULE_STARTED))
+mount_health(app)
+mount_metrics(app)
+mount_admission(app)
+tracing.mount_tracing(app, TechExpertAgent.name)
 
 @app.post("/v1/chat/completions")
 async def chat_completions(request: ChatCompletionRequest):
-    user_msg = request.messages[-1].content
-    system_prompt = f"你是一个资深的架构师和技术专家。请专业地回答用户的技术问题。\n用户问题: \"{user_msg}\""
-    return await handle_chat_completion(request, llm, system_prompt)
+    return await handle_chat_completion(request, await aget_llm(), SYSTEM_PROMPT, agent=TechExpertAgent.name)
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    args = parse_agent_args(default_port=8001)
+    app.state.advertise_url = advertise_url(args.port)
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -29,8 +29,11 @@ async def test_agent_chat(prompt: str):
                             break
                         try:
                             chunk = json.loads(data)
-                            content = chunk["choices"][0]["delta"].get("content", "")
-                            print(content, end="", flush=True)
+                            if chunk.get("usage"):
+                                usage = chunk["usage"]
+                                print(f"\n📊 tokens: prompt={usage['prompt_tokens']} completion={usage['completion_tokens']}", end="")
+                            for choice in chunk.get("choices", []):
+                                print(choice.get("delta", {}).get("content") or "", end="", flush=True)
                         except json.JSONDecodeError:
                             pass
                 print("\n" + "-"*50)
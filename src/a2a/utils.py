@@ -1,46 +1,783 @@
+import asyncio
+import hashlib
+import inspect
 import json
+import os
+import threading
+import time
+import unicodedata
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
 import httpx
-from fastapi.responses import StreamingResponse
-from langchain_core.messages import SystemMessage
-from src.a2a.protocol import ChatCompletionRequest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from src.a2a import admission, metrics
+from src.a2a.context import build_chat_messages, estimate_tokens
+from src.a2a.protocol import AgentMessage, ChatCompletionRequest
+from src.compliance_warning import tracing
+
+# 代理转发使用的应用级 httpx 客户端：在 FastAPI lifespan 中创建，所有请求复用其连接池与 keep-alive 连接
+_proxy_client: Optional[httpx.AsyncClient] = None
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def create_proxy_client() -> httpx.AsyncClient:
+    """按环境变量配置超时、连接数上限与 keep-alive；读超时需覆盖专家 Agent 的 LLM 生成间隔。"""
+    timeout = httpx.Timeout(
+        connect=_env_float("A2A_PROXY_CONNECT_TIMEOUT", 5.0),
+        read=_env_float("A2A_PROXY_READ_TIMEOUT", 120.0),
+        write=_env_float("A2A_PROXY_WRITE_TIMEOUT", 10.0),
+        pool=_env_float("A2A_PROXY_POOL_TIMEOUT", 5.0),
+    )
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("A2A_PROXY_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("A2A_PROXY_MAX_KEEPALIVE", 20)),
+        keepalive_expiry=_env_float("A2A_PROXY_KEEPALIVE_EXPIRY", 30.0),
+    )
+    http2 = os.getenv("A2A_PROXY_HTTP2", "0").lower() in ("1", "true", "yes")
+    if http2:
+        try:
+            import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2 包
+        except ImportError:
+            print("⚠️ A2A_PROXY_HTTP2 已开启但未安装 h2（pip install 'httpx[http2]'），回退到 HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=http2)
+
 
-async def generate_stream(llm, system_prompt: str):
-    """生成 SSE 格式的流式响应"""
+def get_proxy_client() -> httpx.AsyncClient:
+    """返回共享客户端；未通过 lifespan 启动（如脚本或测试中直接调用）时按需创建。"""
+    global _proxy_client
+    if _proxy_client is None or _proxy_client.is_closed:
+        _proxy_client = create_proxy_client()
+    return _proxy_client
+
+
+@asynccontextmanager
+async def proxy_client_lifespan(app: FastAPI):
+    """FastAPI lifespan：启动时创建共享代理客户端，关闭时释放连接池。"""
+    global _proxy_client
+    _proxy_client = create_proxy_client()
     try:
-        async for chunk in llm.astream([SystemMessage(content=system_prompt)]):
+        yield
+    finally:
+        await _proxy_client.aclose()
+        _proxy_client = None
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """按需创建共享的 Kimi 聊天模型；langchain_openai 导入耗时较长，推迟到首次使用（或启动后的后台预热）。"""
+    global _llm
+    with _llm_lock:
+        if _llm is None:
+            from langchain_openai import ChatOpenAI
+
+            _llm = ChatOpenAI(
+                model_name="kimi-latest",
+                openai_api_key=os.getenv("KIMI_API_KEY"),
+                openai_api_base=os.getenv("KIMI_API_URL"),
+                temperature=0,
+                # 流式响应末尾返回 token 用量（stream_options.include_usage）
+                stream_usage=True,
+            )
+    return _llm
+
+
+async def aget_llm():
+    """供异步处理函数使用的 get_llm：客户端尚未创建（或正由预热线程创建）时在线程中等待，不阻塞事件循环。"""
+    if _llm is not None:
+        return _llm
+    return await asyncio.to_thread(get_llm)
+
+
+def warm_up_llm() -> Optional[asyncio.Task]:
+    """服务就绪后在后台线程中导入 LLM 客户端，使首个请求无需承担导入耗时；A2A_LLM_WARMUP=0 关闭。"""
+    if os.getenv("A2A_LLM_WARMUP", "1").lower() in ("0", "false", "no"):
+        return None
+
+    def load() -> None:
+        start = time.perf_counter()
+        get_llm()
+        print(f"[startup] LLM 客户端预热耗时: {time.perf_counter() - start:.3f}秒", flush=True)
+
+    return asyncio.create_task(asyncio.to_thread(load))
+
+
+def report_startup(name: str, module_started: float) -> None:
+    """打印模块加载至服务启动的耗时；由 AgentManager 启动时附带自进程创建起的总耗时（A2A_SPAWN_TIME）。"""
+    message = f"[startup] {name} 库加载耗时: {time.perf_counter() - module_started:.3f}秒"
+    spawned = os.getenv("A2A_SPAWN_TIME")
+    if spawned:
+        message += f"，进程创建至服务启动: {time.time() - float(spawned):.3f}秒"
+    print(message, flush=True)
+
+
+def system_messages(content: str, question: Optional[str] = None) -> list:
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    messages = [SystemMessage(content=content)]
+    if question is not None:
+        messages.append(HumanMessage(content=question))
+    return messages
+
+
+def _usage(usage_metadata: Optional[dict], messages: list, completion: str) -> dict:
+    """OpenAI 格式的 usage；上游未返回用量时按 context.estimate_tokens 估算。"""
+    if usage_metadata:
+        prompt_tokens = usage_metadata.get("input_tokens", 0)
+        completion_tokens = usage_metadata.get("output_tokens", 0)
+    else:
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        completion_tokens = estimate_tokens(completion) if completion else 0
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _record_usage(agent: str, usage: dict, start: float, first_token: Optional[float], end: float) -> None:
+    metrics.LLM_TOKENS.inc(usage["prompt_tokens"], agent=agent, kind="prompt")
+    metrics.LLM_TOKENS.inc(usage["completion_tokens"], agent=agent, kind="completion")
+    if first_token is not None:
+        metrics.LLM_TTFT.observe(first_token - start, agent=agent)
+        if end > first_token and usage["completion_tokens"]:
+            metrics.LLM_TOKENS_PER_SECOND.observe(usage["completion_tokens"] / (end - first_token), agent=agent)
+    metrics.LLM_SECONDS.observe(end - start, agent=agent)
+
+
+def _chunk_framer(model: str) -> Callable[..., str]:
+    """返回同一次响应共用 id/created 的 chat.completion.chunk SSE 帧构造函数。"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    def frame(choices: list, **extra) -> str:
+        data = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model, "choices": choices, **extra}
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return frame
+
+
+async def generate_stream(
+    llm, messages: list, model: str, agent: str, on_complete: Optional[Callable[[list, str, dict], None]] = None
+):
+    """生成 OpenAI 兼容的 SSE 流：chat.completion.chunk 帧（首帧带 role，末帧带 finish_reason），
+    最后附加一个 choices 为空、携带 usage 的用量帧，并记录该 Agent 的 token 与时延指标。
+    on_complete 在生成成功结束时以 (内容片段列表, finish_reason, usage) 调用，供响应缓存写入。"""
+    frame = _chunk_framer(model)
+    start = time.perf_counter()
+    first_token = None
+    parts = []
+    usage_metadata = None
+    finish_reason = "stop"
+    metrics.LLM_REQUESTS.inc(agent=agent, stream="true")
+    try:
+        yield frame([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        async for chunk in llm.astream(messages):
+            usage_metadata = getattr(chunk, "usage_metadata", None) or usage_metadata
+            finish_reason = (getattr(chunk, "response_metadata", None) or {}).get("finish_reason") or finish_reason
             if chunk.content:
-                data = json.dumps({'choices': [{'delta': {'content': chunk.content}}]})
-                yield f"data: {data}\n\n"
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(chunk.content)
+                yield frame([{"index": 0, "delta": {"content": chunk.content}, "finish_reason": None}])
+        yield frame([{"index": 0, "delta": {}, "finish_reason": finish_reason}])
+        usage = _usage(usage_metadata, messages, "".join(parts))
+        _record_usage(agent, usage, start, first_token, time.perf_counter())
+        if on_complete is not None:
+            on_complete(parts, finish_reason, usage)
+        yield frame([], usage=usage)
         yield "data: [DONE]\n\n"
     except Exception as e:
+        metrics.LLM_ERRORS.inc(agent=agent)
         error_data = json.dumps({'error': str(e)})
         yield f"data: {error_data}\n\n"
         yield "data: [DONE]\n\n"
 
-async def handle_chat_completion(request: ChatCompletionRequest, llm, system_prompt: str):
-    """通用的 Chat Completion 处理逻辑"""
+@dataclass
+class CachedResponse:
+    parts: List[str]
+    finish_reason: str
+    usage: dict
+    expires_at: float
+    context: str
+    slot: Optional[int] = None
+
+
+class ResponseCache:
+    """专家 Agent 的回答缓存（仅用于 temperature=0 的确定性生成）。
+
+    精确层：按 agent + 模型 + 系统提示词 + 完整对话（仅折叠空白）命中；
+    语义层（A2A_RESPONSE_CACHE_SEMANTIC=1 开启）：单轮提问时，用本地 embedding_service 的向量与同一 agent/提示词下
+    已缓存问题比较，相似度超过阈值即复用其回答。条目按 TTL 过期、按 LRU 淘汰；命中的回答可按原片段重放为 SSE 流。
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl: Optional[float] = None,
+        semantic: Optional[bool] = None,
+        similarity: Optional[float] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("A2A_RESPONSE_CACHE_SIZE", 512))
+        self.ttl = ttl if ttl is not None else _env_float("A2A_RESPONSE_CACHE_TTL", 600.0)
+        if semantic is None:
+            semantic = os.getenv("A2A_RESPONSE_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes")
+        self.semantic = semantic
+        self.similarity = similarity if similarity is not None else _env_float("A2A_RESPONSE_CACHE_SIMILARITY", 0.95)
+        self.embedding_url = os.getenv("EMBEDDING_SERVICE_URL", "http://localhost:8003/embed")
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        # 语义层：预分配的问题向量矩阵（维度在首次取得向量时确定），槽位随条目淘汰复用
+        self._vectors = None
+        self._slot_keys: List[Optional[str]] = [None] * self.max_entries
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        metrics.RESPONSE_CACHE_SIZE.set_function(lambda: len(self._entries))
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def keys(agent: str, model: str, system_prompt: str, messages: Sequence[AgentMessage]) -> Tuple[str, str, Optional[str]]:
+        """返回 (精确键, 语义层上下文键, 单轮问题文本)；多轮对话的回答依赖上文，不参与语义匹配。
+
+        消息内容只做 NFKC 归一化与空白折叠：标点与大小写可能改变问题含义（如代码片段 a+b 与 a-b），必须保留。
+        """
+        extra_system = [m.content for m in messages if m.role == "system"]
+        dialog = [m for m in messages if m.role != "system"]
+        context = hashlib.sha1("\x00".join([agent, model, system_prompt, *extra_system]).encode("utf-8")).hexdigest()
+        body = "\x00".join(f"{m.role}:{' '.join(unicodedata.normalize('NFKC', m.content).split())}" for m in dialog)
+        exact = hashlib.sha1(f"{context}\x00{body}".encode("utf-8")).hexdigest()
+        question = dialog[0].content if len(dialog) == 1 and dialog[0].role == "user" else None
+        return exact, context, question
+
+    async def _embed(self, text: str):
+        import numpy as np
+
+        try:
+            resp = await get_proxy_client().post(self.embedding_url, json={"input": text}, timeout=2.0)
+            resp.raise_for_status()
+            vector = np.asarray(resp.json()["embeddings"][0], dtype=np.float32)
+        except (httpx.HTTPError, KeyError, IndexError, ValueError):
+            # embedding 服务不可用时只使用精确层
+            metrics.RESPONSE_CACHE_EMBED_ERRORS.inc()
+            return None
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        if entry.slot is not None:
+            self._vectors[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free.append(entry.slot)
+
+    def _live(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            self._evict(key)
+            return None
+        return entry
+
+    async def get(self, agent: str, keys: Tuple[str, str, Optional[str]]) -> Tuple[Optional[CachedResponse], Optional[object]]:
+        """返回 (命中的回答, 问题向量)；向量在未命中时交给 put 复用，避免重复请求 embedding 服务。"""
+        exact, context, question = keys
+        entry = self._live(exact)
+        if entry is not None:
+            self._entries.move_to_end(exact)
+            metrics.RESPONSE_CACHE_LOOKUPS.inc(agent=agent, tier="exact")
+            return entry, None
+        vector = None
+        if self.semantic and question is not None:
+            vector = await self._embed(question)
+            if vector is not None and self._vectors is not None and self._vectors.shape[1] == vector.shape[0]:
+                sims = self._vectors @ vector
+                for slot in sims.argsort()[::-1][:8]:
+                    cached_key = self._slot_keys[slot]
+                    if sims[slot] < self.similarity:
+                        break
+                    entry = self._live(cached_key) if cached_key is not None else None
+                    if entry is not None and entry.context == context:
+                        self._entries.move_to_end(cached_key)
+                        metrics.RESPONSE_CACHE_LOOKUPS.inc(agent=agent, tier="semantic")
+                        return entry, None
+        metrics.RESPONSE_CACHE_LOOKUPS.inc(agent=agent, tier="miss")
+        return None, vector
+
+    def put(self, keys: Tuple[str, str, Optional[str]], parts: List[str], finish_reason: str, usage: dict, vector=None) -> None:
+        # 只缓存正常结束的完整回答（被截断或过滤的不缓存）
+        if not self.enabled or finish_reason != "stop" or not "".join(parts):
+            return
+        exact, context, _ = keys
+        if exact in self._entries:
+            self._evict(exact)
+        while len(self._entries) >= self.max_entries:
+            self._evict(next(iter(self._entries)))
+        entry = CachedResponse(list(parts), finish_reason, usage, time.monotonic() + self.ttl, context)
+        if vector is not None:
+            import numpy as np
+
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+            if self._vectors.shape[1] == vector.shape[0]:
+                entry.slot = self._free.pop()
+                self._vectors[entry.slot] = vector
+                self._slot_keys[entry.slot] = exact
+        self._entries[exact] = entry
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache()
+
+
+async def replay_stream(entry: CachedResponse, model: str):
+    """把缓存的回答按原内容片段重放为与 generate_stream 相同格式的 SSE 流。"""
+    frame = _chunk_framer(model)
+    yield frame([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    for part in entry.parts:
+        yield frame([{"index": 0, "delta": {"content": part}, "finish_reason": None}])
+    yield frame([{"index": 0, "delta": {}, "finish_reason": entry.finish_reason}])
+    yield frame([], usage=entry.usage)
+    yield "data: [DONE]\n\n"
+
+
+def _completion(model: str, content: str, finish_reason: str, usage: dict) -> dict:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """流式响应：发送完毕、出错或客户端断开时调用一次 release（释放并发名额、进行中计数，结束 span；可为协程函数）。
+
+    在 __call__ 的 finally 中释放，而不是在响应体生成器的 finally 中：客户端在首个响应块之前断开时，
+    生成器从未开始执行，其 finally 不会运行。
+    """
+
+    def __init__(self, content, release: Callable[[], Any], **kwargs):
+        super().__init__(content, **kwargs)
+        self._release = release
+        self._released = False
+
+    async def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        result = self._release()
+        if inspect.isawaitable(result):
+            await result
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release()
+
+
+async def handle_chat_completion(request: ChatCompletionRequest, llm, system_prompt: str, agent: str):
+    """通用的 Chat Completion 处理逻辑：system_prompt 作为固定前缀，携带按 token 预算截断的完整对话历史。
+
+    响应为 OpenAI 兼容格式（含 id、model、finish_reason 与 usage），token 用量与时延按 agent 记录到指标。
+    temperature=0 时先查响应缓存（response_cache），命中则直接返回（流式请求重放为 SSE），不调用 LLM、不占并发名额；
+    生成前先取得该 Agent 的并发名额（见 admission），饱和时抛出 AdmissionRejected（由 mount_admission 转为 429）。
+    """
+    model = getattr(llm, "model_name", None) or request.model
+    span = tracing.start_span("llm.chat", service=agent, agent=agent, model=model, stream=request.stream)
+    cache = response_cache if response_cache.enabled and getattr(llm, "temperature", None) == 0 else None
+    vector = None
+    if cache is not None:
+        keys = ResponseCache.keys(agent, model, system_prompt, request.messages)
+        cached, vector = await cache.get(agent, keys)
+        if cached is not None:
+            span.set(cache="hit")
+            span.end()
+            if request.stream:
+                return StreamingResponse(
+                    replay_stream(cached, model), media_type="text/event-stream", headers={"X-A2A-Cache": "hit"}
+                )
+            return JSONResponse(
+                _completion(model, "".join(cached.parts), cached.finish_reason, cached.usage), headers={"X-A2A-Cache": "hit"}
+            )
+
+    completed = False
+
+    def store(parts: list, finish_reason: str, usage: dict) -> None:
+        nonlocal completed
+        completed = True
+        span.set(finish_reason=finish_reason, **usage)
+        if cache is not None:
+            cache.put(keys, parts, finish_reason, usage, vector)
+
+    messages = build_chat_messages(system_prompt, request.messages)
+    queued = time.perf_counter()
+    try:
+        release = await admission.controller(agent).acquire()
+    except BaseException as e:
+        span.set_error(e)
+        span.end()
+        raise
+    span.set(queue_ms=round((time.perf_counter() - queued) * 1000, 3))
+
+    def finish() -> None:
+        release()
+        if not completed and span.status != "error":
+            span.set_error("generation failed or cancelled")
+        span.end()
+
     if request.stream:
-        return StreamingResponse(
-            generate_stream(llm, system_prompt),
-            media_type="text/event-stream"
+        return ReleasingStreamingResponse(
+            generate_stream(llm, messages, model, agent, on_complete=store), finish, media_type="text/event-stream"
         )
     else:
-        response = await llm.ainvoke([SystemMessage(content=system_prompt)])
-        return {
-            "choices": [{"message": {"role": "assistant", "content": response.content}}]
-        }
-
-async def handle_proxy_request(target_url: str, request_data: dict, stream: bool):
-    """处理代理转发请求"""
-    if stream:
-        async def stream_proxy():
-            async with httpx.AsyncClient() as client:
-                async with client.stream("POST", target_url, json=request_data) as resp:
-                    async for line in resp.aiter_lines():
-                        if line:
-                            yield f"{line}\n\n"
-        return StreamingResponse(stream_proxy(), media_type="text/event-stream")
-    else:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(target_url, json=request_data)
-            return resp.json()
+        metrics.LLM_REQUESTS.inc(agent=agent, stream="false")
+        start = time.perf_counter()
+        try:
+            response = await llm.ainvoke(messages)
+            end = time.perf_counter()
+            usage = _usage(getattr(response, "usage_metadata", None), messages, response.content)
+            # 非流式无法区分首 token 时间，只记录总耗时与用量
+            _record_usage(agent, usage, start, None, end)
+            finish_reason = (getattr(response, "response_metadata", None) or {}).get("finish_reason") or "stop"
+            store([response.content], finish_reason, usage)
+        except Exception as e:
+            metrics.LLM_ERRORS.inc(agent=agent)
+            span.set_error(e)
+            raise
+        finally:
+            finish()
+        return _completion(model, response.content, finish_reason, usage)
+
+# 逐跳头部不应由代理转发；content-length 由流式响应重新决定，date/server 由本服务自行添加
+_HOP_BY_HOP_HEADERS = {
+    "date",
+    "server",
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "content-length",
+}
+
+
+def _forward_headers(headers: httpx.Headers) -> dict:
+    return {k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP_HEADERS}
+
+
+async def handle_proxy_request(
+    target_url: str,
+    request_data: dict,
+    stream: bool,
+    on_complete: Optional[Callable[[bool], None]] = None,
+    agent: Optional[str] = None,
+    agent_url: Optional[str] = None,
+):
+    """处理代理转发请求（复用共享连接池）。
+
+    流式请求按字节原样转发上游响应块（aiter_raw，不解析、不重组 SSE 事件），
+    并透传上游状态码与头部；客户端断开时关闭上游响应以取消上游生成。
+    on_complete 在请求结束（含流式响应转发完毕）时调用一次，参数表示上游是否可达，供负载均衡统计进行中请求。
+    指定 agent 时先取得发往该 Agent 的并发名额（与 handle_chat_completion 共用 admission），请求结束时释放；
+    同时指定 agent_url（目标副本地址）时按副本计数，多副本的总容量随副本数增长。
+    """
+    client = get_proxy_client()
+    span = tracing.start_span("proxy", kind="client", target=target_url, agent=agent or "")
+    queued = time.perf_counter()
+    try:
+        release = await admission.controller(agent, agent_url).acquire() if agent else (lambda: None)
+    except BaseException as e:
+        # 未能转发（排队被拒或取消）不算上游不可达
+        span.set_error(e)
+        span.end()
+        if on_complete is not None:
+            on_complete(True)
+        raise
+    start = time.perf_counter()
+    span.set(queue_ms=round((start - queued) * 1000, 3))
+
+    finished = False
+
+    def done(reachable: bool) -> None:
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        release()
+        if not reachable:
+            span.set_error("upstream unavailable")
+        span.end()
+        if on_complete is not None:
+            on_complete(reachable)
+
+    try:
+        # traceparent 以本次代理 span 为父，上游 Agent 的 span 挂在其下
+        request = client.build_request("POST", target_url, json=request_data, headers=tracing.inject({}, span))
+        resp = await client.send(request, stream=True)
+    except httpx.HTTPError as e:
+        metrics.PROXY_ERRORS.inc(target=target_url)
+        done(False)
+        return JSONResponse({"error": f"upstream unavailable: {type(e).__name__}: {e}"}, status_code=502)
+    except BaseException:
+        done(False)
+        raise
+    metrics.PROXY_REQUESTS.inc(target=target_url, status=resp.status_code)
+    span.set(**{"http.status_code": resp.status_code})
+    if resp.status_code >= 500:
+        span.status = "error"
+
+    if not stream or resp.status_code >= 400:
+        # 非流式或上游出错：一次性读取原始字节并按原状态码返回，无需反序列化
+        try:
+            body = await resp.aread()
+        finally:
+            await resp.aclose()
+            done(True)
+        metrics.PROXY_TTFB.observe(time.perf_counter() - start, target=target_url)
+        metrics.PROXY_SECONDS.observe(time.perf_counter() - start, target=target_url)
+        return Response(content=body, status_code=resp.status_code, headers=_forward_headers(resp.headers))
+
+    async def stream_proxy():
+        first = True
+        try:
+            async for chunk in resp.aiter_raw():
+                if first:
+                    metrics.PROXY_TTFB.observe(time.perf_counter() - start, target=target_url)
+                    span.set(ttfb_ms=round((time.perf_counter() - start) * 1000, 3))
+                    first = False
+                yield chunk
+        except asyncio.CancelledError:
+            metrics.PROXY_DISCONNECTS.inc(target=target_url)
+            # 客户端常在收到 [DONE] 后立即断开，不视为错误
+            span.set(client_disconnected=True)
+            raise
+        except httpx.HTTPError as e:
+            metrics.PROXY_ERRORS.inc(target=target_url)
+            span.set_error(e)
+            raise
+
+    async def finish() -> None:
+        # 正常结束、客户端断开（包括首个响应块之前）或出错时都关闭上游连接
+        await resp.aclose()
+        done(True)
+        metrics.PROXY_SECONDS.observe(time.perf_counter() - start, target=target_url)
+
+    return ReleasingStreamingResponse(
+        stream_proxy(),
+        finish,
+        status_code=resp.status_code,
+        headers=_forward_headers(resp.headers),
+        media_type=resp.headers.get("content-type", "text/event-stream"),
+    )
+
+
+async def handle_local_request(
+    handler: Callable,
+    request: ChatCompletionRequest,
+    on_complete: Optional[Callable[[bool], None]] = None,
+):
+    """单进程托管模式：直接调用同进程专家的处理函数，流式响应原样返回（同一事件循环内逐块产出），
+    on_complete 语义与 handle_proxy_request 相同。"""
+    done = on_complete or (lambda reachable: None)
+    try:
+        result = await handler(request)
+    except BaseException:
+        done(True)
+        raise
+    if not isinstance(result, StreamingResponse):
+        done(True)
+        return result
+
+    async def release() -> None:
+        try:
+            if isinstance(result, ReleasingStreamingResponse):
+                await result.release()
+        finally:
+            done(True)
+
+    # 专家返回的响应对象不再被调用，由外层响应在发送结束时一并释放专家的并发名额
+    return ReleasingStreamingResponse(
+        result.body_iterator,
+        release,
+        status_code=result.status_code,
+        headers=dict(result.headers),
+        media_type=result.media_type,
+        background=result.background,
+    )
+
+
+def count_sse_deltas(data: bytes) -> int:
+    """统计 SSE 数据中携带内容增量的事件数（流式输出中约等于生成的 token 片段数）。"""
+    count = 0
+    for line in data.decode("utf-8", errors="ignore").splitlines():
+        if not line.startswith("data:") or line[5:].strip() == "[DONE]":
+            continue
+        try:
+            choices = json.loads(line[5:]).get("choices") or [{}]
+        except (json.JSONDecodeError, AttributeError):
+            continue
+        if (choices[0].get("delta") or {}).get("content"):
+            count += 1
+    return count
+
+
+class ProxyPrefetch:
+    """推测执行用的预取代理请求：立即向上游发起流式请求并在内存中缓冲响应块，
+    由调用方在分类结果确定后选择 commit（转发缓冲与后续数据）或 abort（取消上游并统计浪费量）。
+    """
+
+    def __init__(self, target_url: str, request_data: dict, on_complete: Optional[Callable[[bool], None]] = None):
+        self.target_url = target_url
+        self.on_complete = on_complete
+        self.start = time.perf_counter()
+        self.span = tracing.start_span("proxy.prefetch", kind="client", target=target_url)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._response: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._pump(request_data))
+
+    async def _pump(self, request_data: dict) -> None:
+        client = get_proxy_client()
+        reachable = False
+        try:
+            try:
+                request = client.build_request("POST", self.target_url, json=request_data, headers=tracing.inject({}, self.span))
+                resp = await client.send(request, stream=True)
+            except httpx.HTTPError as e:
+                self.span.set_error(e)
+                self._response.set_exception(e)
+                return
+            reachable = True
+            self._response.set_result(resp)
+            try:
+                async for chunk in resp.aiter_raw():
+                    self._queue.put_nowait(chunk)
+            except httpx.HTTPError as e:
+                self._queue.put_nowait(e)
+            finally:
+                await resp.aclose()
+                self._queue.put_nowait(None)
+        finally:
+            self.span.end()
+            if self.on_complete is not None:
+                self.on_complete(reachable)
+
+    async def commit(self):
+        """采用预取结果：先输出已缓冲的响应块，再继续转发上游剩余数据。"""
+        self.span.set(outcome="committed")
+        try:
+            resp = await self._response
+        except httpx.HTTPError as e:
+            metrics.PROXY_ERRORS.inc(target=self.target_url)
+            return JSONResponse({"error": f"upstream unavailable: {type(e).__name__}: {e}"}, status_code=502)
+        metrics.PROXY_REQUESTS.inc(target=self.target_url, status=resp.status_code)
+
+        async def drain():
+            first = True
+            try:
+                while (chunk := await self._queue.get()) is not None:
+                    if isinstance(chunk, Exception):
+                        metrics.PROXY_ERRORS.inc(target=self.target_url)
+                        raise chunk
+                    if first:
+                        metrics.PROXY_TTFB.observe(time.perf_counter() - self.start, target=self.target_url)
+                        first = False
+                    yield chunk
+            except asyncio.CancelledError:
+                metrics.PROXY_DISCONNECTS.inc(target=self.target_url)
+                raise
+            finally:
+                self._task.cancel()
+                metrics.PROXY_SECONDS.observe(time.perf_counter() - self.start, target=self.target_url)
+
+        async def stop() -> None:
+            # 客户端在首个响应块之前断开时 drain 不会开始执行，由响应结束时取消上游并释放名额
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        if resp.status_code >= 400:
+            body = b"".join([chunk async for chunk in drain()])
+            return Response(content=body, status_code=resp.status_code, headers=_forward_headers(resp.headers))
+        return ReleasingStreamingResponse(
+            drain(),
+            stop,
+            status_code=resp.status_code,
+            headers=_forward_headers(resp.headers),
+            media_type=resp.headers.get("content-type", "text/event-stream"),
+        )
+
+    async def abort(self) -> tuple:
+        """放弃预取：取消上游请求，返回已收到但被丢弃的 (字节数, 内容增量数)。"""
+        self.span.set(outcome="aborted")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        data = b""
+        while not self._queue.empty():
+            chunk = self._queue.get_nowait()
+            if isinstance(chunk, bytes):
+                data += chunk
+        return len(data), count_sse_deltas(data)
+
+
+class LocalPrefetch(ProxyPrefetch):
+    """单进程托管模式下的预取：直接调用同进程专家的处理函数并缓冲其流式输出，commit/abort 语义同 ProxyPrefetch。"""
+
+    def __init__(
+        self,
+        target: str,
+        handler: Callable,
+        request: ChatCompletionRequest,
+        on_complete: Optional[Callable[[bool], None]] = None,
+    ):
+        self.handler = handler
+        super().__init__(target, request, on_complete)
+
+    async def _pump(self, request: ChatCompletionRequest) -> None:
+        # 本任务有独立的上下文副本：进程内专家创建的 span 挂在预取 span 下
+        tracing.activate(self.span)
+        try:
+            try:
+                result = await self.handler(request)
+            except Exception as e:
+                self.span.set_error(e)
+                self._response.set_exception(e)
+                return
+            self._response.set_result(result)
+            try:
+                if isinstance(result, StreamingResponse):
+                    async for chunk in result.body_iterator:
+                        self._queue.put_nowait(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                else:
+                    self._queue.put_nowait(bytes(result.body))
+            finally:
+                # 专家响应对象不会被发送，需在此释放其并发名额并结束其 span
+                if isinstance(result, ReleasingStreamingResponse):
+                    await result.release()
+        finally:
+            self.span.end()
+            self._queue.put_nowait(None)
+            if self.on_complete is not None:
+                self.on_complete(True)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import argparse
+import os
+import secrets
+import time
+from multiprocessing import Process
+from multiprocessing.connection import Client, Listener
+from typing import Any
+
+import uvicorn
+
+from . import kb, snapshot
+from .retrieval import get_embeddings_model
+from .vectorstore import VectorStore
+
+# 多进程部署：
+#   - 1 个写者进程：持有可变知识库，串行处理录入请求，向量化新增文档并原子发布快照
+#   - N 个工作进程（uvicorn workers，共享同一端口）：只读加载快照，向量段以内存映射共享
+# 工作进程通过本地 Unix socket 把录入请求转发给写者，收到回复时新快照已发布。
+
+SNAPSHOT_DIR_ENV = "COMPLIANCE_SNAPSHOT_DIR"
+WRITER_ADDRESS_ENV = "COMPLIANCE_WRITER_ADDRESS"
+WRITER_AUTHKEY_ENV = "COMPLIANCE_WRITER_AUTHKEY"
+# 向量库存储精度：float32（默认）或 float16（内存减半）
+VECTOR_DTYPE_ENV = "COMPLIANCE_VECTOR_DTYPE"
+
+WRITER_OPS = ("seed_demo_kb", "ingest_policy", "ingest_case")
+
+
+class SnapshotWriter:
+    """单一写者：只对新增或变更的文档调用 Embedding 服务，向量追加写入向量库后发布快照。"""
+
+    def __init__(self, root: str, dtype: str | None = None, max_segments: int = 8):
+        self.root = root
+        self.dtype = dtype or os.getenv(VECTOR_DTYPE_ENV, "float32")
+        self.max_segments = max_segments
+        self.stores: dict[str, VectorStore] = {}
+
+    def _open_stores(self, generations: dict[str, int] | None = None) -> None:
+        # 从快照记录的代数继续写入，丢弃上次崩溃时已追加但未发布的向量
+        for kind in snapshot.VECTOR_KINDS:
+            generation = generations.get(kind) if generations is not None else None
+            self.stores[kind] = VectorStore.open(
+                snapshot.vector_store_path(self.root, kind), generation, dtype=self.dtype
+            )
+
+    def bootstrap(self) -> str:
+        snap = snapshot.load(self.root)
+        if snap is not None:
+            kb.load_snapshot(snap)
+            self._open_stores(snap.vector_generations)
+            return snap.version
+        self._open_stores()
+        kb.seed_demo_kb()
+        self._sync("policy", [doc_id for doc_id, _ in kb.iter_policy_texts()])
+        self._sync("case", [case_id for case_id, _ in kb.iter_case_texts()])
+        return self.publish()
+
+    def _sync(self, kind: str, doc_ids: list[str]) -> None:
+        if not doc_ids:
+            return
+        text_of = kb.policy_text if kind == "policy" else kb.case_text
+        vectors = get_embeddings_model().embed_documents([text_of(doc_id) for doc_id in doc_ids])
+        store = self.stores[kind]
+        store.upsert(doc_ids, vectors)
+        if store.segment_count > self.max_segments:
+            store.compact()
+
+    def publish(self) -> str:
+        return snapshot.publish(
+            self.root,
+            policies=kb.list_policies(),
+            cases=kb.list_cases(),
+            vector_generations={kind: store.generation for kind, store in self.stores.items()},
+        )
+
+    def apply(self, op: str, kwargs: dict[str, Any]) -> dict[str, Any]:
+        if op not in WRITER_OPS:
+            raise ValueError(f"Unsupported writer op: {op}")
+        if op == "seed_demo_kb":
+            before = {"policy": dict(kb.iter_policy_texts()), "case": dict(kb.iter_case_texts())}
+        result = getattr(kb, op)(**kwargs)
+        if op == "ingest_policy":
+            self._sync("policy", [kwargs["doc_id"]])
+        elif op == "ingest_case":
+            self._sync("case", [kwargs["case_id"]])
+        else:
+            for kind, texts in (("policy", kb.iter_policy_texts()), ("case", kb.iter_case_texts())):
+                self._sync(kind, [i for i, text in texts if before[kind].get(i) != text])
+        version = self.publish()
+        return {**result, "snapshot": version}
+
+
+def run_writer(root: str, address: str, authkey: bytes) -> None:
+    """写者进程入口：先发布初始快照，再串行处理录入请求。"""
+    writer = SnapshotWriter(root)
+    version = writer.bootstrap()
+    print(f"[writer] snapshot {version} published to {root}", flush=True)
+    if os.path.exists(address):
+        os.unlink(address)
+    with Listener(address, family="AF_UNIX", authkey=authkey) as listener:
+        while True:
+            with listener.accept() as conn:
+                op, kwargs = conn.recv()
+                try:
+                    conn.send(("ok", writer.apply(op, kwargs)))
+                except Exception as e:
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+
+class WriterClient:
+    """工作进程侧的录入转发客户端。"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+
+    def call(self, op: str, **kwargs: Any) -> dict[str, Any]:
+        with Client(self.address, family="AF_UNIX", authkey=self.authkey) as conn:
+            conn.send((op, kwargs))
+            status, payload = conn.recv()
+        if status != "ok":
+            raise RuntimeError(payload)
+        return payload
+
+
+def create_worker_app():
+    """uvicorn 工作进程的应用工厂（factory=True）。"""
+    from . import server
+
+    writer = WriterClient(
+        os.environ[WRITER_ADDRESS_ENV], bytes.fromhex(os.environ[WRITER_AUTHKEY_ENV])
+    )
+    server.configure_worker(os.environ[SNAPSHOT_DIR_ENV], writer)
+    # 同一会话的请求可能落到不同工作进程，必须使用无状态 streamable-http
+    server.mcp.settings.stateless_http = True
+    return server.mcp.streamable_http_app()
+
+
+def serve(workers: int, host: str, port: int, snapshot_dir: str) -> None:
+    snapshot_dir = os.path.abspath(snapshot_dir)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    address = os.path.join(snapshot_dir, "writer.sock")
+    authkey = secrets.token_bytes(16)
+
+    writer = Process(target=run_writer, args=(snapshot_dir, address, authkey), daemon=True)
+    writer.start()
+    deadline = time.monotonic() + 60
+    while snapshot.current_version(snapshot_dir) is None or not os.path.exists(address):
+        if not writer.is_alive() or time.monotonic() > deadline:
+            raise RuntimeError("Snapshot writer failed to start")
+        time.sleep(0.1)
+
+    os.environ[SNAPSHOT_DIR_ENV] = snapshot_dir
+    os.environ[WRITER_ADDRESS_ENV] = address
+    os.environ[WRITER_AUTHKEY_ENV] = authkey.hex()
+    try:
+        uvicorn.run(
+            f"{__package__}.deploy:create_worker_app",
+            factory=True,
+            host=host,
+            port=port,
+            workers=workers,
+        )
+    finally:
+        writer.terminate()
+        writer.join(timeout=5)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compliance MCP server (multi-worker mode)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--snapshot-dir", default=os.getenv(SNAPSHOT_DIR_ENV, "data/kb_snapshot"))
+    args = parser.parse_args(argv)
+    serve(args.workers, args.host, args.port, args.snapshot_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,53 @@ from __future__ import annotations
 
 import json
 from datetime import date
-from typing import Any, Literal
+from typing import TYPE_CHECKING, Any, Literal
 
+from . import metrics
 from .models import CaseDoc, PolicyDoc
 
+if TYPE_CHECKING:
+    from .snapshot import Snapshot
+    from .vectorstore import VectorStore
+
 _POLICIES: dict[str, PolicyDoc] = {}
 _CASES: dict[str, CaseDoc] = {}
+# 多进程部署时由快照加载的内存映射向量库（kind -> VectorStore）；单进程模式下为空
+_INDEXES: dict[str, VectorStore] = {}
+_SNAPSHOT_VERSION: str | None = None
+
+metrics.KB_DOCS.set_function(lambda: len(_POLICIES), kind="policy")
+metrics.KB_DOCS.set_function(lambda: len(_CASES), kind="case")
 
 
 def is_seeded() -> bool:
     return bool(_POLICIES) or bool(_CASES)
 
 
+def clear() -> None:
+    _POLICIES.clear()
+    _CASES.clear()
+    _INDEXES.clear()
+
+
+def load_snapshot(snap: Snapshot) -> None:
+    """用快照整体替换当前知识库与向量索引。"""
+    global _POLICIES, _CASES, _SNAPSHOT_VERSION
+    # 先构建完整的新字典再一次性替换，避免并发读取到半成品
+    _POLICIES = {p.doc_id: p for p in snap.policies}
+    _CASES = {c.case_id: c for c in snap.cases}
+    _INDEXES.update({"policy": snap.policy_index, "case": snap.case_index})
+    _SNAPSHOT_VERSION = snap.version
+
+
+def snapshot_version() -> str | None:
+    return _SNAPSHOT_VERSION
+
+
+def vector_index(kind: Literal["policy", "case"]) -> VectorStore | None:
+    return _INDEXES.get(kind)
+
+
 def seed_demo_kb() -> dict[str, Any]:
     today = date.today().isoformat()
 
@@ -76,6 +111,7 @@ def seed_demo_kb() -> dict[str, Any]:
         _POLICIES[p.doc_id] = p
     for c in cases:
         _CASES[c.case_id] = c
+    metrics.KB_INGESTS.inc(kind="seed")
 
     return {"policies": len(_POLICIES), "cases": len(_CASES)}
 
@@ -94,6 +130,9 @@ def ingest_policy(
         effective_from=effective_from,
         scope=scope,
     )
+    # 本地录入后预计算索引已过期，回退为实时向量化检索
+    _INDEXES.pop("policy", None)
+    metrics.KB_INGESTS.inc(kind="policy")
     return {"ok": True, "policies": len(_POLICIES)}
 
 
@@ -113,15 +152,43 @@ def ingest_case(
         reasons=reasons,
         tags=tags,
     )
+    _INDEXES.pop("case", None)
+    metrics.KB_INGESTS.inc(kind="case")
     return {"ok": True, "cases": len(_CASES)}
 
 
+def list_policies() -> list[PolicyDoc]:
+    return list(_POLICIES.values())
+
+
+def list_cases() -> list[CaseDoc]:
+    return list(_CASES.values())
+
+
+def _policy_text(p: PolicyDoc) -> str:
+    return f"{p.title}\n{p.content}"
+
+
+def _case_text(c: CaseDoc) -> str:
+    return f"{c.summary}\n{c.reasons}"
+
+
 def iter_policy_texts() -> list[tuple[str, str]]:
-    return [(p.doc_id, f"{p.title}\n{p.content}") for p in _POLICIES.values()]
+    return [(p.doc_id, _policy_text(p)) for p in _POLICIES.values()]
 
 
 def iter_case_texts() -> list[tuple[str, str]]:
-    return [(c.case_id, f"{c.summary}\n{c.reasons}") for c in _CASES.values()]
+    return [(c.case_id, _case_text(c)) for c in _CASES.values()]
+
+
+def policy_text(doc_id: str) -> str:
+    p = _POLICIES.get(doc_id)
+    return _policy_text(p) if p is not None else ""
+
+
+def case_text(case_id: str) -> str:
+    c = _CASES.get(case_id)
+    return _case_text(c) if c is not None else ""
 
 
 def get_policy_json(doc_id: str) -> str:
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+# 延迟直方图默认分桶（秒），覆盖本地规则计算到远程 Embedding 调用的量级
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: tuple[tuple[str, str], ...] = ()) -> str:
+    items = key + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def _snapshot_key(key: LabelKey, default: str) -> str:
+    return ",".join(f"{k}={v}" for k, v in key) or default
+
+
+def _format_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+
+class Counter:
+    """单调递增计数器，按标签组合分别计数。"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in items]
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {_snapshot_key(k, "total"): v for k, v in sorted(self._values.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge:
+    """瞬时值指标；可绑定回调在导出时实时取值（如知识库文档数）。"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[LabelKey, float] = {}
+        self._callbacks: dict[LabelKey, Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def set_function(self, fn: Callable[[], float], **labels: Any) -> None:
+        with self._lock:
+            self._callbacks[_label_key(labels)] = fn
+
+    def _collect(self) -> list[tuple[LabelKey, float]]:
+        with self._lock:
+            values = dict(self._values)
+            callbacks = dict(self._callbacks)
+        for key, fn in callbacks.items():
+            values[key] = float(fn())
+        return sorted(values.items())
+
+    def render(self) -> list[str]:
+        return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in self._collect()]
+
+    def snapshot(self) -> dict[str, Any]:
+        return {_snapshot_key(k, "value"): v for k, v in self._collect()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * n_buckets
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    """固定分桶直方图，导出累计分桶并支持按分桶估算分位数。"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[LabelKey, _HistogramSeries] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series.counts[i] += 1
+                    break
+            series.count += 1
+            series.sum += value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantile(self, q: float, **labels: Any) -> float | None:
+        """按分桶线性插值估算分位数；超出最大分桶时返回最大分桶上界。"""
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            if series is None or series.count == 0:
+                return None
+            counts = list(series.counts)
+            total = series.count
+        rank = q * total
+        cumulative = 0
+        lower = 0.0
+        for bound, c in zip(self.buckets, counts):
+            if c and cumulative + c >= rank:
+                return lower + (bound - lower) * ((rank - cumulative) / c)
+            cumulative += c
+            lower = bound
+        return self.buckets[-1]
+
+    def render(self) -> list[str]:
+        lines: list[str] = []
+        with self._lock:
+            items = sorted(
+                (k, list(s.counts), s.count, s.sum) for k, s in self._series.items()
+            )
+        for key, counts, count, total in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            keys = sorted(self._series)
+            stats = {k: (self._series[k].count, self._series[k].sum) for k in keys}
+        out: dict[str, Any] = {}
+        for key in keys:
+            count, total = stats[key]
+            labels = dict(key)
+            out[_snapshot_key(key, "all")] = {
+                "count": count,
+                "sum_ms": round(total * 1000, 3),
+                "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+                "p50_ms": _ms(self.quantile(0.5, **labels)),
+                "p95_ms": _ms(self.quantile(0.95, **labels)),
+                "p99_ms": _ms(self.quantile(0.99, **labels)),
+            }
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+def _ms(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class Registry:
+    """指标注册表：同名指标只创建一次，统一导出。"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Gauge | Histogram] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args: Any):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"指标 {name} 已注册为 {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text)
+
+    def histogram(
+        self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines: list[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return {m.name: m.snapshot() for m in metrics}
+
+    def reset(self) -> None:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            m.reset()
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "compliance_stage_seconds", "assess 流程各阶段耗时（秒），按 stage 区分"
+)
+TOOL_SECONDS = REGISTRY.histogram("compliance_tool_seconds", "MCP 工具调用总耗时（秒）")
+TOOL_CALLS = REGISTRY.counter("compliance_tool_calls_total", "MCP 工具调用次数")
+TOOL_ERRORS = REGISTRY.counter("compliance_tool_errors_total", "MCP 工具调用异常次数")
+EMBEDDING_TEXTS = REGISTRY.counter(
+    "compliance_embedding_texts_total", "发送给 Embedding 服务的文本条数"
+)
+KB_INGESTS = REGISTRY.counter("compliance_kb_ingest_total", "知识库录入次数，按 kind 区分")
+KB_DOCS = REGISTRY.gauge("compliance_kb_documents", "知识库当前文档数，按 kind 区分")
+
+
+@contextmanager
+def timer(stage: str) -> Iterator[None]:
+    """记录一个处理阶段的耗时：`with timer("rules"): ...`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
@@ -4,10 +4,14 @@ import math
 import re
 import os
 import requests
-from typing import Any, List
+from typing import TYPE_CHECKING, Any, Callable, List
 
+from . import metrics
 from .models import SourceSystem
 
+if TYPE_CHECKING:
+    from .vectorstore import VectorStore
+
 EMBEDDING_SERVICE_URL = os.getenv(
     "EMBEDDING_SERVICE_URL", "http://localhost:8003/embed"
 )
@@ -20,15 +24,19 @@ class RemoteEmbeddings:
         self.url = url
 
     def embed_query(self, text: str) -> List[float]:
-        response = requests.post(self.url, json={"input": text})
-        # 在实际生产中应添加重试机制和错误处理
-        response.raise_for_status()
-        return response.json()["embeddings"][0]
+        metrics.EMBEDDING_TEXTS.inc(kind="query")
+        with metrics.timer("embed_query"):
+            response = requests.post(self.url, json={"input": text})
+            # 在实际生产中应添加重试机制和错误处理
+            response.raise_for_status()
+            return response.json()["embeddings"][0]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        response = requests.post(self.url, json={"input": texts})
-        response.raise_for_status()
-        return response.json()["embeddings"]
+        metrics.EMBEDDING_TEXTS.inc(len(texts), kind="document")
+        with metrics.timer("embed_documents"):
+            response = requests.post(self.url, json={"input": texts})
+            response.raise_for_status()
+            return response.json()["embeddings"]
 
 
 def get_embeddings_model():
@@ -62,12 +70,13 @@ def topk_by_similarity(
     doc_texts = [doc[1] for doc in docs]
     doc_vecs = embeddings_model.embed_documents(doc_texts)
 
-    scored: list[tuple[float, str, str]] = []
-    for i, (doc_id, doc_text) in enumerate(docs):
-        sim = vector_cosine_similarity(query_vec, doc_vecs[i])
-        scored.append((sim, doc_id, doc_text))
+    with metrics.timer("similarity"):
+        scored: list[tuple[float, str, str]] = []
+        for i, (doc_id, doc_text) in enumerate(docs):
+            sim = vector_cosine_similarity(query_vec, doc_vecs[i])
+            scored.append((sim, doc_id, doc_text))
 
-    scored.sort(key=lambda x: x[0], reverse=True)
+        scored.sort(key=lambda x: x[0], reverse=True)
     results: list[dict[str, Any]] = []
     for score, doc_id, doc_text in scored[:k]:
         results.append(
@@ -76,6 +85,25 @@ def topk_by_similarity(
     return results
 
 
+def topk_by_index(
+    query_vec: List[float],
+    index: VectorStore,
+    text_getter: Callable[[str], str],
+    k: int = 3,
+) -> list[dict[str, Any]]:
+    """基于内存映射向量库检索，只需向量化查询本身。"""
+    if len(index) == 0:
+        return []
+
+    with metrics.timer("similarity"):
+        hits = index.search(query_vec, k=k)
+
+    return [
+        {"id": doc_id, "score": round(float(score), 4), "excerpt": text_getter(doc_id)[:240]}
+        for doc_id, score in hits
+    ]
+
+
 def build_query(source_system: SourceSystem, payload: dict[str, Any]) -> str:
     parts: list[str] = [source_system]
     for key in [
@@ -1,45 +1,140 @@
 from __future__ import annotations
 
+import functools
+import time
 from typing import Any, Literal, Union
 
 import os
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
 
-from . import kb, service
+from . import kb, metrics, service, snapshot, tracing
 from .models import SourceSystem
 
 # 加载环境变量
 load_dotenv()
 
 mcp = FastMCP("ComplianceWarningDemo", json_response=True, port=8001)
+tracing.set_service_name(mcp.name)
+
+
+# 多进程部署模式（见 deploy.py）下由 configure_worker 设置：
+# 知识库从只读快照加载，录入类工具转发给写者进程
+_SNAPSHOT_DIR: str | None = None
+_WRITER = None
+
+
+def configure_worker(snapshot_dir: str, writer) -> None:
+    global _SNAPSHOT_DIR, _WRITER
+    _SNAPSHOT_DIR = snapshot_dir
+    _WRITER = writer
+    refresh_snapshot()
+
+
+def refresh_snapshot() -> str | None:
+    """若写者已发布新快照则重新加载；每次请求只需读取一次很小的 CURRENT 文件。"""
+    version = snapshot.current_version(_SNAPSHOT_DIR)
+    if version is None or version == kb.snapshot_version():
+        return None
+    try:
+        snap = snapshot.load(_SNAPSHOT_DIR, version)
+    except FileNotFoundError:
+        # 读取期间旧版本被清理，改读最新版本
+        snap = snapshot.load(_SNAPSHOT_DIR)
+    if snap is not None:
+        kb.load_snapshot(snap)
+        return snap.version
+    return None
 
 
 def ensure_seeded() -> dict[str, Any] | None:
+    if _SNAPSHOT_DIR is not None:
+        refresh_snapshot()
+        return None
     if kb.is_seeded():
         return None
     return kb.seed_demo_kb()
 
 
+def write_kb(op: str, **kwargs: Any) -> dict[str, Any]:
+    """执行知识库录入：单进程模式直接写入，多进程模式交给写者并等待新快照发布。"""
+    if _WRITER is None:
+        return getattr(kb, op)(**kwargs)
+    result = _WRITER.call(op, **kwargs)
+    refresh_snapshot()
+    return result
+
+
+def _trace_parent() -> tracing.SpanContext | None:
+    """调用方的 trace context：优先取 MCP 请求 params._meta.traceparent，其次取 HTTP 请求头。"""
+    try:
+        request_context = mcp.get_context().request_context
+    except (LookupError, ValueError):
+        return None
+    if request_context is None:
+        return None
+    meta = request_context.meta.model_dump() if request_context.meta is not None else {}
+    parent = tracing.parse_traceparent(meta.get("traceparent"))
+    request = request_context.request
+    if parent is None and request is not None:
+        parent = tracing.extract(request.headers)
+    return parent
+
+
+def instrumented(fn):
+    """记录工具调用次数、异常次数与总耗时，并为每次调用记录一个 span；需放在 @mcp.tool() 之下以保留函数签名。"""
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        tool = fn.__name__
+        metrics.TOOL_CALLS.inc(tool=tool)
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"tool {tool}", parent=_trace_parent(), kind="server", tool=tool):
+                return fn(*args, **kwargs)
+        except Exception:
+            metrics.TOOL_ERRORS.inc(tool=tool)
+            raise
+        finally:
+            metrics.TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool)
+
+    return wrapper
+
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Prometheus 文本格式的指标导出端点。"""
+    return PlainTextResponse(
+        metrics.REGISTRY.render_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 @mcp.tool()
+@instrumented
 def seed_demo_kb() -> dict[str, Any]:
     """初始化知识库，填充演示用的制度条款和历史案例数据。"""
-    return kb.seed_demo_kb()
+    return write_kb("seed_demo_kb")
 
 
 @mcp.tool()
+@instrumented
 def demo_payload(source_system: SourceSystem) -> dict[str, Any]:
     """获取指定业务系统的示例输入数据（Payload）。支持：decision(议事), procurement(招标), analytics(分析)。"""
     return service.demo_payload(source_system)
 
 
 @mcp.tool()
+@instrumented
 def schema_hint(source_system: SourceSystem) -> dict[str, Any]:
     """获取指定业务系统的输入字段说明，帮助了解需要提供哪些合规审查要素。"""
     return service.schema_hint(source_system)
 
 
 @mcp.tool()
+@instrumented
 def ingest_policy(
     doc_id: str,
     title: str,
@@ -48,7 +143,8 @@ def ingest_policy(
     scope: str | None = None,
 ) -> dict[str, Any]:
     """向知识库动态录入一条新的制度条款。"""
-    return kb.ingest_policy(
+    return write_kb(
+        "ingest_policy",
         doc_id=doc_id,
         title=title,
         content=content,
@@ -58,6 +154,7 @@ def ingest_policy(
 
 
 @mcp.tool()
+@instrumented
 def ingest_case(
     case_id: str,
     summary: str,
@@ -66,7 +163,8 @@ def ingest_case(
     tags_json: Union[str, list[str]] = "[]",
 ) -> dict[str, Any]:
     """向知识库动态录入一个历史合规案例（审计结果或否决记录）。"""
-    return kb.ingest_case(
+    return write_kb(
+        "ingest_case",
         case_id=case_id,
         summary=summary,
         decision=decision,
@@ -76,6 +174,7 @@ def ingest_case(
 
 
 @mcp.tool()
+@instrumented
 def assess_compliance_risk(
     source_system: SourceSystem, payload: Union[dict[str, Any], str]
 ) -> dict[str, Any]:
@@ -98,6 +197,7 @@ def assess_compliance_risk(
 
 
 @mcp.tool()
+@instrumented
 def calculate_risk_score(
     signals: list[dict[str, Any]],
     policy_hits: list[dict[str, Any]],
@@ -119,12 +219,19 @@ def calculate_risk_score(
 
 
 @mcp.tool()
+@instrumented
 def assess_demo(source_system: SourceSystem) -> dict[str, Any]:
     """一键评估工具：使用内置的示例数据运行一次完整的风险评估流程。"""
     ensure_seeded()
     return service.assess_demo(source_system)
 
 
+@mcp.tool()
+def server_stats() -> dict[str, Any]:
+    """查看服务运行指标：各阶段耗时分位数（毫秒）、工具调用与异常次数、知识库规模等。"""
+    return metrics.REGISTRY.snapshot()
+
+
 @mcp.resource("policy://{doc_id}")
 def get_policy(doc_id: str) -> str:
     """资源获取：根据 ID 获取特定制度条款的详细 JSON 内容。"""
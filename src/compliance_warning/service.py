@@ -3,9 +3,9 @@ from __future__ import annotations
 import json
 from typing import Any
 
-from . import kb
+from . import kb, metrics
 from .models import SourceSystem
-from .retrieval import build_query, topk_by_similarity
+from .retrieval import build_query, get_embeddings_model, topk_by_index, topk_by_similarity
 from .rules import evaluate_rules
 from .scoring import score_probability
 
@@ -115,12 +115,40 @@ def calculate_risk_score_service(
     """
     计算风险评分的包装服务。
     """
-    return score_probability(
-        signals=signals,
-        policy_hits=policy_hits,
-        case_hits=case_hits,
-        case_decision_getter=kb.get_case_decision,
-    )
+    with metrics.timer("scoring"):
+        return score_probability(
+            signals=signals,
+            policy_hits=policy_hits,
+            case_hits=case_hits,
+            case_decision_getter=kb.get_case_decision,
+        )
+
+
+def retrieve_hits(query: str, k: int = 3) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """检索相似制度与案例；存在快照向量索引时只向量化查询一次，否则实时向量化全部文档。"""
+    policy_index = kb.vector_index("policy")
+    case_index = kb.vector_index("case")
+    query_vec = None
+    if policy_index is not None or case_index is not None:
+        query_vec = get_embeddings_model().embed_query(query)
+
+    with metrics.timer("retrieve_policies"):
+        if policy_index is not None:
+            policy_hits = topk_by_index(query_vec, policy_index, kb.policy_text, k=k)
+        else:
+            with metrics.timer("kb_load"):
+                policy_docs = kb.iter_policy_texts()
+            policy_hits = topk_by_similarity(query, policy_docs, k=k) if policy_docs else []
+
+    with metrics.timer("retrieve_cases"):
+        if case_index is not None:
+            case_hits = topk_by_index(query_vec, case_index, kb.case_text, k=k)
+        else:
+            with metrics.timer("kb_load"):
+                case_docs = kb.iter_case_texts()
+            case_hits = topk_by_similarity(query, case_docs, k=k) if case_docs else []
+
+    return policy_hits, case_hits
 
 
 def assess_compliance_context(source_system: SourceSystem, payload: Any) -> dict[str, Any]:
@@ -128,24 +156,24 @@ def assess_compliance_context(source_system: SourceSystem, payload: Any) -> dict
     收集风控上下文信息：包括解析数据、运行规则引擎、检索历史案例与制度。
     注意：此函数不再进行评分或LLM评估，仅提供原始证据供上层模型分析。
     """
-    payload_data = parse_payload_json(payload)
-    query = build_query(source_system, payload_data)
-
-    policy_docs = kb.iter_policy_texts()
-    case_docs = kb.iter_case_texts()
-
-    policy_hits = topk_by_similarity(query, policy_docs, k=3) if policy_docs else []
-    case_hits = topk_by_similarity(query, case_docs, k=3) if case_docs else []
-
-    signals = evaluate_rules(source_system, payload_data)
-
-    citations: list[dict[str, Any]] = []
-    for hit in policy_hits:
-        citations.append({"type": "policy", **hit})
-    for hit in case_hits:
-        citations.append(
-            {"type": "case", **hit, "case_decision": kb.get_case_decision(hit["id"])}
-        )
+    with metrics.timer("parse"):
+        payload_data = parse_payload_json(payload)
+    with metrics.timer("build_query"):
+        query = build_query(source_system, payload_data)
+
+    policy_hits, case_hits = retrieve_hits(query)
+
+    with metrics.timer("rules"):
+        signals = evaluate_rules(source_system, payload_data)
+
+    with metrics.timer("citations"):
+        citations: list[dict[str, Any]] = []
+        for hit in policy_hits:
+            citations.append({"type": "policy", **hit})
+        for hit in case_hits:
+            citations.append(
+                {"type": "case", **hit, "case_decision": kb.get_case_decision(hit["id"])}
+            )
 
     return {
         "source_system": source_system,
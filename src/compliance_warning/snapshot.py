@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass
+
+from .models import CaseDoc, PolicyDoc
+from .vectorstore import VectorStore
+
+# 快照目录结构：
+#   <root>/CURRENT                 当前生效的快照名（原子替换）
+#   <root>/v000003/kb.json         制度与案例原文，及对应的向量库代数 {"vectors": {"policy": 5, "case": 3}}
+#   <root>/vectors/policy/         制度向量库（格式见 vectorstore.py），多个快照版本共享其段文件
+#   <root>/vectors/case/           案例向量库
+# 读者通过 numpy 内存映射打开向量段，多个进程共享同一份页缓存。
+
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+VECTOR_KINDS = ("policy", "case")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: str
+    policies: list[PolicyDoc]
+    cases: list[CaseDoc]
+    policy_index: VectorStore
+    case_index: VectorStore
+    vector_generations: dict[str, int]
+
+
+def vector_store_path(root: str, kind: str) -> str:
+    return os.path.join(root, "vectors", kind)
+
+
+def current_version(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _next_version(root: str) -> str:
+    numbers = [int(name[1:]) for name in os.listdir(root) if name.startswith("v") and name[1:].isdigit()]
+    return f"v{max(numbers, default=0) + 1:06d}"
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def publish(
+    root: str,
+    policies: list[PolicyDoc],
+    cases: list[CaseDoc],
+    vector_generations: dict[str, int],
+) -> str:
+    """写入新快照并原子切换 CURRENT；仅应由单一写者进程调用。
+
+    向量须已由写者追加到 vectors/ 下的向量库，这里只记录与原文对应的向量库代数。
+    """
+    os.makedirs(root, exist_ok=True)
+    version = _next_version(root)
+    tmp_path = os.path.join(root, f".tmp-{version}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    with open(os.path.join(tmp_path, "kb.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "policies": [asdict(p) for p in policies],
+                "cases": [asdict(c) for c in cases],
+                "vectors": vector_generations,
+            },
+            f,
+            ensure_ascii=False,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_dir(tmp_path)
+    os.rename(tmp_path, os.path.join(root, version))
+
+    pointer_tmp = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+    _fsync_dir(root)
+
+    _prune(root, keep=KEEP_VERSIONS)
+    return version
+
+
+def _prune(root: str, keep: int) -> None:
+    # 已打开旧快照的读者持有内存映射，删除目录不影响其继续读取
+    versions = sorted(name for name in os.listdir(root) if name.startswith("v") and name[1:].isdigit())
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def load(root: str, version: str | None = None) -> Snapshot | None:
+    version = version or current_version(root)
+    if version is None:
+        return None
+    path = os.path.join(root, version)
+    with open(os.path.join(path, "kb.json"), encoding="utf-8") as f:
+        data = json.load(f)
+    generations = data["vectors"]
+    return Snapshot(
+        version=version,
+        policies=[PolicyDoc(**p) for p in data["policies"]],
+        cases=[CaseDoc(**c) for c in data["cases"]],
+        policy_index=VectorStore.open(vector_store_path(root, "policy"), generations["policy"]),
+        case_index=VectorStore.open(vector_store_path(root, "case"), generations["case"]),
+        vector_generations=generations,
+    )
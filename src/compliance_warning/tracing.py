@@ -0,0 +1,435 @@
+"""轻量分布式追踪：W3C traceparent 传播、span 记录与导出，以及按 trace id 渲染瀑布图的命令行。
+
+不依赖 OpenTelemetry SDK。span 结束后进入后台线程批量导出：
+  - TRACE_FILE：追加写入 JSONL 文件（每行一个 span），多个进程可写同一文件；
+  - OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_EXPORTER_OTLP_TRACES_ENDPOINT：以 OTLP/HTTP JSON 发送到本地 Collector。
+两者都未设置时仍生成并传播 trace context，但不记录 span。
+
+用法（在项目根目录）：
+    python -m src.compliance_warning.tracing list --file logs/traces.jsonl
+    python -m src.compliance_warning.tracing show <trace_id> --file logs/traces.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import atexit
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Mapping
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+# 不追踪的探活与指标端点
+SKIP_PATH_PREFIXES = ("/health", "/metrics", "/registry")
+EXPORT_BATCH = 256
+EXPORT_INTERVAL = 1.0
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    # 仅进程内有效：子 span 默认沿用父 span 的服务名（不随 traceparent 传播）
+    service: str | None = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+@dataclass
+class Span:
+    name: str
+    service: str
+    context: SpanContext
+    parent_id: str | None = None
+    kind: str = "internal"
+    attributes: dict[str, Any] = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    status: str = "ok"
+
+    @property
+    def trace_id(self) -> str:
+        return self.context.trace_id
+
+    @property
+    def traceparent(self) -> str:
+        return self.context.traceparent
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def set_error(self, error: BaseException | str) -> None:
+        self.status = "error"
+        self.attributes["error"] = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        """结束并导出 span；重复调用只生效一次。"""
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if _exporter is not None:
+            _exporter.submit(self)
+
+    def to_dict(self) -> dict[str, Any]:
+        end = self.end_ns or time.time_ns()
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.context.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "service": self.service,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": end,
+            "duration_ms": round((end - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+_current: ContextVar[SpanContext | None] = ContextVar("trace_context", default=None)
+_service_name = os.getenv("OTEL_SERVICE_NAME", "unknown")
+
+
+def set_service_name(name: str) -> None:
+    """设置本进程 span 的默认服务名（OTEL_SERVICE_NAME 优先）。"""
+    global _service_name
+    _service_name = os.getenv("OTEL_SERVICE_NAME", name)
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    match = _TRACEPARENT_RE.match((value or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2))
+
+
+def extract(headers: Mapping[str, str] | None) -> SpanContext | None:
+    if not headers:
+        return None
+    return parse_traceparent(headers.get("traceparent"))
+
+
+def current() -> SpanContext | None:
+    return _current.get()
+
+
+def inject(headers: dict[str, str] | None = None, span: Span | None = None) -> dict[str, str]:
+    """把 span（默认为当前上下文）的 traceparent 写入请求头。"""
+    headers = headers if headers is not None else {}
+    context = span.context if span is not None else _current.get()
+    if context is not None:
+        headers["traceparent"] = context.traceparent
+    return headers
+
+
+def start_span(
+    name: str,
+    parent: SpanContext | None = None,
+    service: str | None = None,
+    kind: str = "internal",
+    **attributes: Any,
+) -> Span:
+    """创建 span 但不设为当前上下文，适用于跨越流式响应、需在回调中结束的操作。"""
+    parent = parent or _current.get()
+    trace_id = parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}"
+    service = service or (parent.service if parent is not None else None) or _service_name
+    return Span(
+        name=name,
+        service=service,
+        context=SpanContext(trace_id, f"{random.getrandbits(64):016x}", service),
+        parent_id=parent.span_id if parent is not None else None,
+        kind=kind,
+        attributes=attributes,
+    )
+
+
+def activate(span: Span) -> Token:
+    return _current.set(span.context)
+
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+
+@contextmanager
+def span(
+    name: str,
+    parent: SpanContext | None = None,
+    service: str | None = None,
+    kind: str = "internal",
+    **attributes: Any,
+) -> Iterator[Span]:
+    """`with span("classify"):` 记录一段同步或 await 代码，其间创建的 span 均为其子 span。
+
+    不要在跨 yield 的异步生成器中使用（恢复时的上下文可能不同），改用 start_span/end。
+    """
+    s = start_span(name, parent=parent, service=service, kind=kind, **attributes)
+    token = activate(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.set_error(e)
+        raise
+    finally:
+        deactivate(token)
+        s.end()
+
+
+class TraceMiddleware:
+    """ASGI 中间件：从请求头提取 traceparent，为每个 HTTP 请求（含流式响应体）记录一个 server span，
+    并在响应头中返回 x-trace-id 便于按 id 查询。"""
+
+    def __init__(self, app: Any, service: str):
+        self.app = app
+        self.service = service
+
+    async def __call__(self, scope: dict, receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PATH_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        s = start_span(
+            f"{scope['method']} {scope['path']}",
+            parent=extract(headers),
+            service=self.service,
+            kind="server",
+            **{"http.method": scope["method"], "http.target": scope["path"]},
+        )
+
+        async def traced_send(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                s.set(**{"http.status_code": message["status"]})
+                if message["status"] >= 500:
+                    s.status = "error"
+                message = {**message, "headers": [*message.get("headers", []), (b"x-trace-id", s.trace_id.encode())]}
+            await send(message)
+
+        token = activate(s)
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as e:
+            s.set_error(e)
+            raise
+        finally:
+            deactivate(token)
+            s.end()
+
+
+def mount_tracing(app: Any, service: str) -> None:
+    """为 FastAPI/Starlette 应用启用追踪，并把 service 设为本进程的默认服务名。"""
+    if _service_name == "unknown":
+        set_service_name(service)
+    app.add_middleware(TraceMiddleware, service=service)
+
+
+def _otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_OTLP_KINDS = {"internal": 1, "server": 2, "client": 3}
+
+
+def to_otlp(spans: list[Span]) -> dict[str, Any]:
+    """按服务分组转换为 OTLP/HTTP JSON 的 ExportTraceServiceRequest。"""
+    by_service: dict[str, list[dict[str, Any]]] = {}
+    for s in spans:
+        by_service.setdefault(s.service, []).append({
+            "traceId": s.trace_id,
+            "spanId": s.context.span_id,
+            "parentSpanId": s.parent_id or "",
+            "name": s.name,
+            "kind": _OTLP_KINDS.get(s.kind, 1),
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns or s.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2 if s.status == "error" else 1},
+        })
+    return {
+        "resourceSpans": [
+            {
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+                "scopeSpans": [{"scope": {"name": "a2a"}, "spans": items}],
+            }
+            for service, items in by_service.items()
+        ]
+    }
+
+
+class SpanExporter:
+    """后台线程批量导出：请求路径上只做一次入队，文件写入与网络发送不阻塞事件循环。"""
+
+    def __init__(self, file_path: str | None = None, otlp_endpoint: str | None = None):
+        self.file_path = file_path
+        self.otlp_endpoint = otlp_endpoint
+        self.dropped = 0
+        self._queue: queue.Queue[Span | None] = queue.Queue(maxsize=10000)
+        self._lock = threading.Lock()
+        if file_path:
+            os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, s: Span) -> None:
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: list[Span] = []
+            deadline = time.monotonic() + EXPORT_INTERVAL
+            stop = False
+            while len(batch) < EXPORT_BATCH:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.01))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            if batch:
+                self.export(batch)
+            if stop:
+                return
+
+    def export(self, batch: list[Span]) -> None:
+        with self._lock:
+            if self.file_path:
+                lines = "".join(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n" for s in batch)
+                with open(self.file_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+            if self.otlp_endpoint:
+                request = urllib.request.Request(
+                    self.otlp_endpoint,
+                    data=json.dumps(to_otlp(batch), default=str).encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                )
+                try:
+                    urllib.request.urlopen(request, timeout=2).close()
+                except OSError:
+                    self.dropped += len(batch)  # Collector 不可达时丢弃，不影响请求处理
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+def _otlp_endpoint_from_env() -> str | None:
+    endpoint = os.getenv("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT")
+    if endpoint:
+        return endpoint
+    base = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+    return base.rstrip("/") + "/v1/traces" if base else None
+
+
+def configure(file_path: str | None = None, otlp_endpoint: str | None = None) -> SpanExporter | None:
+    """按参数或环境变量（TRACE_FILE、OTEL_EXPORTER_OTLP_*）启用导出；都为空时关闭导出。"""
+    global _exporter
+    if _exporter is not None:
+        _exporter.shutdown()
+    file_path = file_path or os.getenv("TRACE_FILE") or None
+    otlp_endpoint = otlp_endpoint or _otlp_endpoint_from_env()
+    _exporter = SpanExporter(file_path, otlp_endpoint) if (file_path or otlp_endpoint) else None
+    return _exporter
+
+
+_exporter: SpanExporter | None = None
+configure()
+atexit.register(lambda: _exporter.shutdown() if _exporter is not None else None)
+
+
+def load_spans(path: str, trace_id: str | None = None) -> list[dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # 并发写入时可能出现的残行
+            if trace_id is None or record.get("trace_id", "").startswith(trace_id):
+                spans.append(record)
+    return spans
+
+
+def render_waterfall(spans: list[dict[str, Any]], width: int = 50) -> str:
+    """把同一 trace 的 span 按父子关系缩进、按时间轴绘制为文本瀑布图。"""
+    if not spans:
+        return "(no spans)"
+    ids = {s["span_id"] for s in spans}
+    children: dict[str | None, list[dict[str, Any]]] = {}
+    for s in spans:
+        # 父 span 不在文件中（如上游服务未导出）时作为根节点显示
+        parent = s.get("parent_id") if s.get("parent_id") in ids else None
+        children.setdefault(parent, []).append(s)
+    start = min(s["start_ns"] for s in spans)
+    total = max(max(s["end_ns"] for s in spans) - start, 1)
+    lines = [f"trace {spans[0]['trace_id']}  total {total / 1e6:.1f}ms"]
+
+    def walk(parent: str | None, depth: int) -> None:
+        for s in sorted(children.get(parent, []), key=lambda x: x["start_ns"]):
+            offset = int((s["start_ns"] - start) / total * width)
+            length = max(1, int((s["end_ns"] - s["start_ns"]) / total * width))
+            bar = " " * offset + "█" * min(length, width - offset)
+            label = f"{'  ' * depth}{s['service']}: {s['name']}"
+            flag = " !" if s.get("status") == "error" else ""
+            lines.append(f"{label[:48]:<48} |{bar:<{width}}| {s['duration_ms']:9.1f}ms{flag}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render trace waterfalls from a TRACE_FILE (JSONL)")
+    parser.add_argument("--file", default=os.getenv("TRACE_FILE", "logs/traces.jsonl"), help="span JSONL 文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    show = sub.add_parser("show", help="渲染指定 trace 的瀑布图（trace id 可用前缀）")
+    show.add_argument("trace_id")
+    show.add_argument("--width", type=int, default=50)
+    listing = sub.add_parser("list", help="列出最慢的 trace")
+    listing.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        spans = load_spans(args.file, args.trace_id)
+        matched = sorted({s["trace_id"] for s in spans})
+        if len(matched) > 1:
+            # 前缀不唯一时不把多个 trace 混在一张图里，列出候选让用户给出更长的前缀
+            candidates = "\n".join(matched)
+            parser.exit(1, f"trace id prefix {args.trace_id!r} matches {len(matched)} traces:\n{candidates}\n")
+        print(render_waterfall(spans, args.width))
+        return
+    traces: dict[str, list[dict[str, Any]]] = {}
+    for s in load_spans(args.file):
+        traces.setdefault(s["trace_id"], []).append(s)
+    rows = []
+    for trace_id, spans in traces.items():
+        duration = (max(s["end_ns"] for s in spans) - min(s["start_ns"] for s in spans)) / 1e6
+        root = min(spans, key=lambda s: s["start_ns"])
+        rows.append((duration, trace_id, root, len(spans)))
+    for duration, trace_id, root, count in sorted(rows, key=lambda r: r[0], reverse=True)[: args.limit]:
+        print(f"{trace_id}  {duration:9.1f}ms  {count:3d} spans  {root['service']}: {root['name']}")
+
+
+if __name__ == "__main__":
+    main()
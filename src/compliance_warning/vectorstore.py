@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import json
+import os
+import struct
+from typing import Iterable
+
+import numpy as np
+
+# 向量库目录结构：
+#   <store>/CURRENT                 当前生效的 manifest 代数（原子替换）
+#   <store>/MANIFEST-000007.json    不可变 manifest：维度、数据类型、段列表及各段已删除行
+#   <store>/seg-000003.cwv          不可变段文件
+#
+# 段文件格式（小端）：
+#   [0, 64)        头部：magic "CWVS"、格式版本、dtype、dim、行数、各区偏移
+#   [64, ...)      向量矩阵 count x dim（float32 或 float16，行已 L2 归一化）
+#   ids_offset     id 偏移表 uint64[count + 1]
+#   blob_offset    id 的 UTF-8 字节串
+#
+# 读者只读取头部与 manifest，矩阵与 id 表均通过 numpy.memmap 按需分页，打开代价与规模无关；
+# 写入只追加新段并发布新 manifest，旧段中被覆盖的行记为删除，由 compact 回收。
+
+MAGIC = b"CWVS"
+FORMAT_VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct("<4sHBBIQQQQ")
+_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+_DTYPE_CODES = {"float32": 1, "float16": 2}
+# 检索时按块把 float16 转为 float32 计算，限制临时内存
+SEARCH_CHUNK_ROWS = 4096
+# 保留的 manifest 代数；须覆盖快照保留的各版本所引用的代数（每次发布至多追加 + 合并两代）
+KEEP_GENERATIONS = 8
+
+
+def _align(n: int, to: int = 8) -> int:
+    return (n + to - 1) // to * to
+
+
+def _fsync_dir(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def normalize_rows(vectors: Iterable[Iterable[float]] | np.ndarray) -> np.ndarray:
+    matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0.0] = 1.0
+    return matrix / norms
+
+
+def write_segment(path: str, ids: list[str], matrix: np.ndarray, dtype: str = "float32") -> None:
+    """写出一个不可变段文件（先写临时文件再原子改名）。"""
+    code = _DTYPE_CODES[dtype]
+    data = np.ascontiguousarray(matrix, dtype=_DTYPES[code])
+    count, dim = data.shape
+    encoded = [i.encode("utf-8") for i in ids]
+    offsets = np.zeros(count + 1, dtype="<u8")
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    matrix_offset = HEADER_SIZE
+    ids_offset = _align(matrix_offset + data.nbytes)
+    blob_offset = ids_offset + offsets.nbytes
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, code, 0, dim, count, matrix_offset, ids_offset, blob_offset
+        )
+        f.write(header.ljust(HEADER_SIZE, b"\0"))
+        f.write(data.tobytes())
+        f.write(b"\0" * (ids_offset - matrix_offset - data.nbytes))
+        f.write(offsets.tobytes())
+        f.write(b"".join(encoded))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class Segment:
+    """以内存映射方式打开的只读段。"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        magic, version, code, _, dim, count, matrix_offset, ids_offset, blob_offset = _HEADER.unpack(
+            header[: _HEADER.size]
+        )
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a vector segment (or unsupported version): {path}")
+        self.dim = dim
+        self.count = count
+        self.dtype = _DTYPES[code]
+        if count:
+            self.matrix = np.memmap(path, dtype=self.dtype, mode="r", offset=matrix_offset, shape=(count, dim))
+            self._offsets = np.memmap(path, dtype="<u8", mode="r", offset=ids_offset, shape=(count + 1,))
+        else:
+            self.matrix = np.zeros((0, dim), dtype=self.dtype)
+            self._offsets = np.zeros(1, dtype="<u8")
+        blob_len = int(self._offsets[-1])
+        self._blob = (
+            np.memmap(path, dtype=np.uint8, mode="r", offset=blob_offset, shape=(blob_len,))
+            if blob_len
+            else np.zeros(0, dtype=np.uint8)
+        )
+
+    def id_at(self, row: int) -> str:
+        start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+        return bytes(self._blob[start:end]).decode("utf-8")
+
+    def ids(self) -> list[str]:
+        return [self.id_at(i) for i in range(self.count)]
+
+
+class VectorStore:
+    """追加写、内存映射读的向量库；同一目录只允许一个写者。"""
+
+    def __init__(self, path: str, manifest: dict):
+        self.path = path
+        self.generation: int = manifest["generation"]
+        self.dim: int | None = manifest["dim"]
+        self.dtype: str = manifest["dtype"]
+        self._entries: list[dict] = manifest["segments"]
+        self._segments: list[tuple[Segment, np.ndarray | None]] = []
+        for entry in self._entries:
+            seg = Segment(os.path.join(path, entry["name"]))
+            deleted = None
+            if entry["deleted"]:
+                deleted = np.zeros(seg.count, dtype=bool)
+                deleted[entry["deleted"]] = True
+            self._segments.append((seg, deleted))
+        # 仅写者使用：id -> (段序号, 行号)，首次写入时再构建
+        self._locations: dict[str, tuple[int, int]] | None = None
+
+    # ---- 打开 ----
+
+    @staticmethod
+    def current_generation(path: str) -> int | None:
+        try:
+            with open(os.path.join(path, "CURRENT"), encoding="utf-8") as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    @classmethod
+    def open(cls, path: str, generation: int | None = None, *, dtype: str = "float32") -> "VectorStore":
+        """打开指定代数（默认当前代数）；目录不存在时创建空库。"""
+        os.makedirs(path, exist_ok=True)
+        generation = generation if generation is not None else cls.current_generation(path)
+        if not generation:
+            if dtype not in _DTYPE_CODES:
+                raise ValueError(f"Unsupported dtype: {dtype}")
+            return cls(path, {"generation": 0, "dim": None, "dtype": dtype, "segments": []})
+        with open(os.path.join(path, f"MANIFEST-{generation:06d}.json"), encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    # ---- 读取 ----
+
+    def __len__(self) -> int:
+        return sum(seg.count - (0 if d is None else int(d.sum())) for seg, d in self._segments)
+
+    def search(self, query_vec: Iterable[float], k: int = 3) -> list[tuple[str, float]]:
+        """返回与查询向量余弦相似度最高的 k 个 (id, score)。"""
+        if self.dim is None or k <= 0:
+            return []
+        q = np.asarray(query_vec, dtype=np.float32)
+        q_norm = float(np.linalg.norm(q))
+        if q_norm > 0.0:
+            q = q / q_norm
+
+        candidates: list[tuple[float, int, int]] = []
+        for seg_no, (seg, deleted) in enumerate(self._segments):
+            for start in range(0, seg.count, SEARCH_CHUNK_ROWS):
+                block = seg.matrix[start : start + SEARCH_CHUNK_ROWS]
+                sims = np.asarray(block, dtype=np.float32) @ q
+                if deleted is not None:
+                    sims[deleted[start : start + len(sims)]] = -np.inf
+                kk = min(k, len(sims))
+                top = np.argpartition(-sims, kk - 1)[:kk]
+                candidates.extend(
+                    (float(sims[i]), seg_no, start + int(i)) for i in top if np.isfinite(sims[i])
+                )
+
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        return [(self._segments[s][0].id_at(row), score) for score, s, row in candidates[:k]]
+
+    # ---- 写入（单写者） ----
+
+    def _build_locations(self) -> dict[str, tuple[int, int]]:
+        if self._locations is None:
+            locations: dict[str, tuple[int, int]] = {}
+            for seg_no, (seg, deleted) in enumerate(self._segments):
+                for row, doc_id in enumerate(seg.ids()):
+                    if deleted is None or not deleted[row]:
+                        locations[doc_id] = (seg_no, row)
+            self._locations = locations
+        return self._locations
+
+    def _mark_deleted(self, entries: list[dict], ids: Iterable[str]) -> None:
+        locations = self._build_locations()
+        for doc_id in ids:
+            loc = locations.pop(doc_id, None)
+            if loc is not None:
+                seg_no, row = loc
+                entries[seg_no]["deleted"] = sorted(set(entries[seg_no]["deleted"]) | {row})
+
+    def _next_segment_name(self) -> str:
+        numbers = [
+            int(name[4:10]) for name in os.listdir(self.path) if name.startswith("seg-") and name.endswith(".cwv")
+        ]
+        return f"seg-{max(numbers, default=0) + 1:06d}.cwv"
+
+    def upsert(self, ids: list[str], vectors: Iterable[Iterable[float]] | np.ndarray) -> int:
+        """追加一个新段；已存在的 id 在旧段中标记删除（新值生效）。返回新代数。"""
+        if not ids:
+            return self.generation
+        matrix = normalize_rows(vectors)
+        if matrix.shape[0] != len(ids):
+            raise ValueError("ids and vectors length mismatch")
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"Vector dim {matrix.shape[1]} != store dim {self.dim}")
+
+        # 同一批次内重复的 id 只保留最后一次
+        last = {doc_id: i for i, doc_id in enumerate(ids)}
+        rows = sorted(last.values())
+        ids = [ids[i] for i in rows]
+        matrix = matrix[rows]
+
+        entries = [dict(e, deleted=list(e["deleted"])) for e in self._entries]
+        self._mark_deleted(entries, ids)
+        name = self._next_segment_name()
+        write_segment(os.path.join(self.path, name), ids, matrix, self.dtype)
+        entries.append({"name": name, "count": len(ids), "deleted": []})
+        self._commit(entries)
+        seg_no = len(self._segments) - 1
+        self._build_locations().update({doc_id: (seg_no, row) for row, doc_id in enumerate(ids)})
+        return self.generation
+
+    def delete(self, ids: Iterable[str]) -> int:
+        entries = [dict(e, deleted=list(e["deleted"])) for e in self._entries]
+        self._mark_deleted(entries, ids)
+        self._commit(entries)
+        return self.generation
+
+    def compact(self, *, full: bool | None = None, max_deleted_ratio: float = 0.2) -> int:
+        """合并段并回收已删除行。
+
+        默认只合并首段之后的小段；首段删除比例超过 max_deleted_ratio 或 full=True 时整体重写。
+        """
+        if not self._segments:
+            return self.generation
+        base_seg, base_deleted = self._segments[0]
+        base_dead = 0 if base_deleted is None else int(base_deleted.sum())
+        if full is None:
+            full = base_seg.count == 0 or base_dead / base_seg.count > max_deleted_ratio
+        start = 0 if full else 1
+        if len(self._segments) - start <= 1 and all(
+            d is None for _, d in self._segments[start:]
+        ):
+            return self.generation
+
+        ids: list[str] = []
+        blocks: list[np.ndarray] = []
+        for seg, deleted in self._segments[start:]:
+            keep = np.ones(seg.count, dtype=bool) if deleted is None else ~deleted
+            rows = np.nonzero(keep)[0]
+            ids.extend(seg.id_at(int(r)) for r in rows)
+            blocks.append(np.asarray(seg.matrix[rows], dtype=np.float32))
+        matrix = np.concatenate(blocks) if blocks else np.zeros((0, self.dim or 0), dtype=np.float32)
+
+        name = self._next_segment_name()
+        write_segment(os.path.join(self.path, name), ids, matrix, self.dtype)
+        entries = [dict(e, deleted=list(e["deleted"])) for e in self._entries[:start]]
+        entries.append({"name": name, "count": len(ids), "deleted": []})
+        self._locations = None
+        self._commit(entries)
+        return self.generation
+
+    def _commit(self, entries: list[dict], keep_generations: int = KEEP_GENERATIONS) -> None:
+        generation = self.generation + 1
+        manifest = {"generation": generation, "dim": self.dim, "dtype": self.dtype, "segments": entries}
+        _atomic_write(
+            os.path.join(self.path, f"MANIFEST-{generation:06d}.json"),
+            json.dumps(manifest).encode("utf-8"),
+        )
+        _atomic_write(os.path.join(self.path, "CURRENT"), str(generation).encode("utf-8"))
+        _fsync_dir(self.path)
+
+        previous = {seg.path: (seg, deleted) for seg, deleted in self._segments}
+        self.generation = generation
+        self._entries = entries
+        self._segments = []
+        for entry in entries:
+            seg_path = os.path.join(self.path, entry["name"])
+            seg = previous[seg_path][0] if seg_path in previous else Segment(seg_path)
+            deleted = None
+            if entry["deleted"]:
+                deleted = np.zeros(seg.count, dtype=bool)
+                deleted[entry["deleted"]] = True
+            self._segments.append((seg, deleted))
+        self._gc(keep_generations)
+
+    def _gc(self, keep_generations: int) -> None:
+        """删除过旧的 manifest 及其不再引用的段；仍持有旧映射的读者不受影响。"""
+        manifests = sorted(
+            name for name in os.listdir(self.path) if name.startswith("MANIFEST-") and name.endswith(".json")
+        )
+        retained = manifests[-keep_generations:]
+        referenced: set[str] = set()
+        for name in retained:
+            with open(os.path.join(self.path, name), encoding="utf-8") as f:
+                referenced.update(e["name"] for e in json.load(f)["segments"])
+        for name in manifests[:-keep_generations]:
+            os.unlink(os.path.join(self.path, name))
+        for name in os.listdir(self.path):
+            if name.startswith("seg-") and name.endswith(".cwv") and name not in referenced:
+                os.unlink(os.path.join(self.path, name))
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
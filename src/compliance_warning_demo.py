@@ -1,3 +1,4 @@
+import argparse
 import os
 import sys
 
@@ -10,6 +11,20 @@ from compliance_warning.server import ensure_seeded, mcp
 
 
 if __name__ == "__main__":
-    ensure_seeded()
-    mcp.run(transport="streamable-http")
+    parser = argparse.ArgumentParser(description="Compliance Warning MCP server")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="工作进程数；大于 1 时启用多进程部署（共享只读快照 + 单写者）",
+    )
+    parser.add_argument("--snapshot-dir", default="data/kb_snapshot", help="多进程模式的知识库快照目录")
+    args = parser.parse_args()
 
+    if args.workers > 1:
+        from compliance_warning.deploy import serve
+
+        serve(args.workers, mcp.settings.host, mcp.settings.port, args.snapshot_dir)
+    else:
+        ensure_seeded()
+        mcp.run(transport="streamable-http")
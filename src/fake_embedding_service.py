@@ -0,0 +1,111 @@
+"""与 embedding_service.py 接口一致的确定性 Embedding 替身服务。
+
+不加载任何模型：按字符 1-gram/2-gram 做特征哈希生成归一化向量，
+相同文本永远得到相同向量，字面重叠越多的文本余弦相似度越高。
+用于基准测试、压测与无 GPU 环境下的联调。
+"""
+
+import hashlib
+import json
+import math
+import os
+import socket
+import threading
+import time
+from functools import lru_cache
+from typing import List, Union
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+# bge-small-zh-v1.5 的输出维度
+DEFAULT_DIM = int(os.getenv("FAKE_EMBEDDING_DIM", "512"))
+
+app = FastAPI(title="Fake Embedding Service")
+
+
+class EmbeddingRequest(BaseModel):
+    input: Union[str, List[str]]
+
+
+class EmbeddingResponse(BaseModel):
+    embeddings: List[List[float]]
+
+
+@lru_cache(maxsize=200_000)
+def fake_embedding(text: str, dim: int = DEFAULT_DIM) -> tuple[float, ...]:
+    """确定性特征哈希向量（L2 归一化）。"""
+    vec = [0.0] * dim
+    chars = [c for c in text if not c.isspace()]
+    grams = chars + [a + b for a, b in zip(chars, chars[1:])]
+    for gram in grams:
+        h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "big")
+        vec[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vec))
+    if norm == 0.0:
+        return tuple(vec)
+    return tuple(v / norm for v in vec)
+
+
+@lru_cache(maxsize=200_000)
+def _encoded_embedding(text: str) -> str:
+    return json.dumps(fake_embedding(text))
+
+
+@app.post("/embed", response_model=EmbeddingResponse)
+async def embed_text(request: EmbeddingRequest):
+    # 直接拼接缓存好的 JSON 片段，避免替身自身的序列化开销干扰被测客户端
+    texts = [request.input] if isinstance(request.input, str) else request.input
+    body = '{"embeddings":[' + ",".join(_encoded_embedding(t) for t in texts) + "]}"
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "ok", "model": f"fake-hash-{DEFAULT_DIM}"}
+
+
+class BackgroundServer:
+    """在后台线程中运行替身服务，供基准测试在进程内启动。"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        if port == 0:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind((host, 0))
+                port = s.getsockname()[1]
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/embed"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake embedding service failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "BackgroundServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    # 与真实服务相同的默认端口，可直接替换 embedding_service.py
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("FAKE_EMBEDDING_PORT", "8003")))
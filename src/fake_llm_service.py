@@ -0,0 +1,140 @@
+"""OpenAI 兼容的 Chat Completions 替身服务（模拟 Kimi API）。
+
+不调用任何模型：按配置的首 token 延迟与生成速率输出固定数量的 token，
+流式响应与真实服务一致（chat.completion.chunk 帧、stream_options.include_usage 的用量帧、[DONE]）。
+Receptionist 的意图分类请求（提示词中同时出现 TECHNICAL/SALES/GENERAL）按用户输入中的
+#technical / #sales 标记返回类别，其余返回 GENERAL，便于基准测试稳定地走 LLM 分类路径。
+用于 A2A 端到端基准测试与无 API Key 环境下的联调。
+"""
+
+import asyncio
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+
+@dataclass
+class FakeLLMConfig:
+    ttft_ms: float = float(os.getenv("FAKE_LLM_TTFT_MS", "300"))
+    tokens_per_s: float = float(os.getenv("FAKE_LLM_TOKENS_PER_S", "50"))
+    completion_tokens: int = int(os.getenv("FAKE_LLM_COMPLETION_TOKENS", "64"))
+
+
+# 进程内启动时可直接修改该对象调整延迟与速率
+config = FakeLLMConfig()
+app = FastAPI(title="Fake LLM Service")
+
+_TOKENS = ["这是", "一个", "用于", "基准", "测试", "的", "模拟", "回答", "，", "内容", "没有", "实际", "含义", "。"]
+_CATEGORY_HINT = re.compile(r"#(technical|sales)", re.IGNORECASE)
+
+
+def _text(messages: List[Dict[str, Any]]) -> str:
+    return "\n".join(str(m.get("content") or "") for m in messages)
+
+
+def _answer(messages: List[Dict[str, Any]]) -> List[str]:
+    text = _text(messages)
+    if all(label in text for label in ("TECHNICAL", "SALES", "GENERAL")):
+        hint = _CATEGORY_HINT.search(text)
+        return [hint.group(1).upper() if hint else "GENERAL"]
+    return [_TOKENS[i % len(_TOKENS)] for i in range(config.completion_tokens)]
+
+
+def _usage(messages: List[Dict[str, Any]], tokens: List[str]) -> Dict[str, int]:
+    prompt_tokens = len(_text(messages)) // 2 + 4 * len(messages)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    start = time.monotonic()
+    messages = body.get("messages") or []
+    tokens = _answer(messages)
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model", "fake")}
+    interval = 1.0 / config.tokens_per_s if config.tokens_per_s > 0 else 0.0
+
+    if not body.get("stream"):
+        await asyncio.sleep(config.ttft_ms / 1000 + interval * (len(tokens) - 1))
+        return {
+            **base,
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": _usage(messages, tokens),
+        }
+
+    def frame(**data: Any) -> str:
+        return "data: " + json.dumps({**base, "object": "chat.completion.chunk", **data}, ensure_ascii=False) + "\n\n"
+
+    async def generate():
+        yield frame(choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+        for i, token in enumerate(tokens):
+            # 按绝对时间排期，避免 sleep 误差累积导致实际速率偏低
+            delay = start + config.ttft_ms / 1000 + i * interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield frame(choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+        yield frame(choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield frame(choices=[], usage=_usage(messages, tokens))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream")
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "ok", "ttft_ms": config.ttft_ms, "tokens_per_s": config.tokens_per_s}
+
+
+class BackgroundServer:
+    """在后台线程中运行替身服务，供基准测试在进程内启动。"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        if port == 0:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind((host, 0))
+                port = s.getsockname()[1]
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(
+            uvicorn.Config(app, host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """OpenAI 兼容的 base URL（KIMI_API_URL）。"""
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self, timeout: float = 10.0) -> "BackgroundServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Fake LLM service failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "BackgroundServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("FAKE_LLM_PORT", "8010")))
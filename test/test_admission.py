@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from src.a2a.admission import AdmissionController, AdmissionRejected, ClientRateLimiter
+
+
+def test_bounded_queue_and_handover():
+    async def scenario():
+        gate = AdmissionController("Test", max_concurrent=1, max_queue=1, queue_timeout=0.2)
+        release = await gate.acquire()
+        waiter = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        assert gate.waiting == 1 and gate.try_acquire() is None
+        with pytest.raises(AdmissionRejected) as full:
+            await gate.acquire()
+        assert full.value.reason == "queue_full" and full.value.response().headers["Retry-After"]
+
+        release()
+        release()  # 重复释放无效
+        second = await waiter  # 名额直接交接给排队者
+        assert gate.active == 1 and gate.waiting == 0
+        with pytest.raises(AdmissionRejected, match="queue_timeout"):
+            await gate.acquire()
+        second()
+        assert gate.active == 0 and gate.try_acquire() is not None
+
+    asyncio.run(scenario())
+
+
+def test_replicas_have_separate_budgets(monkeypatch):
+    from src.a2a import admission
+
+    monkeypatch.setenv("A2A_MAX_CONCURRENCY_REPLICATEST", "1")
+    a = admission.controller("ReplicaTest", "http://a:1")
+    b = admission.controller("ReplicaTest", "http://b:1")
+    assert admission.controller("ReplicaTest", "http://a:1") is a
+    assert a.try_acquire() is not None and a.try_acquire() is None
+    assert b.try_acquire() is not None  # 一个副本饱和不影响其它副本
+
+
+def test_client_token_bucket():
+    limiter = ClientRateLimiter(rate=1, burst=2)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(AdmissionRejected) as limited:
+        limiter.check("a")
+    assert limited.value.response().status_code == 429
+    limiter.check("b")  # 各客户端独立计数
+
+
+def test_stream_released_when_client_disconnects_before_first_chunk():
+    from src.a2a import admission
+    from src.a2a.protocol import AgentMessage, ChatCompletionRequest
+    from src.a2a.utils import handle_chat_completion, handle_local_request
+
+    class SilentLLM:
+        model_name = "m"
+        temperature = None  # 不走响应缓存
+
+        async def astream(self, messages):
+            await asyncio.Event().wait()
+            yield
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        await asyncio.sleep(0.01)  # 响应头尚未发完客户端就已断开，响应体生成器不会开始执行
+
+    async def scenario():
+        gate = admission.controller("DisconnectTest")
+        request = ChatCompletionRequest(model="m", stream=True, messages=[AgentMessage(role="user", content="hi")])
+
+        async def handler(req):
+            return await handle_chat_completion(req, SilentLLM(), "prompt", agent="DisconnectTest")
+
+        completed = []
+        response = await handle_local_request(handler, request, on_complete=completed.append)
+        assert gate.active == 1
+        await response({"type": "http"}, receive, send)
+        assert gate.active == 0 and completed == [True]
+
+    asyncio.run(scenario())
+
+
+def test_client_key_trusts_user_only_from_authenticated_callers(monkeypatch):
+    from fastapi import Request
+
+    from src.a2a.admission import client_key
+
+    def request(headers=None):
+        raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        return Request({"type": "http", "headers": raw, "client": ("10.0.0.5", 5000)})
+
+    monkeypatch.delenv("A2A_TRUSTED_CLIENT_TOKEN", raising=False)
+    assert client_key("alice", request()) == "ip:10.0.0.5"  # 客户端自填的 user 不能绕过限速
+    monkeypatch.setenv("A2A_TRUSTED_CLIENT_TOKEN", "s3cret")
+    assert client_key("alice", request({"X-A2A-Client-Token": "wrong"})) == "ip:10.0.0.5"
+    assert client_key("alice", request({"X-A2A-Client-Token": "s3cret"})) == "user:alice"
+    assert client_key(None, None) == "anonymous"
@@ -0,0 +1,27 @@
+from src.a2a.context import build_chat_messages, trim_history
+from src.a2a.protocol import AgentMessage
+
+
+def _dialog(turns):
+    messages = []
+    for i in range(turns):
+        messages.append(AgentMessage(role="user", content=f"第{i}轮问题：" + "数据库" * 20))
+        messages.append(AgentMessage(role="assistant", content=f"第{i}轮回答：" + "索引" * 30))
+    return messages + [AgentMessage(role="user", content="当前问题")]
+
+
+def test_trim_keeps_latest_and_drops_in_steps():
+    older, recent = trim_history(_dialog(20), budget=600, step=8)
+    assert recent[-1].content == "当前问题"
+    assert len(older) % 8 == 0 and older
+    # 截断点按整块移动：连续多轮对话中被截断的消息数（即缓存前缀）保持不变
+    dropped = [len(trim_history(_dialog(n), budget=600, step=8)[0]) for n in range(20, 28)]
+    assert len(set(dropped)) <= 3
+
+
+def test_prefix_is_stable_and_history_is_summarized():
+    short = build_chat_messages("系统提示", _dialog(1), budget=6000)
+    assert [m.content for m in short[:1]] == ["系统提示"] and len(short) == 4
+    long = build_chat_messages("系统提示", _dialog(30), budget=1500)
+    assert long[0].content == "系统提示"
+    assert long[1].content.startswith("早前对话摘要") and long[-1].content == "当前问题"
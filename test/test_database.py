@@ -0,0 +1,213 @@
+import asyncio
+import json
+
+import pytest
+
+from database import (
+    Database,
+    DatabaseConfig,
+    QueryCache,
+    UnsafeQuery,
+    add_execution_time_hint,
+    build_keyset_query,
+    decode_cursor,
+    encode_cursor,
+    prepare_read_only,
+    to_qmark,
+)
+
+
+def test_keyset_query_projection_filters_and_cursor():
+    after = decode_cursor(encode_cursor(42))
+    sql, args = build_keyset_query(
+        "app_module", "id", ["name", "id"], {"status": ["a", "b"], "parent_id": None}, after, 11
+    )
+    assert sql == (
+        "SELECT `id`, `name` FROM `app_module` WHERE `status` IN (%s, %s) "
+        "AND `parent_id` IS NULL AND `id` > %s ORDER BY `id` LIMIT 11"
+    )
+    assert args == ["a", "b", 42]
+
+
+def test_keyset_query_rejects_unsafe_identifiers():
+    with pytest.raises(ValueError):
+        build_keyset_query("app_module", "id", ["name; DROP TABLE x"])
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_query_cache_ttl_lru_single_flight_and_invalidation():
+    now = [0.0]
+    cache = QueryCache(max_entries=2, default_ttl=10, clock=lambda: now[0])
+    calls = []
+
+    async def load(tag):
+        calls.append(tag)
+        await asyncio.sleep(0.01)
+        return [tag]
+
+    async def scenario():
+        sql = "SELECT * FROM app_module WHERE id = %s"
+        # Concurrent identical queries hit the database once; whitespace does not change the key
+        a, b = await asyncio.gather(
+            cache.get_or_load(sql, [1], lambda: load("a")),
+            cache.get_or_load("SELECT *  FROM app_module\n WHERE id = %s;", [1], lambda: load("b")),
+        )
+        assert a == b == ["a"] and calls == ["a"]
+        assert await cache.get_or_load(sql, [1], lambda: load("c")) == ["a"]
+
+        now[0] = 11  # Reloaded once the TTL has expired
+        assert await cache.get_or_load(sql, [1], lambda: load("d")) == ["d"]
+
+        await cache.get_or_load(sql, [2], lambda: load("e"))
+        await cache.get_or_load("SELECT 1 FROM other", None, lambda: load("f"))
+        assert cache.stats()["evictions"] == 1  # Least recently used entry evicted beyond max_entries
+
+        assert cache.invalidate("app_module") == 1
+        assert await cache.get_or_load(sql, [2], lambda: load("g")) == ["g"]
+
+    asyncio.run(scenario())
+    assert calls == ["a", "d", "e", "f", "g"]
+
+
+def test_query_cache_leader_cancellation_does_not_fail_followers():
+    cache = QueryCache(max_entries=4, default_ttl=10)
+    calls = []
+
+    async def load(tag):
+        calls.append(tag)
+        await asyncio.sleep(0.05)
+        return [tag]
+
+    async def scenario():
+        sql = "SELECT * FROM app_module"
+        leader = asyncio.create_task(cache.get_or_load(sql, None, lambda: load("leader")))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(cache.get_or_load(sql, None, lambda: load("follower")))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        assert await follower == ["follower"]
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(scenario())
+    assert calls == ["leader", "follower"]
+
+
+def test_prepare_read_only_validation():
+    assert prepare_read_only("SELECT * FROM app_module WHERE name = %s;") == (
+        "SELECT",
+        "SELECT * FROM app_module WHERE name = %s",
+    )
+    # Keywords inside literals and quoted identifiers are not statements
+    assert prepare_read_only("select `update` from t where note = 'x; DROP TABLE t'")[0] == "SELECT"
+    for sql in (
+        "DELETE FROM app_module",
+        "SELECT 1; DROP TABLE app_module",
+        "SELECT * FROM app_module FOR UPDATE",
+        "WITH x AS (SELECT 1) DELETE FROM app_module",
+        "SELECT /*! SLEEP(5) */ 1",
+        "SELECT * INTO OUTFILE '/tmp/x' FROM app_module",
+    ):
+        with pytest.raises(UnsafeQuery):
+            prepare_read_only(sql)
+
+
+def test_execution_time_hint_skips_leading_comments():
+    assert add_execution_time_hint("select id FROM t", 500) == "select /*+ MAX_EXECUTION_TIME(500) */ id FROM t"
+    sql = "/* x */ SELECT id FROM t"
+    kind, sql = prepare_read_only(sql)
+    assert kind == "SELECT"
+    assert add_execution_time_hint(sql, 500) == "/* x */ SELECT /*+ MAX_EXECUTION_TIME(500) */ id FROM t"
+    assert add_execution_time_hint("-- note\n  SELECT 1", 500) == "-- note\n  SELECT /*+ MAX_EXECUTION_TIME(500) */ 1"
+    assert add_execution_time_hint("WITH x AS (SELECT 1) SELECT * FROM x", 500).startswith("WITH x AS (SELECT 1)")
+
+
+def test_to_qmark_leaves_literals_alone():
+    assert to_qmark("SELECT '%s' AS x, a FROM t WHERE b = %s AND c = %(c)s AND d LIKE '5%%'") == (
+        "SELECT '%s' AS x, a FROM t WHERE b = ? AND c = :c AND d LIKE '5%%'"
+    )
+
+
+def test_sqlite_backend_pagination_and_limits(tmp_path):
+    config = DatabaseConfig(backend="sqlite", sqlite_path=str(tmp_path / "db.sqlite3"), sqlite_seed_rows=250)
+
+    async def scenario():
+        db = await Database.connect(config)
+        try:
+            seen = []
+            cursor = None
+            while True:
+                page = await db.page_app_module(limit=100, cursor=cursor, columns=["module_code"])
+                seen.extend(row["id"] for row in page["rows"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert seen == list(range(1, 251))
+
+            result = await db.run_sql("SELECT id FROM app_module WHERE app_id > %s", [0], max_rows=10)
+            assert result["row_count"] == 10 and result["truncated_reason"] == "max_rows"
+
+            schema = await db.load_schema()
+            assert "idx_app_module_app_status" in schema["tables"]["app_module"]["indexes"]
+        finally:
+            await db.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_export_app_modules_pages_with_next_cursor(tmp_path, monkeypatch):
+    import database
+    from types import SimpleNamespace
+
+    monkeypatch.setattr(database, "MAX_EXPORT_ROWS", 100)
+    config = DatabaseConfig(backend="sqlite", sqlite_path=str(tmp_path / "db.sqlite3"), sqlite_seed_rows=250)
+
+    async def scenario():
+        db = await Database.connect(config)
+
+        async def report_progress(progress, total=None):
+            assert progress <= total
+
+        ctx = SimpleNamespace(
+            request_context=SimpleNamespace(lifespan_context=SimpleNamespace(db=db)),
+            report_progress=report_progress,
+        )
+        try:
+            pages, cursor = [], None
+            while True:
+                page = await database.export_app_modules(ctx, limit=1000, cursor=cursor, columns=["module_code"])
+                pages.append(page["count"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            assert pages == [100, 100, 50]
+        finally:
+            await db.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_tool_calls_record_spans_under_the_callers_trace(tmp_path, monkeypatch):
+    import database
+    from mcp.shared.memory import create_connected_server_and_client_session
+    from src.compliance_warning import tracing
+
+    monkeypatch.setenv("DB_BACKEND", "sqlite")
+    monkeypatch.setenv("DB_SQLITE_PATH", str(tmp_path / "db.sqlite3"))
+    spans = []
+    monkeypatch.setattr(tracing, "_exporter", type("Exporter", (), {"submit": staticmethod(spans.append)})())
+    traceparent = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+    async def scenario():
+        async with create_connected_server_and_client_session(database.mcp._mcp_server) as client:
+            result = await client.call_tool("list_app_modules", {"limit": 2}, meta={"traceparent": traceparent})
+            assert not result.isError and len(json.loads(result.content[0].text)["rows"]) == 2
+            result = await client.call_tool("db_pool_stats", {})
+            assert not result.isError
+
+    asyncio.run(scenario())
+    listed, stats = spans
+    assert listed.name == "tool list_app_modules" and listed.kind == "server"
+    assert listed.trace_id == "4bf92f3577b34da6a3ce929d0e0e4736" and listed.parent_id == "00f067aa0ba902b7"
+    assert stats.name == "tool db_pool_stats" and stats.parent_id is None
@@ -0,0 +1,39 @@
+import json
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from src.a2a import metrics, utils
+
+
+class ScriptedLLM:
+    model_name = "m"
+    temperature = None  # 不走响应缓存
+
+    async def astream(self, messages):
+        for part in ("先看", "执行计划"):
+            yield SimpleNamespace(content=part)
+
+
+def test_single_process_host_streams_from_in_process_expert(monkeypatch):
+    from src.a2a import host, receptionist
+
+    registry = receptionist.agent_registry
+    assert all(i.handler is not None for i in registry.instances.values())  # 默认 HTTP 静态实例已移除
+    monkeypatch.setattr(utils, "_llm", ScriptedLLM())
+    picks = metrics.REGISTRY_PICKS.value(agent="TechExpert", url="local://TechExpert")
+
+    client = TestClient(host.app)
+    payload = {"model": "m", "stream": True, "messages": [{"role": "user", "content": "如何优化数据库索引？"}]}
+    with client.stream("POST", "/v1/chat/completions", json=payload) as response:
+        assert response.status_code == 200
+        frames = [line[6:] for line in response.iter_lines() if line.startswith("data: ")]
+
+    assert frames[-1] == "[DONE]"
+    content = "".join(
+        (c.get("delta") or {}).get("content") or "" for f in frames[:-1] for c in json.loads(f)["choices"]
+    )
+    assert content == "先看执行计划"
+    # 经注册表选中进程内的 TechExpert，响应发送完毕后进行中计数归零
+    assert metrics.REGISTRY_PICKS.value(agent="TechExpert", url="local://TechExpert") == picks + 1
+    assert all(i.outstanding == 0 for i in registry.instances.values())
@@ -0,0 +1,31 @@
+from src.a2a.intent import GENERAL_EXAMPLES, ClassificationCache, IntentClassifier
+
+
+def test_rules_then_centroid_then_fallback():
+    clf = IntentClassifier(
+        {
+            "TECHNICAL": ["如何设计高可用的微服务架构？", "服务部署后性能下降怎么办？"],
+            "SALES": ["你们的产品如何定价？", "企业版有折扣吗？"],
+            "GENERAL": GENERAL_EXAMPLES,
+        },
+        threshold=0.1,
+    )
+    assert clf.predict("企业版怎么收费")[::2] == ("SALES", "rule")
+    assert clf.predict("谢谢")[::2] == ("GENERAL", "rule")
+    # 同时命中多个类别的规则时交给质心模型；把握不足则返回 None 回退到 LLM
+    category, confidence, source = clf.predict("报价接口报错了")
+    assert source == "centroid" and (category is None) == (confidence < 0.1)
+    assert clf.predict("如何设计一个高可用系统")[0] == "TECHNICAL"
+    assert clf.predict("今天星期几")[0] is None
+
+
+def test_classification_cache_tiers_and_lru():
+    cache = ClassificationCache(max_entries=2, similarity=0.85)
+    cache.put("Redis 集群怎么做主从切换？", "TECHNICAL")
+    assert cache.get("redis集群 怎么做主从切换") == "TECHNICAL"  # 归一化后精确命中
+    assert cache.get("Redis 集群怎么做主从切换呢") == "TECHNICAL"  # 语义层命中
+    assert cache.get("今天星期几") is None
+    cache.put("能不能便宜一点", "SALES")
+    cache.put("你们是做什么的", "GENERAL")  # 淘汰最久未使用的条目
+    assert len(cache) == 2 and cache.get("Redis 集群怎么做主从切换？") is None
+    assert cache.get("能不能便宜一点！") == "SALES"
@@ -0,0 +1,37 @@
+import pytest
+
+from src.a2a.manager import AgentManager, parse_replicas, rotate_log
+
+
+def test_rotate_log_keeps_limited_backups(tmp_path):
+    log = tmp_path / "agent.log"
+    for i in range(4):
+        log.write_text(f"run {i}")
+        rotate_log(str(log), backups=2)
+    assert not log.exists()
+    assert (tmp_path / "agent.log.1").read_text() == "run 3"
+    assert (tmp_path / "agent.log.2").read_text() == "run 2"
+    assert not (tmp_path / "agent.log.3").exists()
+    rotate_log(str(tmp_path / "missing.log"))  # 不存在的日志直接跳过
+
+
+def test_parse_replicas_validation():
+    assert parse_replicas(["TechExpert=3", "SalesConsultant=1"]) == {"TechExpert": 3, "SalesConsultant": 1}
+    for bad in (["TechExpert"], ["TechExpert=x"], ["TechExpert=0"], ["Unknown=2"], ["Receptionist=2"]):
+        with pytest.raises(ValueError):
+            parse_replicas(bad)
+
+
+def test_replica_ports_skip_reserved_and_base_ports(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    manager = AgentManager({"TechExpert": 3, "SalesConsultant": 2})
+    ports = {(c.name, c.port) for c in manager.children}
+    assert ports == {
+        ("TechExpert", 8001), ("TechExpert", 8100), ("TechExpert", 8101),
+        ("SalesConsultant", 8005), ("SalesConsultant", 8102),
+        ("Receptionist", 8000),
+    }
+    # 分配区间与基础端口、保留端口（嵌入服务 8003）重叠时跳过它们
+    monkeypatch.setattr("src.a2a.manager.REPLICA_PORT_BASE", 8002)
+    manager = AgentManager({"TechExpert": 3, "SalesConsultant": 2})
+    assert sorted(c.port for c in manager.children) == [8000, 8001, 8002, 8004, 8005, 8006]
@@ -0,0 +1,32 @@
+from src.compliance_warning.metrics import Registry
+
+
+def test_histogram_render_and_quantile():
+    registry = Registry()
+    hist = registry.histogram("demo_seconds", "demo", buckets=(0.1, 0.5, 1.0))
+    for v in (0.05, 0.2, 0.3, 0.7):
+        hist.observe(v, stage="rules")
+
+    text = registry.render_prometheus()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{stage="rules",le="0.5"} 3' in text
+    assert 'demo_seconds_bucket{stage="rules",le="+Inf"} 4' in text
+    assert 'demo_seconds_count{stage="rules"} 4' in text
+
+    p50 = hist.quantile(0.5, stage="rules")
+    assert 0.1 <= p50 <= 0.5
+    assert hist.quantile(0.5, stage="missing") is None
+
+
+def test_counter_and_gauge_snapshot():
+    registry = Registry()
+    calls = registry.counter("demo_calls_total", "demo")
+    calls.inc(tool="a")
+    calls.inc(2, tool="a")
+    docs = registry.gauge("demo_docs", "demo")
+    docs.set_function(lambda: 7, kind="case")
+
+    snap = registry.snapshot()
+    assert snap["demo_calls_total"] == {"tool=a": 3.0}
+    assert snap["demo_docs"] == {"kind=case": 7.0}
+    assert registry.counter("demo_calls_total", "demo") is calls
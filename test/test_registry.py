@@ -0,0 +1,46 @@
+from src.a2a.registry import AgentRegistry
+
+
+def test_least_outstanding_and_passive_ejection():
+    registry = AgentRegistry()
+    a = registry.register("TechExpert", "http://a:1/", ["technical"])
+    b = registry.register("TechExpert", "http://b:1", ["technical"])
+    registry.register("SalesConsultant", "http://c:1", ["sales"])
+
+    first = registry.acquire("technical")
+    second = registry.acquire("technical")
+    assert {first.url, second.url} == {"http://a:1", "http://b:1"}  # 各分得一个进行中请求
+    registry.release(first)
+    assert registry.acquire("technical") is first
+
+    registry.release(a, reachable=False)  # 上游不可达：摘除直至心跳或健康检查恢复
+    assert registry.candidates("technical") == [b]
+    registry.register("TechExpert", "http://a:1", ["technical"])
+    assert a.healthy and registry.acquire("pricing") is None
+
+
+def test_registration_endpoints_require_token_or_loopback(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from src.a2a.registry import mount_registry
+
+    registry = AgentRegistry()
+    registry.register("TechExpert", "http://static:1", ["technical"], static=True)
+    app = FastAPI()
+    mount_registry(app, registry)
+    reg = {"name": "TechExpert", "url": "http://a:1", "capabilities": ["technical"]}
+
+    monkeypatch.delenv("A2A_REGISTRY_TOKEN", raising=False)
+    assert TestClient(app, client=("10.0.0.5", 5000)).post("/registry/register", json=reg).status_code == 403
+    local = TestClient(app, client=("127.0.0.1", 5000))
+    assert local.post("/registry/register", json=reg).status_code == 200
+    # 静态配置的实例不可被注销
+    static = {**reg, "url": "http://static:1"}
+    assert local.post("/registry/deregister", json=static).json() == {"ok": False}
+    assert "http://static:1" in registry.instances
+
+    monkeypatch.setenv("A2A_REGISTRY_TOKEN", "s3cret")
+    remote = TestClient(app, client=("10.0.0.5", 5000))
+    assert local.post("/registry/deregister", json=reg).status_code == 403
+    assert remote.post("/registry/deregister", json=reg, headers={"X-Registry-Token": "s3cret"}).json() == {"ok": True}
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+import numpy as np
+
+from src.a2a.protocol import AgentMessage
+from src.a2a.utils import ResponseCache, replay_stream
+
+
+def ask(*contents):
+    return [AgentMessage(role="user" if i % 2 == 0 else "assistant", content=c) for i, c in enumerate(contents)]
+
+
+def test_exact_tier_ttl_and_sse_replay():
+    async def scenario():
+        cache = ResponseCache(max_entries=2, ttl=60, semantic=False)
+        keys = ResponseCache.keys("TechExpert", "m", "prompt", ask("如何优化数据库索引？"))
+        cache.put(keys, ["先看", "执行计划"], "stop", {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5})
+        # 仅空白与全/半角不同即命中；不同 agent 或多轮上下文不命中
+        assert (await cache.get("TechExpert", ResponseCache.keys("TechExpert", "m", "prompt", ask(" 如何优化数据库索引?\n"))))[0]
+        assert (await cache.get("Sales", ResponseCache.keys("Sales", "m", "prompt", ask("如何优化数据库索引？"))))[0] is None
+        entry, _ = await cache.get("TechExpert", keys)
+        frames = [f async for f in replay_stream(entry, "m")]
+        payloads = [json.loads(f[6:]) for f in frames[:-1]]
+        assert "".join(p["choices"][0]["delta"].get("content", "") for p in payloads if p["choices"]) == "先看执行计划"
+        assert payloads[-2]["choices"][0]["finish_reason"] == "stop" and payloads[-1]["usage"]["total_tokens"] == 5
+        assert frames[-1] == "data: [DONE]\n\n"
+
+        cache.put(keys, ["被截断"], "length", {})  # 非正常结束不缓存
+        assert len(cache) == 1
+        entry.expires_at = 0
+        assert (await cache.get("TechExpert", keys))[0] is None and len(cache) == 0
+
+    asyncio.run(scenario())
+
+
+def test_exact_keys_keep_punctuation_and_case():
+    def key(text):
+        return ResponseCache.keys("TechExpert", "m", "prompt", ask(text))[0]
+
+    assert key("print(a+b)") != key("print(a-b)")
+    assert key("x = a[i]") != key("x = a(i)")
+    assert key("SELECT Name FROM t") != key("select name from t")
+    assert key("print(a+b)") == key("  print(a+b)\n")
+
+
+def test_semantic_tier_matches_within_context():
+    async def scenario():
+        cache = ResponseCache(max_entries=4, ttl=60, semantic=True, similarity=0.9)
+        vectors = {"报价是多少": np.array([1, 0], np.float32), "价格是多少": np.array([0.99, 0.14], np.float32)}
+
+        async def embed(text):
+            return vectors[text] / np.linalg.norm(vectors[text])
+
+        cache._embed = embed
+        first = ResponseCache.keys("Sales", "m", "p", ask("报价是多少"))
+        _, vector = await cache.get("Sales", first)
+        cache.put(first, ["标准版每月 99 元"], "stop", {}, vector)
+        hit, _ = await cache.get("Sales", ResponseCache.keys("Sales", "m", "p", ask("价格是多少")))
+        assert hit.parts == ["标准版每月 99 元"]
+        # 不同系统提示词视为不同上下文
+        assert (await cache.get("Sales", ResponseCache.keys("Sales", "m", "other", ask("价格是多少"))))[0] is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,155 @@
+import asyncio
+from collections import OrderedDict
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from src.a2a import admission, metrics, receptionist, utils
+from src.a2a.protocol import AgentMessage, ChatCompletionRequest
+from src.a2a.registry import AgentRegistry
+from src.a2a.utils import LocalPrefetch, handle_chat_completion
+
+
+class ScriptedLLM:
+    model_name = "m"
+    temperature = None  # 不走响应缓存
+
+    def __init__(self, parts, delay=0.0):
+        self.parts = parts
+        self.delay = delay
+
+    async def astream(self, messages):
+        for part in self.parts:
+            await asyncio.sleep(self.delay)
+            yield SimpleNamespace(content=part)
+
+
+def chat_request(text="如何优化数据库索引？", user=None):
+    return ChatCompletionRequest(model="m", stream=True, user=user, messages=[AgentMessage(role="user", content=text)])
+
+
+def expert(agent, llm):
+    async def handler(request):
+        return await handle_chat_completion(request, llm, "prompt", agent=agent)
+
+    return handler
+
+
+async def send_response(response, disconnect=False):
+    """按 ASGI 发送响应并返回响应体；disconnect=True 时客户端在响应头发完之前就已断开。"""
+    sent = []
+
+    async def receive():
+        if disconnect:
+            return {"type": "http.disconnect"}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if disconnect:
+            await asyncio.sleep(0.01)
+        sent.append(message)
+
+    await response({"type": "http"}, receive, send)
+    return b"".join(m.get("body", b"") for m in sent)
+
+
+@pytest.fixture
+def speculation(monkeypatch):
+    """给 receptionist 换上独立的注册表，并让 LLM 分类返回 state["category"]。"""
+    registry = AgentRegistry()
+    state = {"category": "TECHNICAL"}
+
+    async def classify_remote(question):
+        await asyncio.sleep(0.02)
+        return state["category"]
+
+    monkeypatch.setattr(receptionist, "agent_registry", registry)
+    monkeypatch.setattr(receptionist.receptionist_agent, "classify_remote", classify_remote)
+    monkeypatch.setattr(receptionist, "_last_category", OrderedDict())
+    receptionist.remember_category("spec-user", "TECHNICAL")  # 以历史类别作为推测依据
+    return registry, state
+
+
+def speculations(outcome):
+    return metrics.SPECULATIONS.value(outcome=outcome, basis="history")
+
+
+def test_local_prefetch_releases_expert_slot_on_commit_and_abort():
+    async def scenario():
+        gate = admission.controller("LocalPrefetchTest")
+        completed = []
+
+        prefetch = LocalPrefetch(
+            "local://t", expert("LocalPrefetchTest", ScriptedLLM(["先看", "执行计划"])), chat_request(), completed.append
+        )
+        response = await prefetch.commit()
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        assert "执行计划" in body.decode() and body.endswith(b"data: [DONE]\n\n")
+        assert gate.active == 0 and completed == [True]
+
+        prefetch = LocalPrefetch(
+            "local://t", expert("LocalPrefetchTest", ScriptedLLM(["慢"] * 50, delay=0.01)), chat_request(), completed.append
+        )
+        await asyncio.sleep(0.05)
+        assert gate.active == 1
+        wasted_bytes, wasted_deltas = await prefetch.abort()
+        assert wasted_bytes > 0 and wasted_deltas > 0
+        assert gate.active == 0 and completed == [True, True]
+
+    asyncio.run(scenario())
+
+
+def test_speculative_hit_miss_and_skip_release_slots(speculation):
+    registry, state = speculation
+    instance = registry.register_local("SpecLocal", ["technical"], expert("SpecLocal", ScriptedLLM(["索引", "优化"], delay=0.01)))
+    gate = admission.controller("SpecLocal")
+
+    async def scenario():
+        hits, misses, skipped = speculations("hit"), speculations("miss"), speculations("skipped")
+        category, response = await receptionist.speculative_classify(chat_request(user="spec-user"), "帮我看看")
+        assert category == "TECHNICAL" and "索引" in (await send_response(response)).decode()
+        assert speculations("hit") == hits + 1
+
+        state["category"] = "SALES"
+        category, response = await receptionist.speculative_classify(chat_request(user="spec-user"), "帮我看看")
+        assert category == "SALES" and response is None and speculations("miss") == misses + 1
+
+        slots = [gate.try_acquire() for _ in range(gate.max_concurrent)]  # 专家饱和时不推测
+        category, response = await receptionist.speculative_classify(chat_request(user="spec-user"), "帮我看看")
+        assert response is None and speculations("skipped") == skipped + 1
+        for release in slots:
+            release()
+        assert gate.active == 0 and instance.outstanding == 0
+
+    asyncio.run(scenario())
+
+
+def test_proxy_prefetch_released_when_client_disconnects_before_first_chunk(speculation, monkeypatch):
+    registry, _ = speculation
+    instance = registry.register("SpecProxy", "http://spec-proxy:1", ["technical"])
+    gate = admission.controller("SpecProxy", instance.url)
+    upstream = {"chunks": 0}
+
+    async def body():
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            upstream["chunks"] += 1
+            yield b'data: {"choices": [{"delta": {"content": "x"}}]}\n\n'
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    async def scenario():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(utils, "_proxy_client", client)
+        try:
+            category, response = await receptionist.speculative_classify(chat_request(user="spec-user"), "帮我看看")
+            assert category == "TECHNICAL" and gate.active == 1 and instance.outstanding == 1
+            await send_response(response, disconnect=True)
+            # 上游请求已取消，副本名额与进行中计数立即归还
+            assert gate.active == 0 and instance.outstanding == 0 and upstream["chunks"] < 100
+        finally:
+            await client.aclose()
+
+    asyncio.run(scenario())
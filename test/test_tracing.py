@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from src.compliance_warning import tracing
+
+
+def test_traceparent_propagation_and_nesting():
+    incoming = tracing.parse_traceparent("00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01")
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-00f067aa0ba902b7-01") is None
+    with tracing.span("orchestrate", parent=incoming, service="Receptionist") as root:
+        with tracing.span("classify.local") as child:
+            pass
+        headers = tracing.inject({})
+    assert root.trace_id == child.trace_id == incoming.trace_id
+    assert root.parent_id == incoming.span_id and child.parent_id == root.context.span_id
+    assert headers["traceparent"] == root.traceparent and tracing.current() is None
+
+
+def test_jsonl_export_and_waterfall(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.SpanExporter(file_path=str(path))
+    spans = []
+    with tracing.span("POST /v1/chat/completions", service="Receptionist", kind="server") as root:
+        spans.append(root)
+        child = tracing.start_span("proxy", kind="client", target="http://localhost:8001")
+        asyncio.run(asyncio.sleep(0.01))
+        child.set_error("upstream unavailable")
+        child.end()
+        spans.append(child)
+    exporter.export(spans)
+    exporter.shutdown()
+
+    loaded = tracing.load_spans(str(path), root.trace_id[:8])
+    assert {s["name"] for s in loaded} == {"POST /v1/chat/completions", "proxy"}
+    lines = tracing.render_waterfall(loaded).splitlines()
+    assert lines[1].startswith("Receptionist: POST") and lines[2].startswith("  Receptionist: proxy") and lines[2].endswith("!")
+    otlp = tracing.to_otlp(spans)["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp[1]["parentSpanId"] == root.context.span_id and otlp[1]["status"]["code"] == 2
+
+
+def test_show_rejects_ambiguous_trace_prefix(tmp_path, monkeypatch, capsys):
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.SpanExporter(file_path=str(path))
+    parents = [tracing.parse_traceparent(f"00-abc0000000000000000000000000000{i}-00f067aa0ba902b7-01") for i in (1, 2)]
+    first, second = (tracing.start_span(name, parent=parent) for name, parent in zip("ab", parents))
+    first.end()
+    second.end()
+    exporter.export([first, second])
+    exporter.shutdown()
+
+    monkeypatch.setattr("sys.argv", ["tracing", "--file", str(path), "show", "abc"])
+    with pytest.raises(SystemExit) as exc:
+        tracing.main()
+    assert exc.value.code == 1
+    assert capsys.readouterr().err.splitlines()[1:] == [first.trace_id, second.trace_id]
+
+    monkeypatch.setattr("sys.argv", ["tracing", "--file", str(path), "show", first.trace_id])
+    tracing.main()
+    assert capsys.readouterr().out.startswith(f"trace {first.trace_id}")
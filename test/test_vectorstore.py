@@ -0,0 +1,27 @@
+import numpy as np
+
+from src.compliance_warning.vectorstore import VectorStore
+
+
+def test_upsert_search_and_compact(tmp_path):
+    path = str(tmp_path / "vs")
+    store = VectorStore.open(path, dtype="float16")
+    store.upsert(["a", "b", "c"], np.eye(3, dtype=np.float32))
+    store.upsert(["b"], [[0.0, 0.0, 1.0]])  # 覆盖 b：旧行记为删除
+    assert len(store) == 3
+    assert store.segment_count == 2
+
+    # 另一个读者按当前代数打开，只依赖 manifest 与内存映射
+    reader = VectorStore.open(path)
+    hits = reader.search([0.0, 0.0, 1.0], k=2)
+    assert sorted(doc_id for doc_id, _ in hits) == ["b", "c"]
+    assert hits[0][1] > 0.99
+    assert all(doc_id != "b" for doc_id, _ in reader.search([0.0, 1.0, 0.0], k=1))
+
+    generation = reader.generation
+    store.compact(full=True)
+    assert store.segment_count == 1 and len(store) == 3
+    # 旧代数的读者在合并后仍可继续检索
+    assert reader.search([1.0, 0.0, 0.0], k=1)[0][0] == "a"
+    assert VectorStore.open(path).generation > generation
+    assert VectorStore.open(path).search([0.0, 0.0, 1.0], k=3)[0][1] > 0.99
@@ -1,45 +1,33 @@
 """Test database connection."""
 
 import asyncio
-import aiomysql
+
+from database import Database, DatabaseConfig
 
 
 async def test_connection():
-    """Test MySQL database connection."""
-    print("Testing database connection...")
-    
+    """Test database connection (MySQL by default, DB_BACKEND=sqlite for the local stand-in)."""
+    config = DatabaseConfig.from_env()
+    print(f"Testing database connection ({config.backend})...")
+
+    db = await Database.connect(config)
     try:
-        # 尝试连接数据库
-        conn = await aiomysql.connect(
-            host="localhost",
-            port=3306,
-            db="app_platform",
-            user="root",
-            password="123456"
-        )
+        # 查询 app_module 表
+        result = await db.run_sql("SELECT COUNT(*) AS n FROM app_module")
         print("✓ 数据库连接成功！")
-        
-        # 测试查询
-        async with conn.cursor(aiomysql.DictCursor) as cursor:
-            # 查询数据库版本
-            await cursor.execute("SELECT VERSION()")
-            version = await cursor.fetchone()
-            print(f"✓ MySQL 版本: {version}")
-            
-            # 查询 app_module 表
-            await cursor.execute("SELECT * FROM app_module LIMIT 5")
-            modules = await cursor.fetchall()
-            print(f"✓ app_module 表记录数: {len(modules)}")
-            if modules:
-                print(f"  示例数据: {modules[0]}")
-        
-        conn.close()
+        print(f"✓ app_module 表记录数: {result['rows'][0]['n']}")
+        page = await db.page_app_module(limit=5)
+        if page["rows"]:
+            print(f"  示例数据: {page['rows'][0]}")
+        print(f"✓ 连接池: {db.pool_stats()}")
         print("\n✓ 所有测试通过！")
         return True
-        
+
     except Exception as e:
         print(f"✗ 连接失败: {type(e).__name__}: {e}")
         return False
+    finally:
+        await db.disconnect()
 
 
 if __name__ == "__main__":